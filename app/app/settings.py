@@ -45,6 +45,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,16 +79,58 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.1/ref/settings/#databases
 
+# DB_BACKEND=sqlite3 runs the project, and its connection pool, without a
+# PostgreSQL server. DB_POOL_SIZE > 0 shares a pool of connections between
+# the threads of a worker (core.db.pool), which then give their connection
+# back after each request instead of keeping it for DB_CONN_MAX_AGE.
+DB_BACKEND = os.environ.get('DB_BACKEND', 'postgresql')
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 0))
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': (
+            'core.db.backends.' if DB_POOL_SIZE else 'django.db.backends.'
+        ) + DB_BACKEND,
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE': int(
+            os.environ.get('DB_CONN_MAX_AGE', 0 if DB_POOL_SIZE else 60)
+        ),
+        'POOL': {
+            'SIZE': DB_POOL_SIZE,
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 5)),
+        },
     }
 }
 
+# Check that reused connections still work before serving a request
+DB_CONN_HEALTH_CHECKS = os.environ.get(
+    'DB_CONN_HEALTH_CHECKS', 'true'
+).lower() in ('1', 'true', 'yes')
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.1/topics/cache/
+# The default local memory cache is private to each process: with several
+# worker processes set CACHE_BACKEND to a shared backend, otherwise a
+# worker keeps serving the lists cached before a change made in another
+# one for up to RECIPE_CACHE_TIMEOUT (`check --deploy` warns about it).
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'recipe-app'),
+    }
+}
+
+# Cache used for the per user list responses of the recipe API
+RECIPE_CACHE_ALIAS = 'default'
+RECIPE_CACHE_TIMEOUT = int(os.environ.get('RECIPE_CACHE_TIMEOUT', 300))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
@@ -133,4 +176,89 @@ STATIC_ROOT = "vol/web/static" # on indique ou sont register nos fichiers static
 
 # We settle the new User model in order to make auth in our web applciation
 AUTH_USER_MODEL = "core.User"
-# LOGIN_REDIRECT_URL
\ No newline at end of file
+# LOGIN_REDIRECT_URL
+
+
+REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": (
+        "core.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "core.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
+}
+# JSON library of core.renderers and core.parsers: "auto" for the fastest
+# installed of orjson and ujson, or "orjson", "ujson", "json"
+JSON_BACKEND = os.environ.get("JSON_BACKEND", "auto")
+
+# Pagination of the listing endpoints, opt-in with ?page_size= or ?cursor=
+API_PAGE_SIZE = int(os.environ.get("API_PAGE_SIZE", 100))
+API_MAX_PAGE_SIZE = int(os.environ.get("API_MAX_PAGE_SIZE", 1000))
+
+# Serve the recipe, tag and ingredient lists from values() rows instead of
+# the serializers, see recipe.fastpath
+RECIPE_FAST_LIST = os.environ.get(
+    "RECIPE_FAST_LIST", "true"
+).lower() in ("1", "true", "yes")
+
+# Recipes read per query and name lookup by /api/recipe/recipes/export/
+RECIPE_EXPORT_CHUNK_SIZE = int(
+    os.environ.get("RECIPE_EXPORT_CHUNK_SIZE", 2000)
+)
+
+# Maximum number of recipes accepted by /api/recipe/recipes/batch/
+RECIPE_BATCH_MAX_SIZE = int(os.environ.get("RECIPE_BATCH_MAX_SIZE", 1000))
+
+# Text search configuration of the recipe search vectors on PostgreSQL
+RECIPE_SEARCH_CONFIG = os.environ.get("RECIPE_SEARCH_CONFIG", "english")
+
+# Resized copies of the recipe images, created by a pool of worker
+# processes after each upload (0 workers creates them in the request)
+RECIPE_IMAGE_RENDITIONS = {
+    "thumb": (160, 160),
+    "card": (640, 640),
+    "full": (1600, 1600),
+}
+RECIPE_IMAGE_QUALITY = int(os.environ.get("RECIPE_IMAGE_QUALITY", 85))
+RECIPE_IMAGE_WORKERS = int(os.environ.get("RECIPE_IMAGE_WORKERS", 2))
+
+# Hours an unreferenced image blob is kept before gc_blobs deletes it
+BLOB_GC_GRACE_HOURS = int(os.environ.get("BLOB_GC_GRACE_HOURS", 24))
+
+# Cache of the token to user resolution of CachedTokenAuthentication:
+# "django" (TOKEN_AUTH_CACHE_ALIAS), "local" (per process LRU) or "off".
+# A deleted token or a deactivated user is dropped from the cache at once,
+# but a per process cache ("local", or "django" on the local memory
+# backend) of another worker keeps authenticating it for up to
+# TOKEN_AUTH_CACHE_TIMEOUT seconds
+TOKEN_AUTH_CACHE = os.environ.get("TOKEN_AUTH_CACHE", "django")
+TOKEN_AUTH_CACHE_ALIAS = 'default'
+TOKEN_AUTH_CACHE_SIZE = int(
+    os.environ.get("TOKEN_AUTH_CACHE_SIZE", 10000)
+)
+TOKEN_AUTH_CACHE_TIMEOUT = int(
+    os.environ.get("TOKEN_AUTH_CACHE_TIMEOUT", 30)
+)
+
+# Signed access tokens issued by /api/user/token/refresh/, in seconds
+ACCESS_TOKEN_LIFETIME = int(os.environ.get("ACCESS_TOKEN_LIFETIME", 300))
+# how long a process trusts its copy of the user revocation timestamps
+ACCESS_TOKEN_REVOCATION_INTERVAL = int(
+    os.environ.get("ACCESS_TOKEN_REVOCATION_INTERVAL", 10)
+)
+
+# Per request SQL and timing metrics, see core.middleware and /metrics
+METRICS_ENABLED = os.environ.get(
+    "METRICS_ENABLED", "true"
+).lower() in ("1", "true", "yes")
+# /metrics answers the requests from these addresses or networks, and the
+# requests sending "Authorization: Bearer <METRICS_TOKEN>" when it is set
+METRICS_ALLOWED_IPS = [
+    ip.strip() for ip in os.environ.get(
+        "METRICS_ALLOWED_IPS", "127.0.0.1,::1"
+    ).split(",") if ip.strip()
+]
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
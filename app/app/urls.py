@@ -18,8 +18,12 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.views import metrics
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/user/', include("user.urls")),
     path("api/recipe/", include("recipe.urls")),
+    path("health/", include("core.urls")),
+    path("metrics", metrics, name="metrics"),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT) # permet d'upload des media sans avoir de serveur (pour debug par exemple)
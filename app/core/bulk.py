@@ -0,0 +1,218 @@
+import io
+from datetime import date, datetime
+
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import Max, Model
+
+
+def allocate_ids(model, count):
+    """Reserve `count` primary keys for rows of `model` inserted in bulk
+
+    `bulk_create` only sets the primary keys of the new rows on
+    PostgreSQL, and the m2m through rows need them. Allocating the ids
+    up front gives the same behaviour on every database.
+
+    On PostgreSQL the ids come from the table sequence. On SQLite the
+    AUTOINCREMENT counter of the table is moved forward, which takes the
+    database write lock until the transaction ends, so concurrent
+    allocations never overlap and the ids of deleted rows are not handed
+    out again; the ids reserved by a transaction rolled back are. Other
+    databases follow the current maximum, which is only safe when no
+    other transaction inserts into the table at the same time.
+    """
+    if count <= 0:
+        return []
+
+    connection = connections[router.db_for_write(model)]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, %s)) "
+                "FROM generate_series(1, %s)",
+                [model._meta.db_table, model._meta.pk.column, count]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    if connection.vendor == "sqlite" and \
+            model._meta.pk.get_internal_type() == "AutoField":
+        return _allocate_sqlite_ids(model, count, connection)
+
+    last = model._default_manager.aggregate(last=Max("pk"))["last"] or 0
+    return list(range(last + 1, last + count + 1))
+
+
+def _allocate_sqlite_ids(model, count, connection):
+    """Reserve the ids by moving the AUTOINCREMENT counter of the table"""
+    table = model._meta.db_table
+    # the update locks the database for the rest of the transaction
+    with transaction.atomic(using=connection.alias, savepoint=False), \
+            connection.cursor() as cursor:
+        cursor.execute(
+            "UPDATE sqlite_sequence SET seq = seq + %s WHERE name = %s",
+            [count, table]
+        )
+        if cursor.rowcount:
+            cursor.execute(
+                "SELECT seq FROM sqlite_sequence WHERE name = %s", [table]
+            )
+            last = cursor.fetchone()[0] - count
+        else:
+            # no row was ever inserted, the table has no counter yet
+            last = model._default_manager.using(connection.alias) \
+                .aggregate(last=Max("pk"))["last"] or 0
+            cursor.execute(
+                "INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)",
+                [table, last + count]
+            )
+    return list(range(last + 1, last + count + 1))
+
+
+def bulk_create_with_ids(model, objs, batch_size=None):
+    """Insert `objs` in bulk, setting their primary keys beforehand"""
+    objs = list(objs)
+    for obj, pk in zip(objs, allocate_ids(model, len(objs))):
+        obj.pk = pk
+    return model._default_manager.bulk_create(objs, batch_size=batch_size)
+
+
+def insert_ignore(model, rows):
+    """Insert `rows`, a list of {column: value} dicts, into the table of
+    `model`, skipping the rows violating a unique constraint"""
+    if not rows:
+        return
+    connection = connections[router.db_for_write(model)]
+    columns = list(rows[0])
+    batch_size = connection.ops.bulk_batch_size(columns, rows)
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    names = ", ".join(quote(column) for column in columns)
+    placeholder = "({})".format(", ".join(["%s"] * len(columns)))
+
+    if connection.vendor == "postgresql":
+        template = "INSERT INTO {table} ({names}) VALUES {values} " \
+                   "ON CONFLICT DO NOTHING"
+    elif connection.vendor == "sqlite":
+        template = "INSERT OR IGNORE INTO {table} ({names}) VALUES {values}"
+    elif connection.vendor == "mysql":
+        template = "INSERT IGNORE INTO {table} ({names}) VALUES {values}"
+    else:
+        # no conflict clause, insert the rows one by one
+        for row in rows:
+            try:
+                with transaction.atomic(using=connection.alias):
+                    model._default_manager.create(**row)
+            except IntegrityError:
+                pass
+        return
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            sql = template.format(
+                table=table,
+                names=names,
+                values=", ".join([placeholder] * len(batch))
+            )
+            cursor.execute(sql, [row[column] for row in batch
+                                 for column in columns])
+
+
+def bulk_load(model, columns, rows, using=None):
+    """Insert `rows`, tuples of values for the `columns` fields of `model`,
+    as fast as the database allows
+
+    The other columns get the default of their field, computed once, so
+    no model instance is created per row. PostgreSQL loads the rows with
+    COPY, other databases with a batched INSERT. Signals are not sent.
+    """
+    using = using or router.db_for_write(model)
+    connection = connections[using]
+    defaults = _column_defaults(model, columns, connection)
+    names = [model._meta.get_field(name).column for name in columns]
+    names += list(defaults)
+    rows = (tuple(row) + tuple(defaults.values()) for row in rows)
+
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    sql_names = ", ".join(quote(name) for name in names)
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            data = io.StringIO()
+            for row in rows:
+                data.write("\t".join(_copy_value(value) for value in row))
+                data.write("\n")
+            data.seek(0)
+            cursor.copy_expert(
+                f"COPY {table} ({sql_names}) FROM STDIN", data
+            )
+        else:
+            placeholder = ", ".join(["%s"] * len(names))
+            cursor.executemany(
+                f"INSERT INTO {table} ({sql_names}) VALUES ({placeholder})",
+                list(rows)
+            )
+
+
+def _column_defaults(model, columns, connection):
+    """Return the {column: database value} defaults of the fields of
+    `model` missing from `columns`, auto primary keys excluded"""
+    obj = model()
+    defaults = {}
+    for field in model._meta.local_concrete_fields:
+        if field.name in columns or field.attname in columns:
+            continue
+        if field.primary_key and field.get_internal_type() in (
+                "AutoField", "BigAutoField"):
+            continue
+        value = field.pre_save(obj, add=True)
+        defaults[field.column] = field.get_db_prep_save(value, connection)
+    return defaults
+
+
+def _copy_value(value):
+    """Return `value` in the text format of PostgreSQL COPY"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (date, datetime)):
+        value = value.isoformat()
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t") \
+        .replace("\n", "\\n").replace("\r", "\\r")
+
+
+def bulk_get_or_create(model, field, values, **fields):
+    """Return a {value: pk} map of the rows of `model` having `fields` and
+    whose `field` is in `values`, inserting the missing rows
+
+    The existing rows are read in one query, the missing ones are
+    inserted ignoring conflicts with concurrent inserts, then read back.
+    `field` and `fields` must be covered by a unique constraint.
+    """
+    values = list(dict.fromkeys(values))
+    ids = _lookup_ids(model, field, values, fields)
+
+    missing = [value for value in values if value not in ids]
+    if missing:
+        columns = {
+            model._meta.get_field(name).column:
+                value.pk if isinstance(value, Model) else value
+            for name, value in fields.items()
+        }
+        column = model._meta.get_field(field).column
+        insert_ignore(model, [
+            dict(columns, **{column: value}) for value in missing
+        ])
+        ids.update(_lookup_ids(model, field, missing, fields))
+    return ids
+
+
+def _lookup_ids(model, field, values, fields, chunk_size=500):
+    """Return a {value: pk} map of the existing rows, querying the values
+    in chunks to stay under the parameters limit of the database"""
+    ids = {}
+    for start in range(0, len(values), chunk_size):
+        ids.update(model._default_manager.filter(
+            **fields, **{f"{field}__in": values[start:start + chunk_size]}
+        ).values_list(field, "pk"))
+    return ids
@@ -0,0 +1,8 @@
+from django.db.backends.sqlite3 import base
+
+from core.db.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """SQLite backend sharing a connection pool between threads, to run
+    the pool without a PostgreSQL server"""
@@ -0,0 +1,199 @@
+import threading
+import time
+
+from django.conf import settings
+
+# pools of the pooled backends, by database alias
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(Exception):
+    """No connection was released before the checkout timeout"""
+
+
+class ConnectionPool:
+    """Thread safe pool of database connections
+
+    Connections are opened by `connect` on demand, up to `size` of them.
+    A checkout when they are all in use waits up to `timeout` seconds for
+    one to be released. Released connections are rolled back, and
+    discarded if that fails. The most recently released connection is
+    handed out first so that the idle ones can time out on the server.
+    """
+
+    def __init__(self, connect, size, timeout, check=None):
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.check = check
+        self._idle = []
+        self._open = 0
+        self._condition = threading.Condition()
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+            "timeouts": 0,
+            "created": 0,
+            "discarded": 0,
+        }
+
+    def checkout(self):
+        """Return an idle connection, opening one if the pool is not full
+
+        Idle connections failing the `check` are discarded.
+        """
+        while True:
+            connection = self._acquire()
+            if connection is None:
+                return self._open_connection()
+            if self.check is None or self.check(connection):
+                return connection
+            self.discard(connection)
+
+    def _acquire(self):
+        """Return an idle connection, or None after reserving room for a
+        new one, waiting for a release if needed"""
+        start = time.perf_counter()
+        waited = False
+        with self._condition:
+            while not self._idle and self._open >= self.size:
+                waited = True
+                remaining = self.timeout - (time.perf_counter() - start)
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout(
+                        f"No connection available after {self.timeout}s"
+                    )
+                self._condition.wait(remaining)
+
+            self._stats["checkouts"] += 1
+            if waited:
+                wait_ms = (time.perf_counter() - start) * 1000
+                self._stats["waits"] += 1
+                self._stats["wait_ms_total"] += wait_ms
+                self._stats["wait_ms_max"] = max(
+                    self._stats["wait_ms_max"], wait_ms
+                )
+            if self._idle:
+                return self._idle.pop()
+            self._open += 1
+            return None
+
+    def _open_connection(self):
+        """Open a connection in the room reserved by `_acquire`, outside of
+        the lock since it can be slow"""
+        try:
+            connection = self.connect()
+        except Exception:
+            with self._condition:
+                self._open -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._stats["created"] += 1
+        return connection
+
+    def release(self, connection):
+        """Give a connection back to the pool"""
+        try:
+            connection.rollback()
+        except Exception:
+            self.discard(connection)
+            return
+        with self._condition:
+            self._idle.append(connection)
+            self._condition.notify()
+
+    def discard(self, connection):
+        """Close a broken connection, making room for a new one"""
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._condition:
+            self._open -= 1
+            self._stats["discarded"] += 1
+            self._condition.notify()
+
+    def close(self):
+        """Close the idle connections"""
+        with self._condition:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            self.discard(connection)
+
+    def stats(self):
+        """Return the size, usage and checkout metrics of the pool"""
+        with self._condition:
+            stats = dict(self._stats)
+            stats.update(
+                size=self.size,
+                open=self._open,
+                idle=len(self._idle),
+                in_use=self._open - len(self._idle),
+            )
+        stats["wait_ms_total"] = round(stats["wait_ms_total"], 3)
+        stats["wait_ms_max"] = round(stats["wait_ms_max"], 3)
+        return stats
+
+
+def ping(connection):
+    """Return True if a raw connection still answers a query"""
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT 1")
+        cursor.close()
+        connection.rollback()
+    except Exception:
+        return False
+    return True
+
+
+def get_pool(alias):
+    """Return the pool of a database alias, None if it is not pooled"""
+    return _pools.get(alias)
+
+
+class PooledDatabaseWrapperMixin:
+    """Database wrapper taking its connections from a ConnectionPool
+
+    Configured by the POOL entry of the database settings, e.g.
+    {"SIZE": 10, "TIMEOUT": 5}. Closing the connection, which Django does
+    at the end of each request unless CONN_MAX_AGE keeps it, gives it
+    back to the pool instead. With DB_CONN_HEALTH_CHECKS the idle
+    connections are pinged before being handed out.
+    """
+
+    def get_pool(self, conn_params):
+        with _pools_lock:
+            pool = _pools.get(self.alias)
+            if pool is None:
+                options = self.settings_dict.get("POOL", {})
+                pool = _pools[self.alias] = ConnectionPool(
+                    lambda: super(PooledDatabaseWrapperMixin, self)
+                    .get_new_connection(conn_params),
+                    size=options.get("SIZE", 10),
+                    timeout=options.get("TIMEOUT", 5),
+                    check=ping if settings.DB_CONN_HEALTH_CHECKS else None,
+                )
+            return pool
+
+    def get_new_connection(self, conn_params):
+        try:
+            return self.get_pool(conn_params).checkout()
+        except PoolTimeout as exc:
+            raise self.Database.OperationalError(str(exc)) from exc
+
+    def _close(self):
+        if self.connection is None:
+            return
+        pool = get_pool(self.alias)
+        if pool is None:
+            return super()._close()
+        if self.in_atomic_block or self.errors_occurred:
+            # the connection state is unknown, do not reuse it
+            return pool.discard(self.connection)
+        return pool.release(self.connection)
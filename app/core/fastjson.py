@@ -0,0 +1,119 @@
+import importlib
+import json
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework.utils.encoders import JSONEncoder
+
+# JSON libraries tried in order by JSON_BACKEND = "auto"
+BACKENDS = ("orjson", "ujson", "json")
+
+Backend = namedtuple("Backend", ("name", "dumps", "loads"))
+
+# types the fast encoders can not write, or would write unlike DRF
+# (datetimes, decimals), go through the DRF encoder
+_default = JSONEncoder().default
+
+
+def _orjson(module):
+    option = module.OPT_PASSTHROUGH_DATETIME | module.OPT_NON_STR_KEYS
+
+    def dumps(data):
+        return module.dumps(data, default=_default, option=option)
+    return Backend("orjson", dumps, module.loads)
+
+
+def _reject_constant(name):
+    raise ValueError(f"Out of range float values are not allowed: {name}")
+
+
+def _strict_loads(data):
+    """Parse with the standard library, refusing NaN and Infinity like
+    DRF's JSONParser"""
+    if isinstance(data, bytes):
+        data = data.decode("utf-8")
+    return json.loads(data, parse_constant=_reject_constant)
+
+
+def _json(module):
+    def dumps(data):
+        return module.dumps(
+            data, cls=JSONEncoder, ensure_ascii=False, allow_nan=False,
+            separators=(",", ":")
+        ).encode("utf-8")
+    return Backend("json", dumps, _strict_loads)
+
+
+def _ujson(module):
+    def dumps(data):
+        return module.dumps(
+            data, ensure_ascii=False, escape_forward_slashes=False,
+            default=_default
+        ).encode("utf-8")
+
+    def loads(data):
+        # ujson accepts NaN and Infinity, leave those documents to json
+        text = data if isinstance(data, str) else data.decode("utf-8")
+        if "NaN" in text or "Infinity" in text:
+            return _strict_loads(text)
+        return module.loads(text)
+    return Backend("ujson", dumps, loads)
+
+
+_factories = {"orjson": _orjson, "ujson": _ujson, "json": _json}
+
+
+def load_backend(name):
+    """Return the backend of a JSON library, None if it is not
+    installed"""
+    try:
+        module = importlib.import_module(name)
+    except ImportError:
+        return None
+    return _factories[name](module)
+
+
+_backend = None
+
+
+def get_backend():
+    """Return the backend selected by JSON_BACKEND
+
+    "auto" picks the fastest installed library, a library name requires
+    it, falling back to the standard library when it is missing.
+    """
+    global _backend
+    if _backend is None:
+        if settings.JSON_BACKEND not in BACKENDS + ("auto",):
+            raise ImproperlyConfigured(
+                f"Unknown JSON_BACKEND {settings.JSON_BACKEND!r}"
+            )
+        names = BACKENDS if settings.JSON_BACKEND == "auto" \
+            else (settings.JSON_BACKEND, "json")
+        _backend = next(
+            backend for backend in map(load_backend, names)
+            if backend is not None
+        )
+    return _backend
+
+
+def dumps(data):
+    """Return the compact UTF-8 JSON of `data`, like DRF's JSONRenderer"""
+    return get_backend().dumps(data)
+
+
+def loads(data):
+    """Return the data of a JSON document, bytes or str, raising a
+    ValueError if it is invalid"""
+    return get_backend().loads(data)
+
+
+@receiver(setting_changed)
+def reset_backend(setting, **kwargs):
+    """Select the backend again when JSON_BACKEND changes"""
+    global _backend
+    if setting == "JSON_BACKEND":
+        _backend = None
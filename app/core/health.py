@@ -0,0 +1,58 @@
+import logging
+import time
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.db.utils import DatabaseError
+
+from core.db.pool import get_pool
+
+logger = logging.getLogger(__name__)
+
+# set once every migration is applied, they can not become pending again
+# without deploying new code, so new processes
+_migrated = set()
+
+
+def database_latency(alias=DEFAULT_DB_ALIAS):
+    """Return the round trip of a trivial query in milliseconds"""
+    connection = connections[alias]
+    start = time.perf_counter()
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+    return (time.perf_counter() - start) * 1000
+
+
+def pending_migrations(alias=DEFAULT_DB_ALIAS):
+    """Return the names of the migrations not applied yet"""
+    if alias in _migrated:
+        return []
+    connection = connections[alias]
+    executor = MigrationExecutor(connection)
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    pending = [f"{migration.app_label}.{migration.name}"
+               for migration, _ in plan]
+    if not pending:
+        _migrated.add(alias)
+    return pending
+
+
+def readiness(alias=DEFAULT_DB_ALIAS):
+    """Return the readiness report of the database and if it is ready"""
+    try:
+        latency = database_latency(alias)
+        pending = pending_migrations(alias)
+    except DatabaseError:
+        # the error may hold the host or the credentials, it is only logged
+        logger.exception("Readiness check of the database %s failed", alias)
+        return {"database": {"ok": False, "error": "unavailable"}}, False
+
+    report = {
+        "database": {"ok": True, "latency_ms": round(latency, 3)},
+        "migrations": {"ok": not pending, "pending": pending},
+    }
+    pool = get_pool(alias)
+    if pool is not None:
+        report["database"]["pool"] = pool.stats()
+    return report, not pending
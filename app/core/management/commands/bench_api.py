@@ -0,0 +1,271 @@
+import json
+import statistics
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+from functools import partial
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+from core.seed import seed_dataset
+from recipe.cache import bump_user_version
+
+
+def percentile(values, fraction):
+    """Return the nearest rank percentile of sorted `values`"""
+    return values[max(0, round(len(values) * fraction) - 1)]
+
+
+class Command(BaseCommand):
+    """Django command measuring the latency and queries of the API routes
+    on a seeded dataset
+
+    The requests go through the Django test client, in a transaction
+    rolled back at the end, or to a running server given by --url, in
+    which case the seeded users are committed and deleted at the end. The
+    query counts come from the Server-Timing header of the server, so they
+    require METRICS_ENABLED there.
+
+    The per user list cache is invalidated before every request, so the
+    lists are built each time, unless --cached is given. A server only
+    sees the invalidation if it shares the cache of the command.
+    """
+    help = "Benchmark the recipe and user API endpoints"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=5)
+        parser.add_argument("--recipes", type=int, default=500,
+                            help="Number of recipes per user")
+        parser.add_argument("--tags", type=int, default=50,
+                            help="Number of tags per user")
+        parser.add_argument("--ingredients", type=int, default=150,
+                            help="Number of ingredients per user")
+        parser.add_argument("--links", type=int, default=4,
+                            help="Tags and ingredients per recipe")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--requests", type=int, default=200,
+                            help="Measured requests per endpoint")
+        parser.add_argument("--warmup", type=int, default=10,
+                            help="Unmeasured requests per endpoint")
+        parser.add_argument("--endpoint", action="append",
+                            help="Only run the endpoints with this name")
+        parser.add_argument("--url",
+                            help="Base URL of a running server, e.g. "
+                                 "http://localhost:8000")
+        parser.add_argument("--output",
+                            help="Write the results as JSON to this file")
+        parser.add_argument("--cached", action="store_true",
+                            help="Serve the lists from the per user cache")
+
+    def handle(self, *args, **options):
+        if options["url"]:
+            users = self.seed(options)
+            try:
+                results = self.run(users[0], options)
+            finally:
+                for user in users:
+                    user.delete()
+        else:
+            with transaction.atomic():
+                users = self.seed(options)
+                results = self.run(users[0], options)
+                transaction.set_rollback(True)
+            # the ids of the rolled back users may be reused
+            for user in users:
+                bump_user_version(user.pk)
+
+        self.report(results, options["cached"])
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump({
+                    "date": datetime.now(timezone.utc).isoformat(),
+                    "target": options["url"] or "test client",
+                    "database": connections[DEFAULT_DB_ALIAS].vendor,
+                    "list_cache": options["cached"],
+                    "dataset": {
+                        name: options[name] for name in (
+                            "users", "recipes", "tags", "ingredients",
+                            "links", "seed",
+                        )
+                    },
+                    "endpoints": results,
+                }, output, indent=2)
+                output.write("\n")
+
+    def seed(self, options):
+        users = list(seed_dataset(
+            options["users"], options["recipes"], options["tags"],
+            options["ingredients"], options["links"], options["seed"]
+        ))
+        Token.objects.create(user=users[0])
+        return users
+
+    def endpoints(self, user):
+        """Return the method, path and body of the benchmarked requests"""
+        recipes = reverse("recipe:recipe-list")
+        tag_ids = list(Tag.objects.filter(user=user).order_by("pk")
+                       .values_list("pk", flat=True)[:2])
+        ingredient_ids = list(
+            Ingredient.objects.filter(user=user).order_by("pk")
+            .values_list("pk", flat=True)[:2]
+        )
+        recipe = Recipe.objects.filter(user=user).order_by("pk").first()
+        tags = ",".join(str(pk) for pk in tag_ids)
+        return {
+            "recipe list": ("GET", recipes, None),
+            "recipe list by tags": ("GET", f"{recipes}?tags={tags}", None),
+            "recipe list with all tags": (
+                "GET", f"{recipes}?tags={tags}&match=all", None
+            ),
+            "recipe search": ("GET", f"{recipes}?search=creamy+soup", None),
+            "recipe detail": (
+                "GET", reverse("recipe:recipe-detail", args=[recipe.pk]),
+                None
+            ),
+            "recipe create": ("POST", recipes, {
+                "title": "Bench recipe",
+                "time_min": 10,
+                "price": "5.00",
+                "tags": tag_ids,
+                "ingredients": ingredient_ids,
+            }),
+            "tag list": ("GET", reverse("recipe:tag-list"), None),
+            "assigned tags": (
+                "GET", reverse("recipe:tag-list") + "?assigned_only=1", None
+            ),
+            "ingredient list": (
+                "GET", reverse("recipe:ingredient-list"), None
+            ),
+            "user profile": ("GET", reverse("user:me"), None),
+        }
+
+    def run(self, user, options):
+        """Return the measurements of every selected endpoint"""
+        token = Token.objects.get(user=user).key
+        send = (
+            self.server_sender(options["url"], token) if options["url"]
+            else self.client_sender(token)
+        )
+        if options["cached"]:
+            prepare = None
+        else:
+            # not timed, every request misses the list cache
+            prepare = partial(bump_user_version, user.pk)
+        results = {}
+        for name, (method, path, body) in self.endpoints(user).items():
+            if options["endpoint"] and name not in options["endpoint"]:
+                continue
+            for _ in range(options["warmup"]):
+                send(method, path, body)
+            results[name] = self.measure(
+                send, method, path, body, options["requests"], prepare
+            )
+        return results
+
+    def client_sender(self, token):
+        """Return a function sending a request with the test client and
+        returning its status and query count"""
+        hosts = [host for host in settings.ALLOWED_HOSTS if host != "*"]
+        client = APIClient(
+            SERVER_NAME=hosts[0].lstrip(".") if hosts else "localhost"
+        )
+        client.credentials(HTTP_AUTHORIZATION=f"Token {token}")
+        connection = connections[DEFAULT_DB_ALIAS]
+
+        def send(method, path, body):
+            with CaptureQueriesContext(connection) as queries:
+                res = getattr(client, method.lower())(
+                    path, body, format="json"
+                )
+            return res.status_code, len(queries)
+        return send
+
+    def server_sender(self, url, token):
+        """Return a function sending a request to a running server and
+        returning its status and query count"""
+        def send(method, path, body):
+            request = urllib.request.Request(
+                url.rstrip("/") + path,
+                data=json.dumps(body).encode() if body else None,
+                method=method,
+                headers={
+                    "Authorization": f"Token {token}",
+                    "Content-Type": "application/json",
+                },
+            )
+            try:
+                with urllib.request.urlopen(request) as res:
+                    res.read()
+                    status, timing = res.status, res.headers["Server-Timing"]
+            except urllib.error.HTTPError as exc:
+                status, timing = exc.code, exc.headers["Server-Timing"]
+            return status, server_timing_queries(timing)
+        return send
+
+    def measure(self, send, method, path, body, count, prepare=None):
+        """Send `count` requests and return their latency percentiles,
+        throughput and query count, `prepare` being called before each
+        request"""
+        latencies = []
+        queries = []
+        errors = 0
+        duration = 0
+        for _ in range(count):
+            if prepare is not None:
+                prepare()
+            sent = time.perf_counter()
+            status, query_count = send(method, path, body)
+            elapsed = time.perf_counter() - sent
+            duration += elapsed
+            latencies.append(elapsed * 1000)
+            if query_count is not None:
+                queries.append(query_count)
+            if status >= 400:
+                errors += 1
+        latencies.sort()
+        return {
+            "method": method,
+            "path": path,
+            "requests": count,
+            "errors": errors,
+            "throughput": round(count / duration, 1),
+            "p50_ms": round(percentile(latencies, 0.5), 3),
+            "p95_ms": round(percentile(latencies, 0.95), 3),
+            "p99_ms": round(percentile(latencies, 0.99), 3),
+            "queries": statistics.median_low(queries) if queries else None,
+        }
+
+    def report(self, results, cached):
+        """Write the results as a table"""
+        self.stdout.write(f"List cache: {'on' if cached else 'off'}")
+        self.stdout.write(
+            f"{'endpoint':<28}{'req/s':>9}{'p50 (ms)':>11}{'p95 (ms)':>11}"
+            f"{'p99 (ms)':>11}{'queries':>9}{'errors':>8}"
+        )
+        for name, result in results.items():
+            queries = "-" if result["queries"] is None else result["queries"]
+            self.stdout.write(
+                f"{name:<28}{result['throughput']:>9.1f}"
+                f"{result['p50_ms']:>11.2f}{result['p95_ms']:>11.2f}"
+                f"{result['p99_ms']:>11.2f}{queries:>9}{result['errors']:>8}"
+            )
+
+
+def server_timing_queries(header):
+    """Return the query count of a core.middleware Server-Timing header"""
+    for entry in (header or "").split(","):
+        name, *params = entry.strip().split(";")
+        if name != "db":
+            continue
+        for param in params:
+            if param.startswith("desc="):
+                return int(param[5:].strip('"').split()[0])
+    return None
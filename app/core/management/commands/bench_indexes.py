@@ -0,0 +1,149 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, Max
+
+from core.models import Tag, Ingredient, Recipe
+from core.seed import seed_dataset
+from recipe import filters
+
+# composite indexes of the core models and of the m2m tables, dropped to
+# measure the "before" numbers
+MODEL_INDEXES = (Recipe, Tag, Ingredient)
+M2M_INDEXES = (
+    "recipe_tags_tag_recipe_idx",
+    "recipe_ingredients_ingr_recipe_idx",
+)
+
+
+class Command(BaseCommand):
+    """Django command comparing the hot API queries with and without the
+    composite indexes on a seeded dataset
+
+    Everything runs in a transaction rolled back at the end, the seeded
+    rows and the dropped indexes are never committed. Do not run it on a
+    production database: dropping the indexes locks the tables.
+    """
+    help = "Benchmark the API queries with and without the core indexes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10)
+        parser.add_argument("--recipes", type=int, default=2000,
+                            help="Number of recipes per user")
+        parser.add_argument("--tags", type=int, default=100,
+                            help="Number of tags per user")
+        parser.add_argument("--ingredients", type=int, default=300,
+                            help="Number of ingredients per user")
+        parser.add_argument("--links", type=int, default=4,
+                            help="Tags and ingredients per recipe")
+        parser.add_argument("--page-size", type=int, default=100)
+        parser.add_argument("--repeat", type=int, default=20,
+                            help="Number of runs of each query")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--no-plans", action="store_true",
+                            help="Only print the timings")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user, tag_ids, recipe_ids = self.seed(options)
+            self.analyze()
+            queries = self.hot_queries(
+                user, tag_ids, recipe_ids, options["page_size"]
+            )
+
+            after = self.measure(queries, options["repeat"])
+            self.drop_indexes()
+            self.analyze()
+            before = self.measure(queries, options["repeat"])
+
+            transaction.set_rollback(True)
+
+        self.report(queries, before, after, not options["no_plans"])
+
+    def seed(self, options):
+        """Create the users with their tags, ingredients and recipes and
+        return the first user, their tag ids and recipe ids"""
+        users = seed_dataset(
+            options["users"], options["recipes"], options["tags"],
+            options["ingredients"], options["links"], options["seed"]
+        )
+        user = users[0]
+        tag_ids = list(Tag.objects.filter(user=user).values_list(
+            "pk", flat=True
+        )[:3])
+        recipe_ids = list(Recipe.objects.filter(user=user).values_list(
+            "pk", flat=True
+        ))
+        return user, tag_ids, recipe_ids
+
+    def hot_queries(self, user, tag_ids, recipe_ids, page_size):
+        """Return the queries run by recipe.views, by name"""
+        recipes = Recipe.objects.filter(user=user)
+        tags = Tag.objects.filter(user=user)
+        return {
+            "recipe list": recipes.order_by("-id")[:page_size],
+            "recipe validators": recipes.values("user").annotate(
+                count=Count("pk"), modified_at=Max("modified_at")
+            ),
+            "recipes by tags": filters.filter_related(
+                recipes, "tags", tag_ids
+            ).order_by("-id")[:page_size],
+            "recipes with all tags": filters.filter_related(
+                recipes, "tags", tag_ids, filters.MATCH_ALL
+            ).order_by("-id")[:page_size],
+            "tag list": tags.order_by("-name", "-id")[:page_size],
+            "assigned tags": filters.assigned_only(
+                tags
+            ).order_by("-name", "-id")[:page_size],
+            "recipe tags prefetch": Tag.objects.filter(
+                recipe__in=recipe_ids[:page_size]
+            ),
+        }
+
+    def measure(self, queries, repeat):
+        """Return the plan and median duration in ms of every query"""
+        results = {}
+        for name, queryset in queries.items():
+            durations = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                list(queryset.all())
+                durations.append((time.perf_counter() - start) * 1000)
+            results[name] = (queryset.explain(), statistics.median(durations))
+        return results
+
+    def drop_indexes(self):
+        """Drop the composite indexes of the core tables"""
+        quote = connection.ops.quote_name
+        names = [
+            index.name
+            for model in MODEL_INDEXES
+            for index in model._meta.indexes
+        ]
+        with connection.cursor() as cursor:
+            for name in names + list(M2M_INDEXES):
+                cursor.execute(f"DROP INDEX {quote(name)}")
+
+    def analyze(self):
+        """Refresh the planner statistics of the seeded tables"""
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def report(self, queries, before, after, plans):
+        """Write the timings and plans before and after the indexes"""
+        self.stdout.write(
+            f"{'query':<24}{'before (ms)':>14}{'after (ms)':>14}"
+        )
+        for name in queries:
+            self.stdout.write(
+                f"{name:<24}{before[name][1]:>14.3f}{after[name][1]:>14.3f}"
+            )
+
+        if not plans:
+            return
+        for name in queries:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{name}"))
+            self.stdout.write("before:\n" + before[name][0])
+            self.stdout.write("after:\n" + after[name][0])
@@ -0,0 +1,140 @@
+import io
+import random
+import statistics
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core import fastjson
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+WORDS = (
+    "easy", "creamy", "crème", "brûlée", "chicken", "curry", "lemon", "tart",
+    "spicy", "noodles", "roasted", "salmon", "soup", "chocolate", "cake",
+)
+
+
+class Command(BaseCommand):
+    """Django command comparing the JSON renderers and parsers on recipe
+    payloads
+
+    Each installed library is timed rendering and parsing pages shaped
+    like the API responses: the recipe list, the expanded list with the
+    nested tags and ingredients, and raw rows holding decimals and
+    datetimes. DRF's own renderer and parser are the reference, the
+    "same" column tells if the output is byte identical to theirs.
+    """
+    help = "Benchmark the JSON renderer and parser backends"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipes", type=int, default=1000,
+                            help="Recipes per payload")
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        payloads = self.payloads(options["recipes"], options["seed"])
+        self.stdout.write(
+            f"{'payload':<16}{'backend':<10}{'size (kB)':>11}"
+            f"{'render (ms)':>13}{'parse (ms)':>12}{'same':>6}"
+        )
+        for name, payload in payloads.items():
+            expected = JSONRenderer().render(payload)
+            self.row(name, "drf", expected, options["repeat"],
+                     lambda: JSONRenderer().render(payload),
+                     lambda: JSONParser().parse(io.BytesIO(expected)))
+            for backend in fastjson.BACKENDS:
+                if fastjson.load_backend(backend) is None:
+                    self.stdout.write(f"{name:<16}{backend:<10}"
+                                      "not installed")
+                    continue
+                with override_settings(JSON_BACKEND=backend):
+                    rendered = FastJSONRenderer().render(payload)
+                    self.row(
+                        name, backend, expected, options["repeat"],
+                        lambda: FastJSONRenderer().render(payload),
+                        lambda: FastJSONParser().parse(
+                            io.BytesIO(rendered)
+                        ),
+                        rendered
+                    )
+
+    def payloads(self, count, seed):
+        """Return the payloads, by name"""
+        rng = random.Random(seed)
+        tags = [OrderedDict([("id", i), ("name", rng.choice(WORDS))])
+                for i in range(1, 51)]
+        ingredients = [OrderedDict([("id", i), ("name", rng.choice(WORDS))])
+                       for i in range(1, 151)]
+        modified_at = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+        def recipe(i, expand):
+            recipe_tags = rng.sample(tags, 4)
+            recipe_ingredients = rng.sample(ingredients, 6)
+            if not expand:
+                recipe_tags = [tag["id"] for tag in recipe_tags]
+                recipe_ingredients = [
+                    ingredient["id"] for ingredient in recipe_ingredients
+                ]
+            url = f"http://localhost:8000/media/uploads/recipe/{i:064x}"
+            return OrderedDict([
+                ("id", i),
+                ("title", " ".join(rng.sample(WORDS, 3)).capitalize()),
+                ("price", f"{rng.randint(100, 5000) / 100:.2f}"),
+                ("time_min", rng.randint(5, 180)),
+                ("link", f"https://example.com/recipes/{i}"
+                         if i % 3 else ""),
+                ("ingredients", recipe_ingredients),
+                ("tags", recipe_tags),
+                ("renditions", {
+                    "thumb": f"{url}_thumb.jpg",
+                    "card": f"{url}_card.jpg",
+                }),
+            ])
+
+        return {
+            "recipe list": {
+                "next": "http://localhost:8000/api/recipe/recipes/"
+                        "?cursor=cD0xMjM%3D",
+                "previous": None,
+                "results": [recipe(i, False) for i in range(count)],
+            },
+            "expanded list": [recipe(i, True) for i in range(count)],
+            "raw rows": [
+                {
+                    "id": i,
+                    "title": " ".join(rng.sample(WORDS, 3)),
+                    "price": Decimal(rng.randint(100, 5000)) / 100,
+                    "modified_at": modified_at + timedelta(
+                        seconds=rng.randint(0, 10 ** 8),
+                        microseconds=rng.randint(0, 999999)
+                    ),
+                }
+                for i in range(count)
+            ],
+        }
+
+    def row(self, name, backend, expected, repeat, render, parse,
+            rendered=None):
+        """Write the median timings of a backend on a payload"""
+        rendered = expected if rendered is None else rendered
+        timings = []
+        for function in (render, parse):
+            durations = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                function()
+                durations.append((time.perf_counter() - start) * 1000)
+            timings.append(statistics.median(durations))
+        same = "yes" if rendered == expected else "no"
+        self.stdout.write(
+            f"{name:<16}{backend:<10}{len(rendered) / 1024:>11.1f}"
+            f"{timings[0]:>13.2f}{timings[1]:>12.2f}{same:>6}"
+        )
@@ -0,0 +1,59 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import Recipe, StoredBlob
+from core.renditions import delete_renditions
+
+
+class Command(BaseCommand):
+    """Django command deleting the image blobs no recipe refers to
+
+    Blobs are deleted by batches, each in its own transaction, once their
+    grace period is over. The rows are locked while their files are
+    deleted, an upload of the same content waits for the batch and then
+    writes the file again.
+    """
+    help = "Delete the unreferenced image blobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--grace-hours", type=int,
+                            default=settings.BLOB_GC_GRACE_HOURS,
+                            help="Hours a blob is kept after its last use")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Only count the blobs to delete")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options["grace_hours"])
+        storage = Recipe._meta.get_field("image").storage
+        orphans = StoredBlob.objects.filter(refs=0, released_at__lt=cutoff)
+
+        count = 0
+        last_pk = 0
+        while True:
+            with transaction.atomic():
+                batch = list(orphans.select_for_update(skip_locked=True)
+                             .filter(pk__gt=last_pk)
+                             .order_by("pk")[:options["batch_size"]])
+                if not batch:
+                    break
+                last_pk = batch[-1].pk
+                count += len(batch)
+                if options["dry_run"]:
+                    continue
+
+                StoredBlob.objects.filter(
+                    pk__in=[blob.pk for blob in batch]
+                ).delete()
+                for blob in batch:
+                    storage.delete(blob.name)
+                    delete_renditions(blob.name, storage)
+
+        if options["dry_run"]:
+            self.stdout.write(f"{count} blobs to delete")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{count} blobs deleted"))
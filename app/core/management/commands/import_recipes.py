@@ -0,0 +1,250 @@
+import csv
+import os
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core import fastjson
+from core.bulk import allocate_ids, bulk_get_or_create, bulk_load
+from core.models import Tag, Ingredient, ImportCheckpoint, Recipe
+from core.search import update_search_vectors
+from recipe.cache import bump_user_version
+
+# columns of the imported recipes, validated by their model field
+RECIPE_FIELDS = ("title", "time_min", "price", "link")
+RELATIONS = (("tags", Tag), ("ingredients", Ingredient))
+
+
+def read_records(file, fmt):
+    """Yield the raw records of the file, JSON lines or CSV rows"""
+    if fmt == "csv":
+        yield from csv.DictReader(file)
+    else:
+        for line in file:
+            if line.strip():
+                yield line
+
+
+class NameIds:
+    """In memory name -> id map of the tags or ingredients of a user,
+    the unknown names being fetched or created in batches"""
+
+    def __init__(self, model, user):
+        self.model = model
+        self.user = user
+        self.ids = {}
+
+    def resolve(self, names):
+        """Make sure all the names have an id"""
+        missing = {name for name in names if name not in self.ids}
+        if missing:
+            self.ids.update(bulk_get_or_create(
+                self.model, "name", sorted(missing), user=self.user
+            ))
+
+    def __getitem__(self, name):
+        return self.ids[name]
+
+
+class Command(BaseCommand):
+    """Django command importing the recipes of a user from a large file
+
+    The file is in the format of /api/recipe/recipes/export/: JSON lines
+    or CSV rows with a title, time_min, price, optional link, and the
+    names of the tags and ingredients, created when missing. The other
+    keys are ignored. The records are read in a stream and imported by
+    batches, each in its own transaction, with COPY on PostgreSQL.
+    Invalid records are reported and skipped.
+
+    The progress is saved in an ImportCheckpoint row updated in the
+    transaction of every batch, so it always matches the committed
+    recipes; --resume continues from it after a failure.
+    """
+    help = "Import recipes from a NDJSON or CSV file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="NDJSON or CSV file")
+        parser.add_argument("--user", required=True,
+                            help="Email of the owner of the recipes")
+        parser.add_argument("--format", choices=("ndjson", "csv"),
+                            help="Format of the file, by default csv for a "
+                                 ".csv file and ndjson otherwise")
+        parser.add_argument("--batch-size", type=int, default=5000,
+                            help="Records imported per transaction")
+        parser.add_argument("--checkpoint",
+                            help="Name of the checkpoint, by default the "
+                                 "absolute path of the file")
+        parser.add_argument("--resume", action="store_true",
+                            help="Continue from the checkpoint")
+        parser.add_argument("--skip-search-vectors", action="store_true")
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options["user"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"Unknown user {options['user']}")
+        path = options["path"]
+        fmt = options["format"] or (
+            "csv" if path.lower().endswith(".csv") else "ndjson"
+        )
+        checkpoint = self.get_checkpoint(
+            options["checkpoint"] or os.path.abspath(path), user,
+            options["resume"]
+        )
+        self.fields = {
+            name: Recipe._meta.get_field(name) for name in RECIPE_FIELDS
+        }
+        self.names = {
+            relation: NameIds(model, user) for relation, model in RELATIONS
+        }
+
+        start = time.perf_counter()
+        imported = 0
+        with open(path, encoding="utf-8", newline="") as file:
+            records = enumerate(read_records(file, fmt), start=1)
+            # the records of the committed batches are read, not parsed
+            for _ in islice(records, checkpoint.records):
+                pass
+            while True:
+                batch = list(islice(records, options["batch_size"]))
+                if not batch:
+                    break
+                recipes = []
+                errors = 0
+                for number, record in batch:
+                    try:
+                        recipes.append(self.clean(record, fmt))
+                    except ValidationError as error:
+                        errors += 1
+                        self.stderr.write(f"Record {number}: {error}")
+                imported += len(recipes)
+                self.load_batch(user, recipes, batch[-1][0], errors,
+                                checkpoint, options["skip_search_vectors"])
+
+                elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f"{checkpoint.records} records, {checkpoint.imported} "
+                    f"recipes imported, {checkpoint.errors} skipped in "
+                    f"{elapsed:.1f}s ({imported / elapsed:.0f} recipes/s)"
+                )
+
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+        checkpoint.delete()
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {checkpoint.imported} recipes, skipped "
+            f"{checkpoint.errors} invalid records"
+        ))
+
+    def get_checkpoint(self, name, user, resume):
+        """Return the checkpoint of the import, created unless resuming"""
+        checkpoint = ImportCheckpoint.objects.filter(name=name).first()
+        if checkpoint is None:
+            if resume:
+                raise CommandError(f"No checkpoint {name} to resume from")
+            return ImportCheckpoint.objects.create(name=name, user=user)
+        if not resume:
+            raise CommandError(
+                f"A previous import left the checkpoint {name}, pass "
+                f"--resume to continue it or delete the checkpoint"
+            )
+        if checkpoint.user_id != user.pk:
+            raise CommandError(
+                f"The checkpoint {name} imports the recipes of another user"
+            )
+        self.stdout.write(f"Resuming after {checkpoint.records} records")
+        return checkpoint
+
+    def clean(self, record, fmt):
+        """Return the validated recipe of a record, raising a
+        ValidationError if it is invalid"""
+        if fmt == "csv":
+            # the names are JSON arrays, like in the export
+            record = dict(record)
+            for relation, _ in RELATIONS:
+                try:
+                    record[relation] = fastjson.loads(
+                        record.get(relation) or "[]"
+                    )
+                except ValueError as error:
+                    raise ValidationError(
+                        f"Invalid JSON in {relation}: {error}"
+                    )
+        else:
+            try:
+                record = fastjson.loads(record)
+            except ValueError as error:
+                raise ValidationError(f"Invalid JSON: {error}")
+            if not isinstance(record, dict):
+                raise ValidationError("Expected a JSON object")
+
+        recipe = {}
+        errors = {}
+        for name, field in self.fields.items():
+            value = record.get(name)
+            if value is None and field.blank:
+                value = ""
+            try:
+                recipe[name] = field.clean(value, None)
+            except ValidationError as error:
+                errors[name] = error.messages
+        for relation, model in RELATIONS:
+            names = record.get(relation) or []
+            if not isinstance(names, list) or not all(
+                    isinstance(name, str) for name in names):
+                errors[relation] = ["Expected a list of names."]
+                continue
+            max_length = model._meta.get_field("name").max_length
+            names = [name.strip() for name in names if name.strip()]
+            if any(len(name) > max_length for name in names):
+                errors[relation] = [
+                    f"Names longer than {max_length} characters."
+                ]
+            recipe[relation] = list(dict.fromkeys(names))
+        if errors:
+            raise ValidationError(errors)
+        return recipe
+
+    def load_batch(self, user, recipes, records, errors, checkpoint,
+                   skip_vectors):
+        """Insert a batch of recipes with their relations and save the
+        progress in the same transaction, the batch ending at the record
+        number `records` and holding `errors` invalid records"""
+        with transaction.atomic():
+            for relation, _ in RELATIONS:
+                self.names[relation].resolve(
+                    name for recipe in recipes for name in recipe[relation]
+                )
+            recipe_ids = allocate_ids(Recipe, len(recipes))
+            bulk_load(Recipe, ("id", "user") + RECIPE_FIELDS, [
+                (recipe_id, user.pk) +
+                tuple(recipe[name] for name in RECIPE_FIELDS)
+                for recipe_id, recipe in zip(recipe_ids, recipes)
+            ])
+            for relation, model in RELATIONS:
+                target = model._meta.model_name
+                names = self.names[relation]
+                bulk_load(
+                    getattr(Recipe, relation).through, ("recipe", target), [
+                        (recipe_id, names[name])
+                        for recipe_id, recipe in zip(recipe_ids, recipes)
+                        for name in recipe[relation]
+                    ]
+                )
+            if not skip_vectors:
+                update_search_vectors(recipe_ids)
+            ImportCheckpoint.objects.filter(pk=checkpoint.pk).update(
+                records=records,
+                imported=checkpoint.imported + len(recipes),
+                errors=checkpoint.errors + errors,
+                updated_at=timezone.now(),
+            )
+        checkpoint.refresh_from_db()
+        # the rows are inserted without sending the model signals
+        bump_user_version(user.pk)
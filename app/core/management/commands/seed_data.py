@@ -0,0 +1,69 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.seed import seed_dataset
+
+
+class Command(BaseCommand):
+    """Django command generating a synthetic dataset at scale
+
+    The rows are generated by core.seed.seed_dataset from `--seed`, the
+    same options always give the same dataset. Every user gets the same
+    password. The rows are loaded with COPY on PostgreSQL and batched
+    INSERTs elsewhere, by chunks of users each committed in its own
+    transaction. No signal is sent, so the caches and blob counts are not
+    updated; the search vectors are computed per chunk unless
+    --skip-search-vectors is given.
+    """
+    help = "Load a large synthetic dataset of users and recipes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--recipes", type=int, default=100,
+                            help="Number of recipes per user")
+        parser.add_argument("--tags", type=int, default=20,
+                            help="Number of tags per user")
+        parser.add_argument("--ingredients", type=int, default=60,
+                            help="Number of ingredients per user")
+        parser.add_argument("--links", type=int, default=4,
+                            help="Tags and ingredients per recipe")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--prefix", default="seed",
+                            help="Start of the user emails")
+        parser.add_argument("--password", default="seed-password",
+                            help="Password of every user")
+        parser.add_argument("--batch-size", type=int, default=50000,
+                            help="Rows loaded per COPY or INSERT batch")
+        parser.add_argument("--skip-search-vectors", action="store_true")
+
+    def handle(self, *args, **options):
+        self.start = time.perf_counter()
+        self.users = options["users"]
+        self.rows = 0
+        seed_dataset(
+            options["users"], options["recipes"], options["tags"],
+            options["ingredients"], options["links"], options["seed"],
+            prefix=options["prefix"], password=options["password"],
+            batch_size=options["batch_size"],
+            search_vectors=not options["skip_search_vectors"],
+            progress=self.progress
+        )
+
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+        self.stdout.write(self.style.SUCCESS(
+            f"Loaded {self.rows} rows in "
+            f"{time.perf_counter() - self.start:.1f}s"
+        ))
+
+    def progress(self, users, rows):
+        """Write the progress after each chunk of users"""
+        self.rows = rows
+        elapsed = time.perf_counter() - self.start
+        self.stdout.write(
+            f"{users}/{self.users} users, {rows} rows "
+            f"in {elapsed:.1f}s ({rows / elapsed:.0f} rows/s)"
+        )
@@ -1,21 +1,49 @@
 import time
 
-from django.db import connections
+from django.db import DEFAULT_DB_ALIAS, connections
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 class Command(BaseCommand):
-    """Django command to pause execution until database is available"""
-    
-    def handle(self, *args, **kwargs):
+    """Django command to pause execution until database is available
+
+    The database is only considered available once a connection is opened
+    and answers a query. Attempts are retried with an exponential backoff
+    until the timeout, then the command fails with a non-zero exit code.
+    """
+    help = "Wait until the database accepts connections"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+        parser.add_argument("--timeout", type=float, default=60,
+                            help="Seconds to wait before giving up")
+        parser.add_argument("--delay", type=float, default=0.1,
+                            help="Seconds to wait after the first failure")
+        parser.add_argument("--max-delay", type=float, default=5,
+                            help="Longest wait between two attempts")
+
+    def handle(self, *args, **options):
         self.stdout.write("Waiting for database...")
-        db_conn = None
-        while not db_conn:
+        connection = connections[options["database"]]
+        deadline = time.monotonic() + options["timeout"]
+        delay = options["delay"]
+        while True:
             try:
-                db_conn = connections["default"]
-            except OperationalError:
-                self.stdout.write("Database unavailable, waiting 1 second...")
-                time.sleep(1)
-                
+                connection.ensure_connection()
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                break
+            except OperationalError as exc:
+                # drop the broken connection, the next attempt opens a new one
+                connection.close()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(f"Database unavailable: {exc}")
+                delay = min(delay, options["max_delay"], remaining)
+                self.stdout.write(
+                    f"Database unavailable, waiting {delay:g} seconds..."
+                )
+                time.sleep(delay)
+                delay *= 2
+
         self.stdout.write(self.style.SUCCESS("Database avalaible!"))
-    
\ No newline at end of file
@@ -0,0 +1,140 @@
+import bisect
+import threading
+
+from core.db.pool import _pools
+
+# upper bounds of the histogram buckets, the +Inf bucket is implicit
+SECONDS_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+# name, help text and buckets of the request histograms
+REQUEST_HISTOGRAMS = (
+    ("api_request_duration_seconds", "Time spent in the request",
+     SECONDS_BUCKETS),
+    ("api_request_view_seconds", "Time spent in the view",
+     SECONDS_BUCKETS),
+    ("api_request_render_seconds", "Time spent rendering the response",
+     SECONDS_BUCKETS),
+    ("api_request_db_seconds", "Time spent running SQL queries",
+     SECONDS_BUCKETS),
+    ("api_request_queries", "Number of SQL queries", COUNT_BUCKETS),
+)
+
+
+class Histogram:
+    """Cumulative histogram in the Prometheus sense, observations are only
+    counted in their bucket, the cumulative counts are computed on export"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def samples(self):
+        """Yield the le label and cumulative count of each bucket"""
+        total = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            total += count
+            yield bound, total
+
+
+class RequestMetrics:
+    """Per process histograms of the requests, labelled by view name and
+    method
+
+    The label values are the names of the URL patterns, never the paths,
+    so the number of series is bounded by the routes of the project.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._responses = {}
+
+    def record(self, view, method, status, timings):
+        """Add the `timings` of a request, keyed by histogram name"""
+        labels = (view, method)
+        with self._lock:
+            histograms = self._histograms.get(labels)
+            if histograms is None:
+                histograms = self._histograms[labels] = {
+                    name: Histogram(buckets)
+                    for name, _, buckets in REQUEST_HISTOGRAMS
+                }
+            for name, value in timings.items():
+                histograms[name].observe(value)
+            key = (view, method, f"{status // 100}xx")
+            self._responses[key] = self._responses.get(key, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._responses.clear()
+
+    def render(self):
+        """Return the metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            lines += [
+                "# HELP api_responses_total Responses by status class",
+                "# TYPE api_responses_total counter",
+            ]
+            for (view, method, status), count in sorted(
+                    self._responses.items()):
+                lines.append(
+                    f'api_responses_total{{view="{view}",method="{method}",'
+                    f'status="{status}"}} {count}'
+                )
+            for name, help_text, _ in REQUEST_HISTOGRAMS:
+                lines += [
+                    f"# HELP {name} {help_text}",
+                    f"# TYPE {name} histogram",
+                ]
+                for (view, method), histograms in sorted(
+                        self._histograms.items()):
+                    labels = f'view="{view}",method="{method}"'
+                    histogram = histograms[name]
+                    for bound, count in histogram.samples():
+                        lines.append(
+                            f'{name}_bucket{{{labels},le="{bound}"}} {count}'
+                        )
+                    lines.append(
+                        f"{name}_sum{{{labels}}} {round(histogram.sum, 6)}"
+                    )
+                    lines.append(f"{name}_count{{{labels}}} {count}")
+        lines += pool_metrics()
+        return "\n".join(lines) + "\n"
+
+
+def pool_metrics():
+    """Return the Prometheus lines of the connection pools"""
+    if not _pools:
+        return []
+    lines = [
+        "# HELP db_pool_connections Connections of the pool by state",
+        "# TYPE db_pool_connections gauge",
+    ]
+    stats = {alias: pool.stats() for alias, pool in sorted(_pools.items())}
+    for alias, pool_stats in stats.items():
+        for state in ("idle", "in_use"):
+            lines.append(
+                f'db_pool_connections{{alias="{alias}",state="{state}"}} '
+                f'{pool_stats[state]}'
+            )
+    for name in ("checkouts", "waits", "timeouts"):
+        lines += [f"# TYPE db_pool_{name}_total counter"]
+        lines += [
+            f'db_pool_{name}_total{{alias="{alias}"}} {pool_stats[name]}'
+            for alias, pool_stats in stats.items()
+        ]
+    return lines
+
+
+# metrics of this process, recorded by core.middleware.MetricsMiddleware
+request_metrics = RequestMetrics()
@@ -0,0 +1,139 @@
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from core.metrics import request_metrics
+
+
+class QueryTimer:
+    """Database execute wrapper counting the queries and their duration"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+@contextmanager
+def timed_queries(timer):
+    """Run the queries of every database connection through `timer`"""
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(timer))
+        yield
+
+
+class MetricsMiddleware:
+    """Record the SQL queries and the view and render times of each request
+
+    The timings are sent in a Server-Timing header and added to the
+    histograms of core.metrics, exposed by the /metrics endpoint. The view
+    time includes its queries, the render time is the serialization of the
+    response by its renderer. Disabled by METRICS_ENABLED.
+
+    The content of a streaming response is read after the middleware
+    returns, its queries are counted as it is consumed and the request is
+    recorded once it is closed. The Server-Timing header is sent before
+    the content, so it only covers the view.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        timer = QueryTimer()
+        request._metrics = timings = {}
+        with timed_queries(timer):
+            response = self.get_response(request)
+        end = time.perf_counter()
+        view_start = timings.pop("view_start", None)
+        if view_start is not None:
+            # responses which are not rendered, the view ends with them
+            timings["api_request_view_seconds"] = end - view_start
+
+        match = request.resolver_match
+        view = match.view_name if match else "unmatched"
+        if view == "metrics":
+            return response
+        timings.update(
+            api_request_duration_seconds=end - start,
+            api_request_db_seconds=timer.duration,
+            api_request_queries=timer.count,
+        )
+        response["Server-Timing"] = server_timing(timings, timer.count)
+        if response.streaming:
+            response.streaming_content = self.streamed(
+                response.streaming_content, timer, start,
+                view, request.method, response.status_code, timings
+            )
+        else:
+            request_metrics.record(view, request.method,
+                                   response.status_code, timings)
+        return response
+
+    def streamed(self, content, timer, start, view, method, status,
+                 timings):
+        """Yield the content of a streaming response, then record the
+        request with the queries run while it was read"""
+        try:
+            # the WSGI servers read it in the request thread
+            with timed_queries(timer):
+                yield from content
+        finally:
+            timings.update(
+                api_request_duration_seconds=time.perf_counter() - start,
+                api_request_db_seconds=timer.duration,
+                api_request_queries=timer.count,
+            )
+            request_metrics.record(view, method, status, timings)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics["view_start"] = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # called after the view, right before the response is rendered
+        timings = request._metrics
+        render_start = time.perf_counter()
+        timings["api_request_view_seconds"] = (
+            render_start - timings.pop("view_start")
+        )
+
+        def rendered(response):
+            timings["api_request_render_seconds"] = (
+                time.perf_counter() - render_start
+            )
+
+        response.add_post_render_callback(rendered)
+        return response
+
+
+def server_timing(timings, queries):
+    """Return the Server-Timing header value of the request `timings`"""
+    metrics = (
+        ("db", "api_request_db_seconds", f"{queries} queries"),
+        ("view", "api_request_view_seconds", None),
+        ("render", "api_request_render_seconds", None),
+        ("total", "api_request_duration_seconds", None),
+    )
+    entries = []
+    for name, key, description in metrics:
+        if key not in timings:
+            continue
+        entry = f"{name};dur={timings[key] * 1000:.2f}"
+        if description:
+            entry += f';desc="{description}"'
+        entries.append(entry)
+    return ", ".join(entries)
@@ -0,0 +1,48 @@
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicates(apps, schema_editor):
+    """Merge the tags and ingredients sharing a name for the same user
+
+    The row with the lowest id is kept and the recipes linked to the
+    duplicates are moved to it.
+    """
+    Recipe = apps.get_model("core", "Recipe")
+    for model_name, relation in (("Tag", "tags"),
+                                 ("Ingredient", "ingredients")):
+        model = apps.get_model("core", model_name)
+        through = getattr(Recipe, relation).through
+        column = f"{model_name.lower()}_id"
+
+        duplicates = model.objects.values("user_id", "name").annotate(
+            keep=Min("id"), count=Count("id")
+        ).filter(count__gt=1)
+        for duplicate in duplicates:
+            keep = duplicate["keep"]
+            merged = list(model.objects.filter(
+                user_id=duplicate["user_id"], name=duplicate["name"]
+            ).exclude(id=keep).values_list("id", flat=True))
+
+            linked = set(through.objects.filter(
+                **{column: keep}
+            ).values_list("recipe_id", flat=True))
+            for row in through.objects.filter(**{f"{column}__in": merged}):
+                if row.recipe_id in linked:
+                    row.delete()
+                else:
+                    setattr(row, column, keep)
+                    row.save()
+                    linked.add(row.recipe_id)
+            model.objects.filter(id__in=merged).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_recipe_modified_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 2.1.15 on 2026-10-18 04:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_unique_names'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['user', '-id'], name='recipe_user_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['user', 'modified_at'], name='recipe_user_modified_idx'),
+        ),
+        # reverse lookups of the auto-created m2m tables (recipes of a
+        # tag, tags assigned to a recipe) served by the index only
+        migrations.RunSQL(
+            ['CREATE INDEX recipe_tags_tag_recipe_idx '
+             'ON core_recipe_tags (tag_id, recipe_id)'],
+            ['DROP INDEX recipe_tags_tag_recipe_idx'],
+        ),
+        migrations.RunSQL(
+            ['CREATE INDEX recipe_ingredients_ingr_recipe_idx '
+             'ON core_recipe_ingredients (ingredient_id, recipe_id)'],
+            ['DROP INDEX recipe_ingredients_ingr_recipe_idx'],
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 2.1.15 on 2026-10-18 04:46
+
+import core.models
+import core.storage
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_image_refs(apps, schema_editor):
+    """Create the blobs of the images already uploaded"""
+    Recipe = apps.get_model('core', 'Recipe')
+    StoredBlob = apps.get_model('core', 'StoredBlob')
+    db_alias = schema_editor.connection.alias
+
+    images = Recipe.objects.using(db_alias).exclude(image__isnull=True) \
+        .exclude(image='').order_by().values('image').annotate(refs=Count('pk'))
+    StoredBlob.objects.using(db_alias).bulk_create([
+        StoredBlob(name=row['image'], refs=row['refs'])
+        for row in images
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.BigIntegerField(null=True)),
+                ('refs', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('released_at', models.DateTimeField(null=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(null=True, storage=core.storage.ContentAddressedStorage(), upload_to=core.models.recipe_image_file_path),
+        ),
+        migrations.AddIndex(
+            model_name='storedblob',
+            index=models.Index(fields=['refs', 'released_at'], name='storedblob_released_idx'),
+        ),
+        migrations.RunPython(count_image_refs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 2.1.15 on 2026-10-18 05:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+from core.renditions import rendition_name
+
+
+def record_ready_renditions(apps, schema_editor):
+    """Record the renditions already written for the uploaded images"""
+    Recipe = apps.get_model('core', 'Recipe')
+    db_alias = schema_editor.connection.alias
+    storage = Recipe._meta.get_field('image').storage
+
+    recipes = Recipe.objects.using(db_alias)
+    names = recipes.exclude(image__isnull=True).exclude(image='') \
+        .order_by().values_list('image', flat=True).distinct()
+    for name in list(names):
+        ready = [
+            rendition for rendition in settings.RECIPE_IMAGE_RENDITIONS
+            if storage.exists(rendition_name(name, rendition))
+        ]
+        if ready:
+            recipes.filter(image=name).update(ready_renditions=','.join(ready))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_user_tokens_valid_after'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ready_renditions',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(record_ready_renditions, migrations.RunPython.noop),
+    ]
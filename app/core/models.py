@@ -2,12 +2,19 @@ import uuid
 import os
 
 from django.db import models
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager,\
                                         PermissionsMixin
 from django.conf import settings
 
+from core.storage import ContentAddressedStorage
+
 def recipe_image_file_path(instance, filename):
-    """Generate file path for new recipe image"""
+    """Generate file path for new recipe image
+
+    ContentAddressedStorage then replaces the file name by the digest of
+    the image, keeping the directory and the extension.
+    """
     ext = filename.split(".")[-1]
     filename = f"{uuid.uuid4()}.{ext}"
     
@@ -39,6 +46,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # signed access tokens issued before are rejected, see user.tokens
+    tokens_valid_after = models.DateTimeField(null=True, blank=True)
 
     objects = UserManager()
     # by default it's settle to username but we force it to email
@@ -52,6 +61,16 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL, # get the User class specified in the settings.py
         on_delete=models.CASCADE
     )
+
+    class Meta:
+        unique_together = (("user", "name"),)
+        indexes = [
+            # keyset pagination of the user's tags on (name, id)
+            models.Index(
+                fields=["user", "name", "id"],
+                name="tag_user_name_id_idx"
+            ),
+        ]
     
     def __str__(self):
         return self.name
@@ -64,6 +83,16 @@ class Ingredient(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+
+    class Meta:
+        unique_together = (("user", "name"),)
+        indexes = [
+            # keyset pagination of the user's ingredients on (name, id)
+            models.Index(
+                fields=["user", "name", "id"],
+                name="ingredient_user_name_id_idx"
+            ),
+        ]
     
     def __str__(self):
         return self.name
@@ -82,7 +111,73 @@ class Recipe(models.Model):
     )
     ingredients = models.ManyToManyField(Ingredient, related_name="recipe")
     tags = models.ManyToManyField(Tag, related_name="recipe")
-    image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image = models.ImageField(
+        null=True,
+        upload_to=recipe_image_file_path,
+        storage=ContentAddressedStorage()
+    )
+    # comma separated renditions written for the current image, set by
+    # core.signals so the URLs are built without asking the storage
+    ready_renditions = models.CharField(
+        max_length=255, blank=True, default="", editable=False
+    )
+    # updated on field changes, and by core.signals on relation changes
+    modified_at = models.DateTimeField(auto_now=True)
+    # weighted title, tag and ingredient names, maintained by core.search
+    # on PostgreSQL and left empty on other databases
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # user's recipes from the newest, as listed by the API
+            models.Index(fields=["user", "-id"], name="recipe_user_id_idx"),
+            # count and last modification used by the conditional GETs
+            models.Index(
+                fields=["user", "modified_at"],
+                name="recipe_user_modified_idx"
+            ),
+        ]
     
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.title
+
+
+class StoredBlob(models.Model):
+    """File of the content addressed storage, with the number of recipes
+    referring to it"""
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField(null=True)
+    refs = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # when the last reference went away, the gc_blobs command deletes the
+    # blob once its grace period is over
+    released_at = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["refs", "released_at"],
+                name="storedblob_released_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class ImportCheckpoint(models.Model):
+    """Progress of an import_recipes run, updated in the transaction of
+    each batch so it never disagrees with the imported rows"""
+    name = models.CharField(max_length=255, unique=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE
+    )
+    # records of the file read, recipes imported and invalid records
+    records = models.PositiveIntegerField(default=0)
+    imported = models.PositiveIntegerField(default=0)
+    errors = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
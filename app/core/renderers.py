@@ -0,0 +1,27 @@
+from rest_framework.renderers import JSONRenderer
+
+from core import fastjson
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSON renderer writing with the library selected by JSON_BACKEND
+
+    The output is the compact UTF-8 JSON of DRF's JSONRenderer, dates and
+    decimals included. Indented responses, asked by the browsable API or
+    an `indent` media type parameter, are left to DRF.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+
+        ret = fastjson.dumps(data)
+        # like DRF, escape the separators that are invalid in JavaScript
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028") \
+                .replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
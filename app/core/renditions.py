@@ -0,0 +1,133 @@
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.db import connections
+from django.dispatch import Signal
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# sent once the renditions of a recipe image are written
+renditions_ready = Signal(providing_args=["instance"])
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def rendition_name(name, rendition):
+    """Return the storage name of a rendition, next to the original"""
+    root, _ = os.path.splitext(name)
+    return f"{root}_{rendition}.jpg"
+
+
+def render_renditions(source, targets, quality):
+    """Write the resized JPEG copies of the image at `source`
+
+    `targets` is a list of (path, (width, height)) pairs. Runs in a worker
+    process, so it only depends on Pillow and the file system. Each copy
+    is written to a temporary file first and then moved in place, so a
+    rendition is either missing or complete.
+    """
+    with Image.open(source) as image:
+        image.load()
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        for path, size in targets:
+            copy = image.copy()
+            copy.thumbnail(size, Image.LANCZOS)
+            tmp = f"{path}.tmp"
+            copy.save(tmp, "JPEG", quality=quality, optimize=True,
+                      progressive=True)
+            os.replace(tmp, path)
+
+
+def queue_renditions(recipe):
+    """Create the renditions of the recipe image in the worker pool
+
+    The image must be saved on a storage backed by the local file system.
+    With RECIPE_IMAGE_WORKERS set to 0 the renditions are created in the
+    calling thread, which is what the tests use.
+    """
+    storage = recipe.image.storage
+    targets = [
+        (storage.path(rendition_name(recipe.image.name, rendition)), size)
+        for rendition, size in settings.RECIPE_IMAGE_RENDITIONS.items()
+    ]
+    args = (storage.path(recipe.image.name), targets,
+            settings.RECIPE_IMAGE_QUALITY)
+
+    if all(os.path.exists(path) for path, _ in targets):
+        # same content uploaded before, the renditions are already there
+        renditions_ready.send(sender=type(recipe), instance=recipe)
+        return None
+
+    if settings.RECIPE_IMAGE_WORKERS <= 0:
+        try:
+            render_renditions(*args)
+        except Exception:
+            logger.exception("Renditions of recipe %s failed", recipe.pk)
+            return None
+        renditions_ready.send(sender=type(recipe), instance=recipe)
+        return None
+
+    future = _get_executor().submit(render_renditions, *args)
+    future.add_done_callback(
+        partial(_renditions_done, recipe, threading.get_ident())
+    )
+    return future
+
+
+def rendition_urls(recipe):
+    """Return the {rendition: url} map of the renditions already written"""
+    if not recipe.image:
+        return {}
+    return stored_rendition_urls(
+        recipe.image.name, recipe.ready_renditions, recipe.image.storage
+    )
+
+
+def stored_rendition_urls(name, ready, storage):
+    """Return the {rendition: url} map of the `ready` renditions, as
+    stored in Recipe.ready_renditions, of the image stored under `name`"""
+    ready = ready.split(",")
+    return {
+        rendition: storage.url(rendition_name(name, rendition))
+        for rendition in settings.RECIPE_IMAGE_RENDITIONS
+        if rendition in ready
+    }
+
+
+def delete_renditions(name, storage):
+    """Delete the renditions of the image stored under `name`"""
+    for rendition in settings.RECIPE_IMAGE_RENDITIONS:
+        storage.delete(rendition_name(name, rendition))
+
+
+def _get_executor():
+    """Return the process pool, created on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.RECIPE_IMAGE_WORKERS
+            )
+        return _executor
+
+
+def _renditions_done(recipe, caller, future):
+    """Signal the renditions are ready, from the pool management thread"""
+    try:
+        future.result()
+    except Exception:
+        logger.exception("Renditions of recipe %s failed", recipe.pk)
+        return
+    try:
+        renditions_ready.send(sender=type(recipe), instance=recipe)
+    finally:
+        # the callback runs in the caller when the future is already done
+        if threading.get_ident() != caller:
+            connections.close_all()
@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.db import connections, router
+
+from core.models import Tag, Ingredient, Recipe
+
+
+def search_enabled(using=None):
+    """Return True if the database stores the recipe search vectors"""
+    using = using or router.db_for_write(Recipe)
+    return connections[using].vendor == "postgresql"
+
+
+def update_search_vectors(recipe_ids=None, using=None):
+    """Recompute the search vector of the recipes, or of all of them when
+    `recipe_ids` is None
+
+    The title is weighted A and the tag and ingredient names B, so a match
+    in the title ranks first. Only PostgreSQL stores the vectors, on other
+    databases the search is computed at query time and this is a no-op.
+    """
+    using = using or router.db_for_write(Recipe)
+    if not search_enabled(using) or recipe_ids == []:
+        return
+
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    recipe_table = quote(Recipe._meta.db_table)
+
+    def names(model, through):
+        """Return the SQL of the names linked to the updated recipe"""
+        return (
+            f"SELECT string_agg(n.{quote('name')}, ' ') "
+            f"FROM {quote(model._meta.db_table)} n "
+            f"JOIN {quote(through._meta.db_table)} r "
+            f"ON r.{quote(model._meta.model_name + '_id')} = n.{quote('id')} "
+            f"WHERE r.{quote('recipe_id')} = {recipe_table}.{quote('id')}"
+        )
+
+    sql = (
+        f"UPDATE {recipe_table} SET {quote('search_vector')} = "
+        f"setweight(to_tsvector(%s::regconfig, "
+        f"coalesce({quote('title')}, '')), 'A') || "
+        f"setweight(to_tsvector(%s::regconfig, coalesce(("
+        f"{names(Tag, Recipe.tags.through)}), '')), 'B') || "
+        f"setweight(to_tsvector(%s::regconfig, coalesce(("
+        f"{names(Ingredient, Recipe.ingredients.through)}), '')), 'B')"
+    )
+    config = settings.RECIPE_SEARCH_CONFIG
+    params = [config, config, config]
+    if recipe_ids is not None:
+        sql += f" WHERE {quote('id')} = ANY(%s)"
+        params.append(list(recipe_ids))
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
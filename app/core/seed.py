@@ -0,0 +1,155 @@
+import random
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from core.bulk import allocate_ids, bulk_load
+from core.models import Tag, Ingredient, Recipe
+from core.search import update_search_vectors
+
+TAG_NAMES = (
+    "Vegan", "Vegetarian", "Gluten free", "Dessert", "Breakfast", "Lunch",
+    "Dinner", "Snack", "Quick", "Spicy", "Healthy", "Comfort food",
+    "Italian", "French", "Mexican", "Indian", "Japanese", "Thai",
+    "Chinese", "Greek", "Barbecue", "Soup", "Salad", "Baking", "Drink",
+    "Kids", "Party", "Budget", "Low carb", "Seasonal",
+)
+INGREDIENT_NAMES = (
+    "Salt", "Pepper", "Olive oil", "Butter", "Garlic", "Onion", "Shallot",
+    "Tomato", "Potato", "Carrot", "Zucchini", "Eggplant", "Bell pepper",
+    "Spinach", "Mushroom", "Lemon", "Lime", "Apple", "Banana", "Strawberry",
+    "Flour", "Sugar", "Brown sugar", "Honey", "Egg", "Milk", "Cream",
+    "Yogurt", "Parmesan", "Mozzarella", "Feta", "Cheddar", "Rice", "Pasta",
+    "Noodles", "Bread", "Chicken", "Beef", "Pork", "Lamb", "Salmon", "Tuna",
+    "Shrimp", "Tofu", "Chickpeas", "Lentils", "Black beans", "Coconut milk",
+    "Soy sauce", "Ginger", "Cumin", "Paprika", "Curry powder", "Cinnamon",
+    "Vanilla", "Chocolate", "Basil", "Parsley", "Coriander", "Thyme",
+)
+ADJECTIVES = (
+    "Easy", "Creamy", "Crispy", "Spicy", "Roasted", "Grilled", "Classic",
+    "Homemade", "Quick", "Slow cooked", "Smoky", "Fresh", "Sweet", "Tangy",
+)
+DISHES = (
+    "soup", "salad", "curry", "stew", "pie", "tart", "risotto", "pasta",
+    "stir fry", "bowl", "burger", "tacos", "gratin", "cake", "pancakes",
+)
+
+
+def unique_names(vocabulary, count, rng):
+    """Return `count` distinct names, the vocabulary in a random order then
+    numbered once it is exhausted"""
+    names = list(vocabulary)
+    rng.shuffle(names)
+    return [
+        names[i % len(names)] + (f" {i // len(names) + 1}"
+                                 if i >= len(names) else "")
+        for i in range(count)
+    ]
+
+
+def seed_dataset(users, recipes, tags, ingredients, links, seed=0,
+                 prefix=None, password=None, batch_size=50000,
+                 search_vectors=True, progress=None):
+    """Create `users` users, each with its tags, ingredients and recipes
+    linked to `links` random tags and ingredients, and return the users
+
+    The rows are generated from `seed`, the same arguments always give the
+    same dataset. The emails start with `prefix`, random by default so
+    that several datasets can be seeded in the same database. Every user
+    gets `password`, hashed once, unusable by default.
+
+    The rows are loaded with COPY on PostgreSQL and batched INSERTs
+    elsewhere, by chunks of users each in its own transaction; after
+    every chunk `progress` is called with the number of users and rows
+    loaded so far. No signal is sent, so the caches and blob counts are
+    not updated.
+    """
+    rng = random.Random(seed)
+    prefix = prefix or f"bench-{uuid.uuid4().hex[:8]}"
+    password = make_password(password)
+    rows_per_user = recipes * (1 + 2 * links) + tags + ingredients + 1
+    chunk = max(1, batch_size // rows_per_user)
+
+    user_ids = []
+    total = 0
+    for first in range(0, users, chunk):
+        indexes = range(first, min(first + chunk, users))
+        with transaction.atomic():
+            ids, rows = _load_users(
+                rng, indexes, prefix, password, recipes, tags, ingredients,
+                links, batch_size, search_vectors
+            )
+        user_ids += ids
+        total += rows
+        if progress is not None:
+            progress(len(user_ids), total)
+    return get_user_model().objects.filter(pk__in=user_ids).order_by("pk")
+
+
+def _load_users(rng, indexes, prefix, password, recipes, tags, ingredients,
+                links, batch_size, search_vectors):
+    """Load a chunk of users with all their rows, return the ids of the
+    users and the number of rows loaded"""
+    links = min(links, tags, ingredients)
+    user_ids = allocate_ids(get_user_model(), len(indexes))
+    bulk_load(get_user_model(), ("id", "email", "name", "password"), [
+        (user_id, f"{prefix}-{index}@example.com", f"User {index}", password)
+        for user_id, index in zip(user_ids, indexes)
+    ])
+
+    tag_rows, ingredient_rows, recipe_rows = [], [], []
+    recipe_tags, recipe_ingredients = [], []
+    tag_ids = iter(allocate_ids(Tag, len(user_ids) * tags))
+    ingredient_ids = iter(
+        allocate_ids(Ingredient, len(user_ids) * ingredients)
+    )
+    recipe_ids = allocate_ids(Recipe, len(user_ids) * recipes)
+    next_recipe_id = iter(recipe_ids)
+    for user_id in user_ids:
+        user_tags = [
+            (next(tag_ids), user_id, name)
+            for name in unique_names(TAG_NAMES, tags, rng)
+        ]
+        user_ingredients = [
+            (next(ingredient_ids), user_id, name)
+            for name in unique_names(INGREDIENT_NAMES, ingredients, rng)
+        ]
+        tag_rows += user_tags
+        ingredient_rows += user_ingredients
+        for _ in range(recipes):
+            recipe_id = next(next_recipe_id)
+            main = rng.choice(user_ingredients) if user_ingredients else None
+            title = f"{rng.choice(ADJECTIVES)} {rng.choice(DISHES)}"
+            if main:
+                title += f" with {main[2].lower()}"
+            cents = rng.randint(100, 5000)
+            recipe_rows.append((
+                recipe_id, user_id, title, rng.randint(5, 180),
+                f"{cents // 100}.{cents % 100:02d}",
+            ))
+            recipe_tags += [
+                (recipe_id, tag[0]) for tag in rng.sample(user_tags, links)
+            ]
+            recipe_ingredients += [
+                (recipe_id, ingredient[0])
+                for ingredient in rng.sample(user_ingredients, links)
+            ]
+
+    for model, columns, rows in (
+            (Tag, ("id", "user", "name"), tag_rows),
+            (Ingredient, ("id", "user", "name"), ingredient_rows),
+            (Recipe, ("id", "user", "title", "time_min", "price"),
+             recipe_rows),
+            (Recipe.tags.through, ("recipe", "tag"), recipe_tags),
+            (Recipe.ingredients.through, ("recipe", "ingredient"),
+             recipe_ingredients)):
+        for start in range(0, len(rows), batch_size):
+            bulk_load(model, columns, rows[start:start + batch_size])
+
+    if search_vectors:
+        update_search_vectors(recipe_ids)
+    rows = len(user_ids) + len(tag_rows) + len(ingredient_rows) + \
+        len(recipe_rows) + len(recipe_tags) + len(recipe_ingredients)
+    return user_ids, rows
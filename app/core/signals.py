@@ -0,0 +1,158 @@
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.db.models.signals import m2m_changed, post_delete, post_init, \
+    post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import Tag, Ingredient, Recipe
+from core.renditions import renditions_ready
+from core.search import search_enabled, update_search_vectors
+from core.storage import release_blob, retain_blob
+
+
+def touch_recipes(queryset):
+    """Mark the recipes of the queryset as modified now and refresh their
+    search vectors"""
+    queryset.update(modified_at=timezone.now())
+    if search_enabled(queryset.db):
+        update_search_vectors(
+            list(queryset.values_list("pk", flat=True)), using=queryset.db
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def update_search_vector_on_save(sender, instance, using, update_fields,
+                                 **kwargs):
+    """Refresh the search vector of a recipe whose title may have changed"""
+    if update_fields is not None and "title" not in update_fields:
+        return
+    if search_enabled(using):
+        update_search_vectors([instance.pk], using=using)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def touch_recipes_on_m2m(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    """Mark recipes as modified when their tags or ingredients change"""
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            touch_recipes(Recipe.objects.filter(pk=instance.pk))
+            instance.modified_at = timezone.now()
+        return
+
+    # the instance is a tag or an ingredient, pk_set holds recipe ids
+    if action == "pre_clear":
+        instance._cleared_recipe_ids = list(
+            instance.recipe.values_list("pk", flat=True)
+        )
+    elif action == "post_clear":
+        pk_set = instance.__dict__.pop("_cleared_recipe_ids", [])
+        touch_recipes(Recipe.objects.filter(pk__in=pk_set))
+    elif action in ("post_add", "post_remove"):
+        touch_recipes(Recipe.objects.filter(pk__in=pk_set))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def touch_recipes_on_attr_change(sender, instance, **kwargs):
+    """Mark recipes as modified when one of their tags or ingredients is
+    renamed or deleted"""
+    if kwargs.get("created"):
+        return
+    if sender is Tag:
+        recipes = Recipe.objects.filter(tags=instance)
+    else:
+        recipes = Recipe.objects.filter(ingredients=instance)
+    touch_recipes(recipes)
+    if "created" not in kwargs and search_enabled(recipes.db):
+        # the name is still linked until the delete, refresh afterwards
+        instance._deleted_recipe_ids = list(
+            recipes.values_list("pk", flat=True)
+        )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def update_search_vectors_on_attr_delete(sender, instance, using, **kwargs):
+    """Remove the name of a deleted tag or ingredient from the search
+    vectors of its former recipes"""
+    recipe_ids = instance.__dict__.pop("_deleted_recipe_ids", None)
+    if recipe_ids:
+        update_search_vectors(recipe_ids, using=using)
+
+
+@receiver(renditions_ready, sender=Recipe)
+def touch_recipe_on_renditions(sender, instance, **kwargs):
+    """Record the renditions of the recipe image as written and mark the
+    recipe as modified"""
+    ready = ",".join(settings.RECIPE_IMAGE_RENDITIONS)
+    # unless the image was replaced in the meantime
+    Recipe.objects.filter(pk=instance.pk, image=instance.image.name) \
+        .update(ready_renditions=ready)
+    instance.ready_renditions = ready
+    touch_recipes(Recipe.objects.filter(pk=instance.pk))
+
+
+def _image_name(instance):
+    """Return the stored name of the recipe image without loading a
+    deferred field, or None if it is not loaded"""
+    value = instance.__dict__.get("image")
+    return getattr(value, "name", value) or None
+
+
+@receiver(post_init, sender=Recipe)
+def remember_stored_image(sender, instance, **kwargs):
+    """Remember the image name read from the database"""
+    instance._stored_image = _image_name(instance)
+
+
+@receiver(pre_save, sender=Recipe)
+def reset_renditions_on_image_change(sender, instance, **kwargs):
+    """Forget the renditions of a replaced image"""
+    if "image" in instance.__dict__ and \
+            _image_name(instance) != instance._stored_image:
+        instance.ready_renditions = ""
+
+
+@receiver(post_save, sender=Recipe)
+def count_image_refs_on_save(sender, instance, created, update_fields,
+                             **kwargs):
+    """Move the reference of the recipe to its new image blob"""
+    if "image" not in instance.__dict__:
+        return
+    if update_fields is not None and "image" not in update_fields:
+        return
+    name = _image_name(instance)
+    previous = None if created else instance._stored_image
+    if name == previous:
+        return
+    if name:
+        retain_blob(name)
+    if previous:
+        release_blob(previous)
+    instance._stored_image = name
+
+
+@receiver(post_delete, sender=Recipe)
+def release_image_on_delete(sender, instance, **kwargs):
+    """Release the image blob of a deleted recipe"""
+    if instance._stored_image:
+        release_blob(instance._stored_image)
+
+
+@receiver(request_started)
+def check_persistent_connections(**kwargs):
+    """Close the persistent connections the server dropped while idle, so
+    the request opens a new one instead of failing"""
+    if not settings.DB_CONN_HEALTH_CHECKS:
+        return
+    for connection in connections.all():
+        if (connection.connection is not None
+                and not connection.in_atomic_block
+                and not connection.is_usable()):
+            connection.close()
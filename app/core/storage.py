@@ -0,0 +1,137 @@
+import errno
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, When
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage naming files by the SHA-256 of their content
+
+    The upload is read once, in chunks, while it is hashed: uploads
+    already spooled to disk are moved in place, in-memory ones are copied
+    to a temporary file next to their destination. When a file with the
+    same content exists it is kept and the new copy is dropped, so the
+    same photo uploaded twice is stored once. The directory and the
+    extension of the requested name are kept. A file only appears under
+    its digest once complete, since later uploads trust it exists.
+
+    Every stored file has a core.models.StoredBlob row counting the
+    recipes referring to it; the gc_blobs command deletes the files no
+    longer referenced.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        """Return the name unchanged, `_save` derives it from the content"""
+        return name
+
+    def _save(self, name, content):
+        directory, basename = os.path.split(name)
+        extension = os.path.splitext(basename)[1].lower()
+        full_directory = self.path(directory)
+        os.makedirs(full_directory, exist_ok=True)
+
+        digest = hashlib.sha256()
+        spooled = hasattr(content, "temporary_file_path")
+        if spooled:
+            source = content.temporary_file_path()
+            for chunk in content.chunks():
+                digest.update(chunk)
+        else:
+            fd, source = tempfile.mkstemp(dir=full_directory,
+                                          prefix=".upload-")
+            with os.fdopen(fd, "wb") as tmp:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    tmp.write(chunk)
+
+        name = os.path.join(directory, digest.hexdigest() + extension)
+        # claim the blob before looking for the file, so the gc_blobs
+        # command can not delete it between the check and the save
+        claim_blob(name, content.size)
+
+        if self.exists(name):
+            if not spooled:
+                os.remove(source)
+            return name
+
+        move_atomic(source, self.path(name))
+        if self.file_permissions_mode is not None:
+            os.chmod(self.path(name), self.file_permissions_mode)
+        return name
+
+
+def move_atomic(source, target):
+    """Move the file `source` to `target`, which never holds a partial
+    copy, even when they are on different file systems"""
+    try:
+        os.replace(source, target)
+        return
+    except OSError as error:
+        if error.errno != errno.EXDEV:
+            raise
+    # copy next to the target then rename it, a crash only leaves the copy
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target),
+                               prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as copy, open(source, "rb") as original:
+            shutil.copyfileobj(original, copy)
+            copy.flush()
+            os.fsync(copy.fileno())
+        os.replace(tmp, target)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def claim_blob(name, size=None):
+    """Create the blob row of a stored file, or restart the grace period
+    of an unreferenced one"""
+    from core.models import StoredBlob
+
+    now = timezone.now()
+    if StoredBlob.objects.filter(name=name, refs=0).update(released_at=now):
+        return
+    try:
+        with transaction.atomic():
+            StoredBlob.objects.get_or_create(
+                name=name, defaults={"size": size, "released_at": now}
+            )
+    except IntegrityError:
+        # created concurrently
+        pass
+
+
+def retain_blob(name):
+    """Count a new reference to the blob stored under `name`"""
+    from core.models import StoredBlob
+
+    if not StoredBlob.objects.filter(name=name).update(
+        refs=F("refs") + 1, released_at=None
+    ):
+        # stored before the blobs were counted, or by another storage
+        claim_blob(name)
+        StoredBlob.objects.filter(name=name).update(
+            refs=F("refs") + 1, released_at=None
+        )
+
+
+def release_blob(name):
+    """Remove a reference to the blob stored under `name`, starting its
+    grace period when it was the last one"""
+    from core.models import StoredBlob
+
+    StoredBlob.objects.filter(name=name, refs__gt=0).update(
+        refs=F("refs") - 1,
+        released_at=Case(
+            When(refs=1, then=timezone.now()),
+            default=F("released_at"),
+        ),
+    )
@@ -0,0 +1,87 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core.bulk import allocate_ids, bulk_get_or_create, bulk_load, \
+    insert_ignore, _copy_value
+from core.models import Tag, Recipe
+
+
+class BulkTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "antonin.marzelle@outlook.fr", "testpassword"
+        )
+
+    def test_allocate_ids_after_existing_rows(self):
+        """Test that allocated ids are unused and distinct"""
+        recipe = Recipe.objects.create(
+            user=self.user, title="pizza", time_min=5, price=8.00
+        )
+        ids = allocate_ids(Recipe, 3)
+
+        self.assertEqual(len(set(ids)), 3)
+        self.assertNotIn(recipe.id, ids)
+
+    def test_allocate_ids_never_reused(self):
+        """Test that the ids of deleted rows and of previous allocations
+        are not allocated again"""
+        recipe = Recipe.objects.create(
+            user=self.user, title="pizza", time_min=5, price=8.00
+        )
+        deleted_id = recipe.id
+        recipe.delete()
+        first = allocate_ids(Recipe, 2)
+        second = allocate_ids(Recipe, 2)
+
+        self.assertGreater(min(first), deleted_id)
+        self.assertFalse(set(first) & set(second))
+        created = Recipe.objects.create(
+            user=self.user, title="soup", time_min=5, price=8.00
+        )
+        self.assertGreater(created.id, max(second))
+
+    def test_insert_ignore_skips_conflicts(self):
+        """Test that rows violating a unique constraint are skipped"""
+        Tag.objects.create(user=self.user, name="Vegan")
+
+        insert_ignore(Tag, [
+            {"user_id": self.user.id, "name": "Vegan"},
+            {"user_id": self.user.id, "name": "Dessert"},
+        ])
+
+        self.assertEqual(
+            sorted(Tag.objects.values_list("name", flat=True)),
+            ["Dessert", "Vegan"]
+        )
+
+    def test_bulk_get_or_create(self):
+        """Test that existing rows are returned and missing ones created"""
+        vegan = Tag.objects.create(user=self.user, name="Vegan")
+
+        ids = bulk_get_or_create(
+            Tag, "name", ["Vegan", "Dessert"], user=self.user
+        )
+
+        self.assertEqual(ids["Vegan"], vegan.id)
+        self.assertEqual(
+            ids["Dessert"], Tag.objects.get(name="Dessert").id
+        )
+
+    def test_bulk_load_defaults(self):
+        """Test that the columns not loaded get the field defaults"""
+        bulk_load(Recipe, ("id", "user", "title", "time_min", "price"), [
+            (40, self.user.id, "pizza", 5, "8.00"),
+            (41, self.user.id, "pasta", 10, "6.50"),
+        ])
+
+        recipe = Recipe.objects.get(pk=41)
+        self.assertEqual(recipe.title, "pasta")
+        self.assertEqual(recipe.link, "")
+        self.assertIsNotNone(recipe.modified_at)
+
+    def test_copy_value(self):
+        """Test that values are escaped for the COPY text format"""
+        self.assertEqual(_copy_value(None), "\\N")
+        self.assertEqual(_copy_value(True), "t")
+        self.assertEqual(_copy_value("a\tb\\c\n"), "a\\tb\\\\c\\n")
@@ -1,24 +1,300 @@
-from unittest.mock import patch
+import json
+import os
+import tempfile
+from io import StringIO
 from unittest.mock import patch
 
-from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
 from django.db.utils import OperationalError
 from django.test import TestCase
 
+from core.models import Tag, Ingredient, ImportCheckpoint, Recipe
+
+
 class CommandTests(TestCase):
     
     def test_wait_for_db_ready(self):
         """Test waiting for db when db is available"""
         with patch("django.db.utils.ConnectionHandler.__getitem__") as gi:
-            gi.return_value = True
-            call_command("wait_for_db")
-            self.assertEqual(gi.call_count, 1)
+            call_command("wait_for_db", stdout=StringIO())
+            conn = gi.return_value
+            self.assertEqual(conn.ensure_connection.call_count, 1)
+            conn.cursor.return_value.__enter__.return_value.execute \
+                .assert_called_once_with("SELECT 1")
     
     @patch("time.sleep", return_value=True)
     def test_wait_for_db(self, ts):
         """"Test waiting for db 'n' time"""
         with patch("django.db.utils.ConnectionHandler.__getitem__") as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
-            call_command("wait_for_db")
-            self.assertEqual(gi.call_count, 6)
-            
\ No newline at end of file
+            conn = gi.return_value
+            conn.ensure_connection.side_effect = [OperationalError] * 5 \
+                + [None]
+            call_command("wait_for_db", stdout=StringIO())
+            self.assertEqual(conn.ensure_connection.call_count, 6)
+            # exponential backoff
+            self.assertEqual(
+                [c[0][0] for c in ts.call_args_list],
+                [0.1, 0.2, 0.4, 0.8, 1.6]
+            )
+
+    @patch("time.sleep", return_value=True)
+    def test_wait_for_db_timeout(self, ts):
+        """Test the command fails once the timeout is over"""
+        with patch("django.db.utils.ConnectionHandler.__getitem__") as gi, \
+                patch("time.monotonic", side_effect=[0, 1, 2, 3]):
+            conn = gi.return_value
+            conn.ensure_connection.side_effect = OperationalError("down")
+            with self.assertRaises(CommandError):
+                call_command("wait_for_db", timeout=2.5, stdout=StringIO())
+            self.assertEqual(conn.ensure_connection.call_count, 3)
+
+    def test_bench_indexes(self):
+        """Test the index benchmark reports every query and rolls back"""
+        out = StringIO()
+        call_command(
+            "bench_indexes", users=1, recipes=20, tags=5, ingredients=5,
+            repeat=1, stdout=out
+        )
+
+        self.assertIn("recipe list", out.getvalue())
+        self.assertIn("assigned tags", out.getvalue())
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bench_api(self):
+        """Test the API benchmark writes the results of each endpoint"""
+        with tempfile.NamedTemporaryFile("r", suffix=".json") as output:
+            call_command(
+                "bench_api", users=1, recipes=5, tags=3, ingredients=3,
+                requests=2, warmup=0, endpoint=["recipe list", "tag list"],
+                output=output.name, stdout=StringIO()
+            )
+            results = json.load(output)
+
+        self.assertEqual(set(results["endpoints"]),
+                         {"recipe list", "tag list"})
+        self.assertFalse(results["list_cache"])
+        recipe_list = results["endpoints"]["recipe list"]
+        self.assertEqual(recipe_list["errors"], 0)
+        self.assertGreaterEqual(recipe_list["queries"], 2)
+        self.assertGreaterEqual(results["endpoints"]["tag list"]["queries"],
+                                1)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bench_api_cached(self):
+        """Test the API benchmark can measure the list cache hits"""
+        with tempfile.NamedTemporaryFile("r", suffix=".json") as output:
+            call_command(
+                "bench_api", users=1, recipes=5, tags=3, ingredients=3,
+                requests=3, warmup=1, endpoint=["tag list"], cached=True,
+                output=output.name, stdout=StringIO()
+            )
+            results = json.load(output)
+
+        self.assertTrue(results["list_cache"])
+        self.assertEqual(results["endpoints"]["tag list"]["queries"], 0)
+
+    def test_seed_data(self):
+        """Test the seeder loads every row with the shared password"""
+        call_command(
+            "seed_data", users=3, recipes=4, tags=3, ingredients=40, links=2,
+            batch_size=20, stdout=StringIO()
+        )
+
+        user = get_user_model().objects.get(email="seed-2@example.com")
+        self.assertTrue(user.check_password("seed-password"))
+        self.assertEqual(Recipe.objects.filter(user=user).count(), 4)
+        self.assertEqual(Recipe.tags.through.objects.count(), 3 * 4 * 2)
+        self.assertEqual(
+            Ingredient.objects.filter(user=user).values("name")
+            .distinct().count(), 40
+        )
+
+    def test_seed_data_deterministic(self):
+        """Test the same seed gives the same recipes"""
+        def titles(prefix):
+            call_command("seed_data", users=2, recipes=5, prefix=prefix,
+                         stdout=StringIO())
+            return list(Recipe.objects.filter(
+                user__email__startswith=prefix
+            ).order_by("pk").values_list("title", "price", "time_min"))
+
+        self.assertEqual(titles("first"), titles("second"))
+
+    def test_bench_json(self):
+        """Test the JSON benchmark renders like DRF with every backend"""
+        out = StringIO()
+        call_command("bench_json", recipes=5, repeat=1, stdout=out)
+
+        lines = out.getvalue().splitlines()[1:]
+        self.assertEqual(len(lines), 3 * 4)
+        for line in lines:
+            self.assertTrue(line.endswith("yes")
+                            or line.endswith("not installed"), line)
+
+    def write_file(self, directory, name, lines):
+        """Write the lines in a file of the directory, return its path"""
+        path = os.path.join(directory, name)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+        return path
+
+    def test_import_recipes(self):
+        """Test the NDJSON import skips the invalid records and reuses the
+        existing names"""
+        user = get_user_model().objects.create_user(
+            email="import@example.com", password="testPassword"
+        )
+        vegan = Tag.objects.create(user=user, name="Vegan")
+        with tempfile.TemporaryDirectory() as directory:
+            path = self.write_file(directory, "recipes.ndjson", [
+                json.dumps({"title": "Crème brûlée", "price": "4.50",
+                            "time_min": 30, "tags": ["Vegan", "Dessert"],
+                            "ingredients": ["Cream", "Sugar"]}),
+                json.dumps({"title": "", "price": "1.00", "time_min": 5}),
+                "{not json",
+                json.dumps({"title": "Tea", "price": "1.20", "time_min": 3,
+                            "link": "https://example.com",
+                            "tags": ["Dessert"]}),
+            ])
+            err = StringIO()
+            call_command("import_recipes", path, user=user.email,
+                         batch_size=2, stdout=StringIO(), stderr=err)
+
+        self.assertFalse(ImportCheckpoint.objects.exists())
+        self.assertIn("Record 2", err.getvalue())
+        self.assertIn("Record 3", err.getvalue())
+        recipes = Recipe.objects.filter(user=user).order_by("id")
+        self.assertEqual([recipe.title for recipe in recipes],
+                         ["Crème brûlée", "Tea"])
+        self.assertEqual(
+            sorted(recipes[0].tags.values_list("name", flat=True)),
+            ["Dessert", "Vegan"]
+        )
+        self.assertIn(vegan, recipes[0].tags.all())
+        self.assertEqual(Tag.objects.filter(user=user).count(), 2)
+        self.assertEqual(recipes[1].link, "https://example.com")
+
+    def test_import_recipes_csv(self):
+        """Test the CSV written by the export is imported"""
+        user = get_user_model().objects.create_user(
+            email="import@example.com", password="testPassword"
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            path = self.write_file(directory, "recipes.csv", [
+                "id,title,price,time_min,link,image,tags,ingredients",
+                '7,"Soup, hot",3.00,20,,,"[""Quick"",""Vegan""]",'
+                '"[""Leek""]"',
+            ])
+            call_command("import_recipes", path, user=user.email,
+                         stdout=StringIO())
+
+        recipe = Recipe.objects.get(user=user)
+        self.assertEqual(recipe.title, "Soup, hot")
+        self.assertEqual(str(recipe.price), "3.00")
+        self.assertEqual(recipe.tags.count(), 2)
+        self.assertEqual(recipe.ingredients.get().name, "Leek")
+
+    def test_import_recipes_resume(self):
+        """Test an import failing midway resumes without duplicates"""
+        user = get_user_model().objects.create_user(
+            email="import@example.com", password="testPassword"
+        )
+        lines = [
+            json.dumps({"title": f"Recipe {i}", "price": "1.00",
+                        "time_min": i, "tags": [f"Tag {i % 2}"]})
+            for i in range(5)
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            path = self.write_file(directory, "recipes.ndjson", lines)
+            with patch("core.management.commands.import_recipes."
+                       "update_search_vectors",
+                       side_effect=[None, RuntimeError("crash")]):
+                with self.assertRaises(RuntimeError):
+                    call_command("import_recipes", path, user=user.email,
+                                 batch_size=2, stdout=StringIO())
+            self.assertEqual(Recipe.objects.filter(user=user).count(), 2)
+
+            with self.assertRaises(CommandError):
+                call_command("import_recipes", path, user=user.email,
+                             stdout=StringIO())
+            call_command("import_recipes", path, user=user.email,
+                         batch_size=2, resume=True, stdout=StringIO())
+
+        self.assertEqual(
+            list(Recipe.objects.filter(user=user).order_by("id")
+                 .values_list("title", flat=True)),
+            [f"Recipe {i}" for i in range(5)]
+        )
+
+    def test_import_recipes_resume_rolled_back_batch(self):
+        """Test the checkpoint of a rolled back batch is rolled back with
+        it, its invalid records being counted once"""
+        user = get_user_model().objects.create_user(
+            email="import@example.com", password="testPassword"
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            path = self.write_file(directory, "recipes.ndjson", [
+                json.dumps({"title": "Soup", "price": "1.00",
+                            "time_min": 5}),
+                json.dumps({"title": "", "price": "1.00", "time_min": 5}),
+            ])
+            with patch("core.management.commands.import_recipes."
+                       "update_search_vectors",
+                       side_effect=RuntimeError("crash")):
+                with self.assertRaises(RuntimeError):
+                    call_command("import_recipes", path, user=user.email,
+                                 stdout=StringIO(), stderr=StringIO())
+            self.assertFalse(Recipe.objects.filter(user=user).exists())
+            self.assertEqual(ImportCheckpoint.objects.get().records, 0)
+
+            out = StringIO()
+            call_command("import_recipes", path, user=user.email,
+                         resume=True, stdout=out, stderr=StringIO())
+
+        self.assertIn("Imported 1 recipes, skipped 1 invalid records",
+                      out.getvalue())
+
+    def test_import_recipes_resume_after_concurrent_insert(self):
+        """Test a rolled back batch is imported again even when another
+        recipe took its ids"""
+        user = get_user_model().objects.create_user(
+            email="import@example.com", password="testPassword"
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            path = self.write_file(directory, "recipes.ndjson", [
+                json.dumps({"title": f"Recipe {i}", "price": "1.00",
+                            "time_min": i})
+                for i in range(4)
+            ])
+            with patch("core.management.commands.import_recipes."
+                       "update_search_vectors",
+                       side_effect=[None, RuntimeError("crash")]):
+                with self.assertRaises(RuntimeError):
+                    call_command("import_recipes", path, user=user.email,
+                                 batch_size=2, stdout=StringIO())
+            Recipe.objects.create(user=user, title="Created meanwhile",
+                                  price="1.00", time_min=1)
+
+            call_command("import_recipes", path, user=user.email,
+                         batch_size=2, resume=True, stdout=StringIO())
+
+        self.assertEqual(
+            Recipe.objects.filter(user=user, title__startswith="Recipe ")
+            .count(), 4
+        )
+
+    def test_import_recipes_checkpoint_other_user(self):
+        """Test a checkpoint can not be resumed for another user"""
+        user = get_user_model().objects.create_user(
+            email="import@example.com", password="testPassword"
+        )
+        other = get_user_model().objects.create_user(
+            email="other@example.com", password="testPassword"
+        )
+        ImportCheckpoint.objects.create(name="partner", user=other)
+
+        with self.assertRaises(CommandError):
+            call_command("import_recipes", "recipes.ndjson",
+                         user=user.email, checkpoint="partner", resume=True,
+                         stdout=StringIO())
@@ -0,0 +1,70 @@
+from unittest.mock import patch
+
+from django.db.utils import OperationalError
+from django.test import TestCase
+from django.urls import reverse
+
+from core import health
+
+HEALTH_URL = reverse("core:health")
+READY_URL = reverse("core:ready")
+
+
+class HealthTests(TestCase):
+    """Test the health and readiness endpoints"""
+
+    def setUp(self):
+        health._migrated.clear()
+
+    def test_health(self):
+        """Test the liveness probe does not query the database"""
+        with self.assertNumQueries(0):
+            res = self.client.get(HEALTH_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json(), {"status": "ok"})
+
+    def test_ready(self):
+        """Test the readiness probe reports the database and migrations"""
+        res = self.client.get(READY_URL)
+        data = res.json()
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data["status"], "ok")
+        self.assertTrue(data["database"]["ok"])
+        self.assertGreaterEqual(data["database"]["latency_ms"], 0)
+        self.assertEqual(data["migrations"], {"ok": True, "pending": []})
+        self.assertIn("no-cache", res["Cache-Control"])
+
+    def test_ready_migrations_checked_once(self):
+        """Test the migrations are not checked again once applied"""
+        self.client.get(READY_URL)
+
+        with self.assertNumQueries(1):
+            self.client.get(READY_URL)
+
+    def test_ready_pending_migrations(self):
+        """Test pending migrations make the service unavailable"""
+        with patch("core.health.MigrationExecutor") as executor:
+            executor.return_value.migration_plan.return_value = [
+                (type("Migration", (), {
+                    "app_label": "core", "name": "0099_next"
+                }), False),
+            ]
+            res = self.client.get(READY_URL)
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json()["migrations"]["pending"],
+                         ["core.0099_next"])
+
+    def test_ready_database_down(self):
+        """Test an unreachable database makes the service unavailable"""
+        error = OperationalError('could not connect to server at "db-1"')
+        with patch("core.health.database_latency", side_effect=error), \
+                self.assertLogs("core.health", level="ERROR"):
+            res = self.client.get(READY_URL)
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json()["database"],
+                         {"ok": False, "error": "unavailable"})
+        self.assertNotIn("db-1", res.content.decode())
@@ -0,0 +1,119 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.metrics import Histogram, request_metrics
+from core.models import Tag, Recipe
+
+TAGS_URL = reverse("recipe:tag-list")
+EXPORT_URL = reverse("recipe:recipe-export")
+METRICS_URL = reverse("metrics")
+
+
+class HistogramTests(TestCase):
+    """Test the Prometheus histograms"""
+
+    def test_cumulative_buckets(self):
+        """Test the buckets count the observations up to their bound"""
+        histogram = Histogram((1, 5))
+        for value in (0.5, 1, 3, 10):
+            histogram.observe(value)
+
+        self.assertEqual(list(histogram.samples()),
+                         [(1, 2), (5, 3), ("+Inf", 4)])
+        self.assertEqual(histogram.sum, 14.5)
+
+
+class MetricsMiddlewareTests(TestCase):
+    """Test the per request metrics"""
+
+    def setUp(self):
+        request_metrics.clear()
+        self.user = get_user_model().objects.create_user(
+            "antonin.marzelle@outlook.fr", "admin123"
+        )
+        Tag.objects.create(user=self.user, name="Vegan")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_server_timing(self):
+        """Test the queries and timings are sent in Server-Timing"""
+        res = self.client.get(TAGS_URL)
+
+        entries = [entry.split(";")[0]
+                   for entry in res["Server-Timing"].split(", ")]
+        self.assertEqual(entries, ["db", "view", "render", "total"])
+        self.assertIn('desc="1 queries"', res["Server-Timing"])
+
+    def test_metrics_endpoint(self):
+        """Test the histograms are exposed by view name"""
+        self.client.get(TAGS_URL)
+        self.client.get(TAGS_URL)
+
+        res = self.client.get(METRICS_URL)
+        text = res.content.decode()
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res["Content-Type"].startswith("text/plain"))
+        labels = 'view="recipe:tag-list",method="GET"'
+        self.assertIn(f"api_request_duration_seconds_count{{{labels}}} 2",
+                      text)
+        self.assertIn(f'api_request_queries_bucket{{{labels},le="1"}} 2',
+                      text)
+        self.assertIn(
+            f'api_responses_total{{{labels},status="2xx"}} 2', text
+        )
+        self.assertNotIn('view="metrics"', text)
+
+    def test_streaming_queries_counted(self):
+        """Test the queries run while a streaming response is read are
+        recorded once it is consumed"""
+        Recipe.objects.create(user=self.user, title="Soup", time_min=5,
+                              price="2.00")
+        labels = 'view="recipe:recipe-export",method="GET"'
+        res = self.client.get(EXPORT_URL)
+
+        self.assertNotIn(labels, request_metrics.render())
+        b"".join(res.streaming_content)
+        res.close()
+
+        # the recipes, then the tag and the ingredient names
+        self.assertIn(f"api_request_queries_sum{{{labels}}} 3",
+                      request_metrics.render())
+
+    def test_unmatched_routes_grouped(self):
+        """Test unknown paths do not create a series each"""
+        self.client.get("/api/unknown/1/")
+        self.client.get("/api/unknown/2/")
+
+        text = self.client.get(METRICS_URL).content.decode()
+
+        self.assertIn(
+            'api_request_duration_seconds_count'
+            '{view="unmatched",method="GET"} 2', text
+        )
+
+    def test_metrics_hidden_from_other_addresses(self):
+        """Test the metrics are not served outside the allowed networks"""
+        res = self.client.get(METRICS_URL, REMOTE_ADDR="203.0.113.7")
+
+        self.assertEqual(res.status_code, 404)
+
+    @override_settings(METRICS_ALLOWED_IPS=["10.0.0.0/8"])
+    def test_metrics_allowed_network(self):
+        """Test the metrics are served to an allowed network"""
+        res = self.client.get(METRICS_URL, REMOTE_ADDR="10.1.2.3")
+
+        self.assertEqual(res.status_code, 200)
+
+    @override_settings(METRICS_ALLOWED_IPS=[], METRICS_TOKEN="s3cret")
+    def test_metrics_token(self):
+        """Test the metrics are served with the bearer token only"""
+        wrong = self.client.get(METRICS_URL, HTTP_AUTHORIZATION="Bearer x")
+        res = self.client.get(METRICS_URL,
+                              HTTP_AUTHORIZATION="Bearer s3cret")
+
+        self.assertEqual(wrong.status_code, 404)
+        self.assertEqual(res.status_code, 200)
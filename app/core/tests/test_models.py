@@ -1,7 +1,9 @@
+from datetime import timedelta
 from unittest.mock import patch
 
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 
 from core.models import *
 
@@ -83,4 +85,22 @@ class ModelTests(TestCase):
         
         expected_path = f"uploads/recipe/{uuid}.jpg" 
         
-        self.assertEqual(file_path, expected_path)
\ No newline at end of file
+        self.assertEqual(file_path, expected_path)
+
+    def test_recipe_modified_on_relation_change(self):
+        """Test that changing the recipe tags updates its modified date"""
+        user = create_sample_user()
+        recipe = Recipe.objects.create(
+            user=user, title="pizza", time_min=5, price=8.00
+        )
+        tag = Tag.objects.create(user=user, name="Italian")
+        past = timezone.now() - timedelta(days=1)
+
+        for change in (lambda: recipe.tags.add(tag),
+                       lambda: tag.recipe.clear(),
+                       lambda: tag.recipe.add(recipe),
+                       lambda: tag.delete()):
+            Recipe.objects.filter(pk=recipe.pk).update(modified_at=past)
+            change()
+            recipe.refresh_from_db()
+            self.assertGreater(recipe.modified_at, past)
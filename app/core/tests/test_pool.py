@@ -0,0 +1,134 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.db.utils import OperationalError
+from django.test import SimpleTestCase
+
+from core.db import pool
+from core.db.backends.sqlite3.base import DatabaseWrapper
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Test the thread safe connection pool"""
+
+    def make_pool(self, size=2, timeout=0.05, **kwargs):
+        return pool.ConnectionPool(
+            lambda: sqlite3.connect(":memory:", check_same_thread=False),
+            size=size, timeout=timeout, **kwargs
+        )
+
+    def test_connections_reused(self):
+        """Test released connections are handed out again"""
+        connections = self.make_pool()
+
+        first = connections.checkout()
+        connections.release(first)
+        second = connections.checkout()
+
+        self.assertIs(first, second)
+        stats = connections.stats()
+        self.assertEqual(stats["created"], 1)
+        self.assertEqual(stats["checkouts"], 2)
+        self.assertEqual(stats["in_use"], 1)
+
+    def test_size_limited(self):
+        """Test a checkout times out when every connection is in use"""
+        connections = self.make_pool(size=1)
+        connections.checkout()
+
+        with self.assertRaises(pool.PoolTimeout):
+            connections.checkout()
+
+        self.assertEqual(connections.stats()["timeouts"], 1)
+
+    def test_wait_for_release(self):
+        """Test a checkout waits for a connection released by a thread"""
+        connections = self.make_pool(size=1, timeout=5)
+        used = connections.checkout()
+        timer = threading.Timer(0.05, connections.release, [used])
+        timer.start()
+
+        self.assertIs(connections.checkout(), used)
+
+        timer.join()
+        stats = connections.stats()
+        self.assertEqual(stats["waits"], 1)
+        self.assertGreater(stats["wait_ms_max"], 0)
+
+    def test_broken_connection_discarded(self):
+        """Test a connection that can not be rolled back is not reused"""
+        connections = self.make_pool(size=1)
+        broken = connections.checkout()
+        broken.close()
+
+        connections.release(broken)
+
+        self.assertIsNot(connections.checkout(), broken)
+        self.assertEqual(connections.stats()["discarded"], 1)
+
+    def test_check_on_checkout(self):
+        """Test idle connections failing the check are replaced"""
+        connections = self.make_pool(check=pool.ping)
+        idle = connections.checkout()
+        connections.release(idle)
+        idle.close()
+
+        self.assertIsNot(connections.checkout(), idle)
+        self.assertEqual(connections.stats()["created"], 2)
+
+
+class PooledBackendTests(SimpleTestCase):
+    """Test the pooled SQLite backend"""
+
+    def setUp(self):
+        fd, self.name = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(fd)
+        self.addCleanup(os.remove, self.name)
+        self.addCleanup(self.close_pool)
+
+    def close_pool(self):
+        connections = pool._pools.pop("pooled", None)
+        if connections is not None:
+            connections.close()
+
+    def make_wrapper(self):
+        return DatabaseWrapper({
+            "ENGINE": "core.db.backends.sqlite3",
+            "NAME": self.name,
+            "ATOMIC_REQUESTS": False,
+            "AUTOCOMMIT": True,
+            "CONN_MAX_AGE": 0,
+            "OPTIONS": {},
+            "TIME_ZONE": None,
+            "POOL": {"SIZE": 1, "TIMEOUT": 0.05},
+        }, alias="pooled")
+
+    def test_close_returns_connection(self):
+        """Test closing a wrapper gives its connection back to the pool"""
+        first = self.make_wrapper()
+        with first.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        raw = first.connection
+        first.close()
+
+        second = self.make_wrapper()
+        second.ensure_connection()
+
+        self.assertIs(second.connection, raw)
+        self.assertEqual(pool.get_pool("pooled").stats()["created"], 1)
+        second.close()
+
+    def test_exhausted_pool_error(self):
+        """Test an exhausted pool raises a database error"""
+        first = self.make_wrapper()
+        first.ensure_connection()
+
+        start = time.perf_counter()
+        with self.assertRaises(OperationalError):
+            self.make_wrapper().ensure_connection()
+
+        self.assertLess(time.perf_counter() - start, 1)
+        first.close()
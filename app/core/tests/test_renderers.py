@@ -0,0 +1,114 @@
+import datetime
+import io
+from collections import OrderedDict
+from decimal import Decimal
+from unittest import skipIf
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from core import fastjson
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+PAYLOAD = {
+    "next": "https://example.com/api/recipe/recipes/?cursor=cD0xMjM%3D",
+    "results": [
+        OrderedDict([
+            ("id", 12),
+            ("title", "Crème brûlée\u2028"),
+            ("price", "5.00"),
+            ("time_min", 45),
+            ("link", ""),
+            ("ingredients", [1, 2, 3]),
+            ("tags", [OrderedDict([("id", 4), ("name", "Dessert")])]),
+            ("renditions", {"thumb": "http://testserver/media/a_thumb.jpg"}),
+        ]),
+    ],
+    "modified_at": datetime.datetime(
+        2020, 5, 17, 10, 30, 15, 123456, tzinfo=datetime.timezone.utc
+    ),
+    "date": datetime.date(2020, 5, 17),
+    "ratio": Decimal("0.25"),
+    "rate": 0.1,
+    "label": gettext_lazy("Invalid token."),
+    "empty": None,
+    "flags": [True, False],
+}
+
+
+def installed(name):
+    return fastjson.load_backend(name) is not None
+
+
+class FastJSONTests(SimpleTestCase):
+    """Test the fast JSON renderer and parser"""
+
+    def assertRendersLikeDRF(self, backend):
+        with override_settings(JSON_BACKEND=backend):
+            self.assertEqual(fastjson.get_backend().name, backend)
+            self.assertEqual(
+                FastJSONRenderer().render(PAYLOAD),
+                JSONRenderer().render(PAYLOAD)
+            )
+
+    def test_json_backend(self):
+        """Test the standard library output is the DRF one"""
+        self.assertRendersLikeDRF("json")
+
+    @skipIf(not installed("orjson"), "orjson is not installed")
+    def test_orjson_backend(self):
+        """Test the orjson output is the DRF one"""
+        self.assertRendersLikeDRF("orjson")
+
+    @skipIf(not installed("ujson"), "ujson is not installed")
+    def test_ujson_backend(self):
+        """Test the ujson output is the DRF one"""
+        self.assertRendersLikeDRF("ujson")
+
+    @override_settings(JSON_BACKEND="orjson")
+    def test_missing_backend_falls_back(self):
+        """Test a library which is not installed falls back to json"""
+        import_module = fastjson.importlib.import_module
+
+        def without_orjson(name):
+            if name == "orjson":
+                raise ImportError(name)
+            return import_module(name)
+
+        with patch("core.fastjson.importlib.import_module", without_orjson):
+            fastjson.reset_backend("JSON_BACKEND")
+            self.assertEqual(fastjson.get_backend().name, "json")
+        fastjson.reset_backend("JSON_BACKEND")
+
+    def test_indented_rendering(self):
+        """Test indented responses are left to DRF"""
+        rendered = FastJSONRenderer().render(
+            {"id": 1}, "application/json; indent=2"
+        )
+
+        self.assertEqual(rendered, b'{\n  "id": 1\n}')
+
+    def test_parse(self):
+        """Test documents are parsed for every installed backend"""
+        body = '{"title": "Crème brûlée", "tags": [1, 2]}'.encode("utf-8")
+        for backend in fastjson.BACKENDS:
+            if not installed(backend):
+                continue
+            with override_settings(JSON_BACKEND=backend):
+                data = FastJSONParser().parse(io.BytesIO(body))
+
+            self.assertEqual(data, {"title": "Crème brûlée", "tags": [1, 2]})
+
+    def test_parse_error(self):
+        """Test invalid documents raise a parse error"""
+        for backend in fastjson.BACKENDS:
+            if not installed(backend):
+                continue
+            for body in (b'{"title": ', b'{"price": NaN}'):
+                with override_settings(JSON_BACKEND=backend), \
+                        self.assertRaises(ParseError):
+                    FastJSONParser().parse(io.BytesIO(body))
@@ -0,0 +1,196 @@
+import errno
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.models import Recipe, StoredBlob
+
+
+class ContentAddressedStorageTests(TestCase):
+    """Test the deduplicated storage of the recipe images"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        settings = override_settings(MEDIA_ROOT=self.media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(shutil.rmtree, self.media_root)
+
+        self.storage = Recipe._meta.get_field("image").storage
+        self.user = get_user_model().objects.create_user(
+            "antonin.marzelle@outlook.fr",
+            "testPassword"
+        )
+
+    def create_recipe(self, content=None):
+        recipe = Recipe.objects.create(
+            user=self.user, title="Pancakes", time_min=5, price=3.00
+        )
+        if content is not None:
+            recipe.image.save("photo.JPG", ContentFile(content))
+        return recipe
+
+    def files(self):
+        return sorted(
+            name
+            for _, _, names in os.walk(self.media_root)
+            for name in names
+        )
+
+    def test_name_is_content_digest(self):
+        """Test files are named by the SHA-256 of their content"""
+        name = self.storage.save("uploads/recipe/a.JPG", ContentFile(b"img"))
+
+        self.assertEqual(
+            name, f"uploads/recipe/{hashlib.sha256(b'img').hexdigest()}.jpg"
+        )
+        blob = StoredBlob.objects.get(name=name)
+        self.assertEqual(blob.size, 3)
+        self.assertEqual(blob.refs, 0)
+
+    def test_identical_content_stored_once(self):
+        """Test uploading the same content twice writes a single file"""
+        first = self.storage.save("uploads/recipe/a.jpg", ContentFile(b"x"))
+        second = self.storage.save("uploads/recipe/b.jpg", ContentFile(b"x"))
+        other = self.storage.save("uploads/recipe/c.jpg", ContentFile(b"y"))
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertEqual(len(self.files()), 2)
+        self.assertEqual(StoredBlob.objects.count(), 2)
+
+    def test_spooled_upload_moved(self):
+        """Test uploads spooled to disk are moved instead of copied"""
+        upload = TemporaryUploadedFile("a.jpg", "image/jpeg", 4, None)
+        upload.write(b"data")
+        upload.seek(0)
+        self.addCleanup(upload.close)
+        path = upload.temporary_file_path()
+
+        name = self.storage.save("uploads/recipe/a.jpg", upload)
+
+        self.assertFalse(os.path.exists(path))
+        with self.storage.open(name) as f:
+            self.assertEqual(f.read(), b"data")
+
+    def spooled_upload(self, data):
+        upload = TemporaryUploadedFile("a.jpg", "image/jpeg", len(data), None)
+        upload.write(data)
+        upload.seek(0)
+        self.addCleanup(upload.close)
+        return upload
+
+    def cross_device_replace(self, source):
+        """Return an os.replace failing to rename `source` like across
+        file systems"""
+        replace = os.replace
+
+        def cross_device(src, dst):
+            if src == source:
+                raise OSError(errno.EXDEV, "Invalid cross-device link")
+            return replace(src, dst)
+        return cross_device
+
+    def test_spooled_upload_other_file_system(self):
+        """Test uploads on another file system are copied then renamed"""
+        upload = self.spooled_upload(b"data")
+        replace = self.cross_device_replace(upload.temporary_file_path())
+
+        with patch("core.storage.os.replace", side_effect=replace):
+            name = self.storage.save("uploads/recipe/a.jpg", upload)
+
+        with self.storage.open(name) as f:
+            self.assertEqual(f.read(), b"data")
+        self.assertEqual(self.files(), [os.path.basename(name)])
+
+    def test_interrupted_copy_leaves_no_blob(self):
+        """Test a copy failing midway leaves no file under the digest, so
+        the next upload writes it"""
+        upload = self.spooled_upload(b"data")
+        replace = self.cross_device_replace(upload.temporary_file_path())
+
+        with patch("core.storage.os.replace", side_effect=replace), \
+                patch("core.storage.shutil.copyfileobj",
+                      side_effect=OSError("disk full")), \
+                self.assertRaises(OSError):
+            self.storage.save("uploads/recipe/a.jpg", upload)
+        self.assertEqual(self.files(), [])
+
+        name = self.storage.save("uploads/recipe/a.jpg",
+                                 ContentFile(b"data"))
+        with self.storage.open(name) as f:
+            self.assertEqual(f.read(), b"data")
+
+    def test_refs_follow_recipes(self):
+        """Test blobs count the recipes referring to them"""
+        recipe1 = self.create_recipe(b"img")
+        recipe2 = self.create_recipe(b"img")
+        blob = StoredBlob.objects.get(name=recipe1.image.name)
+        self.assertEqual(blob.refs, 2)
+
+        recipe1.image.save("photo.jpg", ContentFile(b"other"))
+        blob.refresh_from_db()
+        self.assertEqual(blob.refs, 1)
+        self.assertIsNone(blob.released_at)
+
+        recipe2.delete()
+        blob.refresh_from_db()
+        self.assertEqual(blob.refs, 0)
+        self.assertIsNotNone(blob.released_at)
+
+    def test_gc_deletes_released_blobs(self):
+        """Test the gc command deletes the orphans once the grace is over"""
+        kept = self.create_recipe(b"kept")
+        released = self.create_recipe(b"released")
+        name = released.image.name
+        released.delete()
+        StoredBlob.objects.filter(name=name).update(
+            released_at=timezone.now() - timedelta(hours=2)
+        )
+
+        call_command("gc_blobs", grace_hours=3, stdout=StringIO())
+        self.assertTrue(self.storage.exists(name))
+
+        out = StringIO()
+        call_command("gc_blobs", grace_hours=1, batch_size=1, stdout=out)
+
+        self.assertIn("1 blobs deleted", out.getvalue())
+        self.assertFalse(self.storage.exists(name))
+        self.assertFalse(StoredBlob.objects.filter(name=name).exists())
+        self.assertTrue(self.storage.exists(kept.image.name))
+
+    def test_gc_dry_run(self):
+        """Test the dry run only counts the blobs"""
+        name = self.storage.save("uploads/recipe/a.jpg", ContentFile(b"x"))
+        StoredBlob.objects.update(
+            released_at=timezone.now() - timedelta(days=2)
+        )
+        out = StringIO()
+
+        call_command("gc_blobs", dry_run=True, stdout=out)
+
+        self.assertIn("1 blobs to delete", out.getvalue())
+        self.assertTrue(self.storage.exists(name))
+
+    def test_upload_restarts_grace(self):
+        """Test saving a released blob again protects it from the gc"""
+        name = self.storage.save("uploads/recipe/a.jpg", ContentFile(b"x"))
+        StoredBlob.objects.update(
+            released_at=timezone.now() - timedelta(days=2)
+        )
+
+        self.storage.save("uploads/recipe/b.jpg", ContentFile(b"x"))
+        call_command("gc_blobs", stdout=StringIO())
+
+        self.assertTrue(self.storage.exists(name))
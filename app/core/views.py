@@ -0,0 +1,54 @@
+import ipaddress
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_GET
+
+from core.health import readiness
+from core.metrics import request_metrics
+
+
+@never_cache
+@require_GET
+def health(request):
+    """Liveness probe, answered without touching the database"""
+    return JsonResponse({"status": "ok"})
+
+
+@never_cache
+@require_GET
+def ready(request):
+    """Readiness probe reporting the database latency and migrations"""
+    report, ok = readiness()
+    report["status"] = "ok" if ok else "unavailable"
+    return JsonResponse(report, status=200 if ok else 503)
+
+
+def metrics_allowed(request):
+    """Return if the request may read the metrics, see METRICS_TOKEN and
+    METRICS_ALLOWED_IPS"""
+    token = settings.METRICS_TOKEN
+    authorization = request.META.get("HTTP_AUTHORIZATION", "")
+    if token and constant_time_compare(authorization, f"Bearer {token}"):
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get("REMOTE_ADDR"))
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network, strict=False)
+               for network in settings.METRICS_ALLOWED_IPS)
+
+
+@never_cache
+@require_GET
+def metrics(request):
+    """Request metrics of this process in the Prometheus text format"""
+    if not metrics_allowed(request):
+        # the endpoint is not advertised to the other clients
+        raise Http404
+    return HttpResponse(
+        request_metrics.render(),
+        content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,97 @@
+import hashlib
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+
+def get_cache():
+    """Return the cache storing the recipe API responses"""
+    return caches[settings.RECIPE_CACHE_ALIAS]
+
+
+def _version_key(user_id):
+    """Return the cache key of the user's version counter"""
+    return f"recipe:version:{user_id}"
+
+
+def _new_version():
+    """Return a version never used before for a lost counter
+
+    Starting again from 1 after an eviction could match entries stored
+    under an older counter, so a fresh counter starts from the clock.
+    """
+    return int(time.time() * 1000000)
+
+
+def get_user_version(user_id):
+    """Return the current version of the user's cached responses"""
+    cache = get_cache()
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_user_version(user_id):
+    """Invalidate all the cached responses of the user
+
+    Inside a transaction the version is bumped again once it commits: a
+    concurrent request could read the first bump before the commit and
+    cache the old rows under it. The first bump keeps the reads of the
+    transaction itself from the entries cached before the change.
+    """
+    _bump_user_version(user_id)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(partial(_bump_user_version, user_id))
+
+
+def _bump_user_version(user_id):
+    cache = get_cache()
+    key = _version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version(), timeout=None)
+
+
+def list_cache_key(request, view_name):
+    """Return the cache key of a list response for the request user"""
+    params = sorted(
+        (name, sorted(values))
+        for name, values in request.query_params.lists()
+    )
+    digest = hashlib.md5(
+        repr((request.get_host(), params)).encode("utf-8")
+    ).hexdigest()
+    user_id = request.user.pk
+    version = get_user_version(user_id)
+    return f"recipe:list:{view_name}:{user_id}:{version}:{digest}"
+
+
+class CachedListMixin:
+    """Serve the list action from a per user cache
+
+    The serialized data is stored under a key containing the user's
+    version counter, which the signals in `recipe.signals` bump on every
+    change to the user's recipes, tags or ingredients, so that a stale
+    entry can never be read again.
+    """
+
+    def list(self, request, *args, **kwargs):
+        """Return the cached list response or build and cache it"""
+        cache = get_cache()
+        key = list_cache_key(request, type(self).__name__)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.RECIPE_CACHE_TIMEOUT)
+        return response
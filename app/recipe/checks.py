@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# backend storing the entries in the memory of each process
+LOCAL_MEMORY_CACHE = "django.core.cache.backends.locmem.LocMemCache"
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_list_cache(app_configs, **kwargs):
+    """Warn when the list cache is not shared by the server processes"""
+    backend = settings.CACHES[settings.RECIPE_CACHE_ALIAS]["BACKEND"]
+    if backend != LOCAL_MEMORY_CACHE:
+        return []
+    return [Warning(
+        "The recipe list cache uses a per process backend, a change made "
+        "in one worker process is not seen by the others until "
+        "RECIPE_CACHE_TIMEOUT expires.",
+        hint="Set CACHE_BACKEND to a shared backend such as memcached or "
+             "the database cache, or run a single process.",
+        id="recipe.W001",
+    )]
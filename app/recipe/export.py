@@ -0,0 +1,73 @@
+import csv
+from itertools import islice
+
+from core import fastjson
+from recipe.fastpath import related_ids
+from recipe.serializers import RecipeSerializer
+
+# fields of an exported recipe, the relations by name
+EXPORT_FIELDS = (
+    "id", "title", "price", "time_min", "link", "image", "tags",
+    "ingredients",
+)
+EXPORT_COLUMNS = ("id", "title", "price", "time_min", "link", "image")
+# fields written as a JSON array in a CSV cell
+CSV_JSON_FIELDS = ("tags", "ingredients")
+
+
+def export_rows(queryset, chunk_size):
+    """Yield the exported recipes of a queryset in id order
+
+    The recipes are read with a server side cursor when the database has
+    one, and the tag and ingredient names are fetched once per chunk, so
+    that the memory used does not depend on the number of recipes.
+    """
+    price = RecipeSerializer().fields["price"]
+    rows = queryset.prefetch_related(None).order_by("id").values(
+        *EXPORT_COLUMNS
+    ).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        ids = [row["id"] for row in chunk]
+        tags = related_ids("tags", ids, column="name")
+        ingredients = related_ids("ingredients", ids, column="name")
+        for row in chunk:
+            row["price"] = price.to_representation(row["price"])
+            row["tags"] = tags.get(row["id"], [])
+            row["ingredients"] = ingredients.get(row["id"], [])
+            yield row
+
+
+def ndjson_lines(rows):
+    """Yield the rows as JSON lines"""
+    for row in rows:
+        yield fastjson.dumps(row) + b"\n"
+
+
+class _Echo:
+    """File-like object returning what is written, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    """Yield a header then the rows as CSV lines, the names of the tags
+    and ingredients as a JSON array, which any name can go through"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS).encode("utf-8")
+    for row in rows:
+        yield writer.writerow([
+            fastjson.dumps(row[field]).decode("utf-8")
+            if field in CSV_JSON_FIELDS else row[field]
+            for field in EXPORT_FIELDS
+        ]).encode("utf-8")
+
+
+# {?fmt=: (content type, writer of the rows)}
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", ndjson_lines),
+    "csv": ("text/csv; charset=utf-8", csv_lines),
+}
@@ -0,0 +1,151 @@
+from collections import defaultdict
+
+from django.conf import settings
+from rest_framework.response import Response
+
+from core.models import Recipe
+from core.renditions import stored_rendition_urls
+from recipe.serializers import absolute_urls
+
+
+def related_ids(relation, recipe_ids, chunk_size=500, column=None):
+    """Return the {recipe id: [related ids]} map of a many to many
+    relation of Recipe, read from its through table in id order
+
+    With a `column` the related objects are joined and the values of that
+    column are returned instead of their ids.
+    """
+    field = Recipe._meta.get_field(relation)
+    through = field.remote_field.through
+    target = field.m2m_reverse_field_name() + "_id"
+    value = target if column is None \
+        else f"{field.m2m_reverse_field_name()}__{column}"
+    ids = defaultdict(list)
+    for start in range(0, len(recipe_ids), chunk_size):
+        rows = through.objects.filter(
+            recipe_id__in=recipe_ids[start:start + chunk_size]
+        ).order_by(target).values_list("recipe_id", value)
+        for recipe_id, related_id in rows:
+            ids[recipe_id].append(related_id)
+    return ids
+
+
+def field_columns(sources):
+    """Return the columns of the values of a {field: column} map, a field
+    reading several columns from a tuple, without duplicates"""
+    columns = []
+    for source in sources:
+        columns += [source] if isinstance(source, str) else source
+    return list(dict.fromkeys(columns))
+
+
+class FastListMixin:
+    """Build the list responses straight from values() rows
+
+    The serializers instantiate a model and run every field of every row,
+    which dominates large pages. The fast path reads the columns with
+    values(), formats them like the serializer fields would and returns
+    the same JSON. Views map the serialized fields to their column, or
+    tuple of columns, in `fast_columns` and may format the rows in
+    `fast_serialize`; `use_fast_list` returns False for the requests only
+    the serializer can answer. Disabled by RECIPE_FAST_LIST.
+    """
+    fast_columns = {}
+
+    def use_fast_list(self):
+        return settings.RECIPE_FAST_LIST
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_fast_list():
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        # the pagination reads its ordering fields from the rows
+        ordering = [
+            field.lstrip("-")
+            for field in getattr(self.paginator, "ordering", ())
+        ]
+        columns = field_columns(self.get_fast_fields().values())
+        rows = queryset.prefetch_related(None).values(
+            *dict.fromkeys(columns + ordering)
+        )
+        page = self.paginate_queryset(rows)
+        data = self.fast_serialize(list(rows if page is None else page))
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def get_fast_fields(self):
+        """Return the {field: column} map of the serialized fields"""
+        return self.fast_columns
+
+    def fast_serialize(self, rows):
+        """Return the serialized data of the rows"""
+        fields = list(self.get_fast_fields().items())
+        return [
+            {name: row[column] for name, column in fields}
+            for row in rows
+        ]
+
+
+class RecipeFastListMixin(FastListMixin):
+    """Fast path of the recipe list, identical to RecipeSerializer
+
+    The price is formatted by the serializer field itself, the tag and
+    ingredient ids are read from the through tables in one query per
+    relation and page.
+    """
+
+    def use_fast_list(self):
+        """Only serve the plain and sparse lists, not the expanded ones"""
+        _, expand = self._sparse_fields()
+        return super().use_fast_list() and not expand and \
+            self.get_serializer_class() is self.serializer_class
+
+    def get_fast_fields(self):
+        """Return the {field: column} map of the requested fields, the
+        relations being read from the id column"""
+        fields, _ = self._sparse_fields()
+        return {
+            name: self.fast_columns[name]
+            for name in self.serializer_class.Meta.fields
+            if fields is None or name in fields
+        }
+
+    def fast_serialize(self, rows):
+        request = self.request
+        storage = Recipe._meta.get_field("image").storage
+
+        def column(name):
+            return lambda row: row[name]
+
+        def relation(name):
+            ids = related_ids(name, [row["id"] for row in rows])
+            return lambda row: ids.get(row["id"], [])
+
+        def price(field):
+            return lambda row: field.to_representation(row["price"])
+
+        def renditions(row):
+            if not row["image"]:
+                return {}
+            return absolute_urls(stored_rendition_urls(
+                row["image"], row["ready_renditions"], storage
+            ), request)
+
+        getters = []
+        for name, source in self.get_fast_fields().items():
+            if name == "price":
+                getter = price(self.get_serializer().fields["price"])
+            elif name in ("tags", "ingredients"):
+                getter = relation(name)
+            elif name == "renditions":
+                getter = renditions
+            else:
+                getter = column(source)
+            getters.append((name, getter))
+
+        return [
+            {name: getter(row) for name, getter in getters}
+            for row in rows
+        ]
@@ -0,0 +1,94 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Case, Count, Exists, F, FloatField, \
+    IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Cast
+
+from core.search import search_enabled
+
+MATCH_ANY = "any"
+MATCH_ALL = "all"
+
+# default weights of PostgreSQL for the A (title) and B (names) labels
+TITLE_WEIGHT = 1.0
+NAME_WEIGHT = 0.4
+
+
+def filter_related(queryset, relation, ids, match=MATCH_ANY):
+    """Filter recipes linked to any or all of the `ids` of `relation`
+
+    The condition is a correlated subquery on the m2m table instead of a
+    join, so each recipe is returned once whatever the number of matching
+    ids, and no DISTINCT is needed.
+    """
+    field = queryset.model._meta.get_field(relation)
+    through = field.remote_field.through
+    column = field.m2m_reverse_field_name()
+    related = through.objects.filter(
+        **{field.m2m_field_name(): OuterRef("pk"), f"{column}__in": ids}
+    )
+    alias = f"_{relation}_matched"
+
+    if match == MATCH_ALL:
+        matched = related.order_by().values(
+            field.m2m_field_name()
+        ).annotate(matched=Count("pk")).values("matched")
+        return queryset.annotate(**{
+            alias: Subquery(matched, output_field=IntegerField())
+        }).filter(**{alias: len(set(ids))})
+
+    return queryset.annotate(**{alias: Exists(related)}).filter(
+        **{alias: True}
+    )
+
+
+def assigned_only(queryset):
+    """Filter tags or ingredients assigned to at least one recipe"""
+    through = queryset.model.recipe.through
+    column = queryset.model._meta.model_name
+    return queryset.annotate(
+        _assigned=Exists(through.objects.filter(**{column: OuterRef("pk")}))
+    ).filter(_assigned=True)
+
+
+def search(queryset, text):
+    """Filter recipes matching every word of `text` and annotate them with
+    their `rank`
+
+    On PostgreSQL the stored search vectors are matched through their GIN
+    index. Elsewhere each word is looked up in the title and in the tag
+    and ingredient names, weighted like the vectors.
+
+    The rank is a double precision number on every database, so the value
+    stored in a pagination cursor compares equal to the rank of its row.
+    """
+    if search_enabled(queryset.db):
+        query = SearchQuery(text, config=settings.RECIPE_SEARCH_CONFIG)
+        # ts_rank is a real, read back as an inexact Python float
+        return queryset.filter(search_vector=query).annotate(
+            rank=Cast(SearchRank(F("search_vector"), query), FloatField())
+        )
+
+    rank = Value(0.0, output_field=FloatField())
+    for i, word in enumerate(text.split()):
+        tag_alias, ingredient_alias = f"_tag_{i}", f"_ingredient_{i}"
+        queryset = queryset.annotate(**{
+            tag_alias: Exists(queryset.model.tags.through.objects.filter(
+                recipe=OuterRef("pk"), tag__name__icontains=word
+            )),
+            ingredient_alias: Exists(
+                queryset.model.ingredients.through.objects.filter(
+                    recipe=OuterRef("pk"), ingredient__name__icontains=word
+                )
+            ),
+        })
+        in_names = Q(**{tag_alias: True}) | Q(**{ingredient_alias: True})
+        queryset = queryset.filter(Q(title__icontains=word) | in_names)
+        rank = rank + Case(
+            When(title__icontains=word, then=Value(TITLE_WEIGHT)),
+            default=Value(0.0), output_field=FloatField()
+        ) + Case(
+            When(in_names, then=Value(NAME_WEIGHT)),
+            default=Value(0.0), output_field=FloatField()
+        )
+    return queryset.annotate(rank=rank)
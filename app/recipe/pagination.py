@@ -0,0 +1,178 @@
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """Keyset pagination only applied when the client asks for it
+
+    Listing endpoints keep returning a plain list unless the request
+    carries a `cursor` or a `page_size` query parameter. The ordering may
+    span several fields as long as the last one is unique (usually the
+    id): the cursor then stores the values of every ordering field for the
+    last row of the page, and the next page is fetched with a
+    `WHERE (a, b) < (x, y) LIMIT n` condition. The cost of a page does not
+    depend on how deep it is, and it can be served by an index matching
+    the ordering.
+    """
+    page_size_query_param = "page_size"
+    # paginate even when the client did not ask for it
+    always_paginate = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Paginate the queryset if pagination was requested"""
+        params = request.query_params
+        if (not self.always_paginate
+                and self.cursor_query_param not in params
+                and self.page_size_query_param not in params):
+            return None
+
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            reverse, current_position = False, None
+        else:
+            reverse, current_position = self.cursor.reverse, \
+                self.cursor.position
+
+        if reverse:
+            queryset = queryset.order_by(*self._reversed_ordering())
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            queryset = queryset.filter(
+                self._position_filter(current_position, reverse)
+            )
+
+        # fetch one extra row to know if there is a following page
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+
+        if len(results) > len(self.page):
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+        else:
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = current_position is not None
+            self.has_previous = following_position is not None
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next = following_position is not None
+            self.has_previous = current_position is not None
+            self.next_position = following_position
+            self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_page_size(self, request):
+        """Return the requested page size, bounded by the settings"""
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return settings.API_PAGE_SIZE
+        if page_size <= 0:
+            return settings.API_PAGE_SIZE
+        return min(page_size, settings.API_MAX_PAGE_SIZE)
+
+    def decode_cursor(self, request):
+        """Return the cursor of the request with its position decoded"""
+        cursor = super().decode_cursor(request)
+        if cursor is None or cursor.position is None:
+            return cursor
+
+        try:
+            position = json.loads(cursor.position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if (not isinstance(position, list)
+                or len(position) != len(self.ordering)):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor._replace(position=position)
+
+    def encode_cursor(self, cursor):
+        """Return the url of the page starting after the cursor position"""
+        if isinstance(cursor.position, list):
+            cursor = cursor._replace(position=self._dump(cursor.position))
+        return super().encode_cursor(cursor)
+
+    def _get_position_from_instance(self, instance, ordering):
+        """Return the values of the ordering fields for a row"""
+        position = []
+        for field in ordering:
+            name = field.lstrip("-")
+            if isinstance(instance, dict):
+                position.append(instance[name])
+            else:
+                position.append(getattr(instance, name))
+        # round trip through JSON so positions compare like decoded cursors
+        return json.loads(self._dump(position))
+
+    def _dump(self, position):
+        """Serialize a position to be stored in a cursor"""
+        return json.dumps(position, cls=DjangoJSONEncoder,
+                          separators=(",", ":"))
+
+    def _reversed_ordering(self):
+        """Return the ordering fields with their direction inverted"""
+        return tuple(
+            field[1:] if field.startswith("-") else f"-{field}"
+            for field in self.ordering
+        )
+
+    def _position_filter(self, position, reverse):
+        """Return the condition selecting the rows after `position`"""
+        fields = [
+            (field.lstrip("-"), field.startswith("-"))
+            for field in self.ordering
+        ]
+        condition = Q()
+        for i, (name, descending) in enumerate(fields):
+            lookup = "lt" if descending != reverse else "gt"
+            clause = Q(**{f"{name}__{lookup}": position[i]})
+            for j, (previous, _) in enumerate(fields[:i]):
+                clause &= Q(**{previous: position[j]})
+            condition |= clause
+
+        # redundant bound on the first field so that the database can seek
+        # straight to the start of the page in the index
+        name, descending = fields[0]
+        lookup = "lte" if descending != reverse else "gte"
+        return Q(**{f"{name}__{lookup}": position[0]}) & condition
+
+
+class RecipeCursorPagination(KeysetPagination):
+    """Paginate recipes from the newest to the oldest using their id"""
+    ordering = ("-id",)
+
+
+class NameCursorPagination(KeysetPagination):
+    """Paginate tags and ingredients by name, the id breaking the ties"""
+    ordering = ("-name", "-id")
+
+
+class RecipeSearchPagination(KeysetPagination):
+    """Paginate search results from the best ranked, always bounded since
+    a search may match most of the recipes
+
+    The rank is not indexed: every page still computes it for all the
+    matching recipes before keeping the best ones, only the response size
+    is bounded.
+    """
+    ordering = ("-rank", "-id")
+    always_paginate = True
@@ -1,7 +1,9 @@
+from django.conf import settings
 from django.db.models.query import QuerySet
 from rest_framework import serializers
 
 from core.models import Tag, Ingredient, Recipe
+from core.renditions import rendition_urls
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -20,7 +22,67 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ("id",)
         
 
-class RecipeSerializer(serializers.ModelSerializer):
+class NameListSerializer(serializers.Serializer):
+    """Serializer for a list of tag or ingredient names"""
+    names = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        allow_empty=False
+    )
+
+    def validate_names(self, value):
+        """Limit the number of names and remove the duplicated ones"""
+        if len(value) > settings.RECIPE_BATCH_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"Ensure this field has no more than "
+                f"{settings.RECIPE_BATCH_MAX_SIZE} elements."
+            )
+        return list(dict.fromkeys(value))
+
+
+def absolute_urls(urls, request):
+    """Return the {name: url} map with absolute urls if there is a
+    request"""
+    if request is None:
+        return urls
+    return {
+        name: request.build_absolute_uri(url)
+        for name, url in urls.items()
+    }
+
+
+class RenditionsMixin(serializers.Serializer):
+    """Expose the URLs of the recipe image renditions already created"""
+    renditions = serializers.SerializerMethodField()
+
+    def get_renditions(self, obj):
+        """Return the {rendition: url} map of the recipe image"""
+        return absolute_urls(rendition_urls(obj), self.context.get("request"))
+
+
+class SparseFieldsMixin:
+    """Restrict the fields to the `fields` of the serializer context and
+    inline the related objects named in its `expand`
+
+    The view validates both, `fields` is None to keep every field. The
+    expanded relations are always serialized.
+    """
+    expandable = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        expand = self.context.get("expand", ())
+        for name in expand:
+            self.fields[name] = self.expandable[name](
+                many=True, read_only=True
+            )
+        fields = self.context.get("fields")
+        if fields is not None:
+            for name in set(self.fields) - set(fields) - set(expand):
+                self.fields.pop(name)
+
+
+class RecipeSerializer(SparseFieldsMixin, RenditionsMixin,
+                       serializers.ModelSerializer):
     """Serializer for the Recipe object"""
     # on doit préciser les types des fields des cles externes car elles font référence a des tables externes
     ingredients = serializers.PrimaryKeyRelatedField( # permet de récupérer seulement les pk des ingredients, ici on ne cherche pas a avoir toutes les donnees des ingredients 
@@ -31,10 +93,15 @@ class RecipeSerializer(serializers.ModelSerializer):
         many=True,
         queryset=Tag.objects.all()
     )
+    expandable = {
+        "ingredients": IngredientSerializer,
+        "tags": TagSerializer,
+    }
+
     class Meta:
         model = Recipe
         fields = ("id", "title", "price", "time_min", "link",
-                  "ingredients", "tags")
+                  "ingredients", "tags", "renditions")
         read_only_fields = ("id",)
 
 
@@ -44,10 +111,36 @@ class RecipeDetailSerializer(RecipeSerializer):
     tags = TagSerializer(many=True, read_only=True)
 
 
-class RecipeImageSerializer(serializers.ModelSerializer):
+class RecipeImageSerializer(RenditionsMixin, serializers.ModelSerializer):
     """Serializer for uploading images to recipes"""
     
     class Meta:
         model = Recipe
-        fields = ("id", "image")
-        read_only_fields = ("id",)
\ No newline at end of file
+        fields = ("id", "image", "renditions")
+        read_only_fields = ("id",)
+
+
+class RecipeBatchItemSerializer(RecipeSerializer):
+    """Serializer validating one recipe of a batch creation
+
+    Related ids are only type checked here, the view checks they exist
+    for the whole batch at once instead of one query per id.
+    """
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False,
+        default=list
+    )
+    tags = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False,
+        default=list
+    )
+
+    def validate_ingredients(self, value):
+        """Remove duplicated ingredient ids"""
+        return list(dict.fromkeys(value))
+
+    def validate_tags(self, value):
+        """Remove duplicated tag ids"""
+        return list(dict.fromkeys(value))
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import Tag, Ingredient, Recipe
+from core.renditions import renditions_ready
+
+from recipe.cache import bump_user_version
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_owner_cache(sender, instance, **kwargs):
+    """Invalidate the cached lists of the object owner"""
+    bump_user_version(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_cache_on_m2m(sender, instance, action, **kwargs):
+    """Invalidate the cached lists when recipe relations change"""
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump_user_version(instance.user_id)
+
+
+@receiver(renditions_ready, sender=Recipe)
+def invalidate_cache_on_renditions(sender, instance, **kwargs):
+    """Invalidate the cached lists once the image renditions are ready"""
+    bump_user_version(instance.user_id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def init_user_cache(sender, instance, created, **kwargs):
+    """Start new users on a fresh version of the cache"""
+    if created:
+        bump_user_version(instance.pk)
@@ -0,0 +1,44 @@
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """Mixin for TestCase adding assertions on the number of SQL queries"""
+
+    @contextmanager
+    def assertMaxQueries(self, budget, using=DEFAULT_DB_ALIAS):
+        """Fail if the wrapped block runs more than `budget` queries"""
+        with CaptureQueriesContext(connections[using]) as context:
+            yield context
+
+        executed = len(context.captured_queries)
+        if executed > budget:
+            queries = "\n".join(
+                f"{i}. {query['sql']}"
+                for i, query in enumerate(context.captured_queries, start=1)
+            )
+            self.fail(
+                f"{executed} queries executed, budget was {budget}:\n"
+                f"{queries}"
+            )
+
+    def assertConstantQueries(self, make_rows, request, sizes=(1, 10)):
+        """Check that `request` runs the same number of queries whatever
+        the number of rows created by `make_rows`"""
+        counts = []
+        created = 0
+        for size in sizes:
+            make_rows(size - created)
+            created = size
+            with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as ctx:
+                request()
+            counts.append(len(ctx.captured_queries))
+
+        self.assertEqual(
+            len(set(counts)), 1,
+            f"query count grows with the number of rows: "
+            f"{dict(zip(sizes, counts))}"
+        )
+        return counts[0]
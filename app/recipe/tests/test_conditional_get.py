@@ -0,0 +1,160 @@
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from django.utils.http import http_date
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+
+from recipe.tests.query_budget import QueryBudgetMixin
+from recipe.tests.test_recipe_api import RECIPES_URL, create_sample_recipe, \
+    detail_url, sample_tag
+
+
+class ConditionalGetTests(QueryBudgetMixin, TestCase):
+    """Test ETag and Last-Modified handling of the recipe API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="antonin.marzelle@outlook.fr",
+            password="testPassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = create_sample_recipe(user=self.user)
+        # move the recipe in the past so that changes are visible
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            modified_at=timezone.now() - timedelta(days=1)
+        )
+
+    def test_detail_validators(self):
+        """Test the detail response carries ETag and Last-Modified"""
+        res = self.client.get(detail_url(self.recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn("ETag", res)
+        self.assertIn("Last-Modified", res)
+        self.assertIn("no-cache", res["Cache-Control"])
+
+    def test_detail_not_modified(self):
+        """Test a matching If-None-Match returns 304 in a single query"""
+        etag = self.client.get(detail_url(self.recipe.id))["ETag"]
+
+        with self.assertMaxQueries(1):
+            res = self.client.get(
+                detail_url(self.recipe.id), HTTP_IF_NONE_MATCH=etag
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res["ETag"], etag)
+        self.assertEqual(res.content, b"")
+
+    def test_detail_if_modified_since(self):
+        """Test a current If-Modified-Since returns 304"""
+        last_modified = self.client.get(
+            detail_url(self.recipe.id)
+        )["Last-Modified"]
+
+        res = self.client.get(
+            detail_url(self.recipe.id), HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_modified_by_m2m_change(self):
+        """Test adding a tag changes the recipe ETag"""
+        etag = self.client.get(detail_url(self.recipe.id))["ETag"]
+        self.recipe.tags.add(sample_tag(user=self.user))
+
+        res = self.client.get(
+            detail_url(self.recipe.id), HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], etag)
+        self.assertEqual(len(res.data["tags"]), 1)
+
+    def test_detail_modified_by_tag_rename(self):
+        """Test renaming a tag changes the ETag of its recipes"""
+        tag = sample_tag(user=self.user)
+        self.recipe.tags.add(tag)
+        etag = self.client.get(detail_url(self.recipe.id))["ETag"]
+
+        tag.name = "Renamed"
+        tag.save()
+        res = self.client.get(
+            detail_url(self.recipe.id), HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["tags"][0]["name"], "Renamed")
+
+    def test_detail_invalid_id(self):
+        """Test a malformed id returns a 404"""
+        res = self.client.get(detail_url("abc"))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_not_modified(self):
+        """Test a matching If-None-Match on the list returns 304"""
+        etag = self.client.get(RECIPES_URL)["ETag"]
+
+        with self.assertMaxQueries(1):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_modified_on_update(self):
+        """Test updating a recipe changes the list ETag"""
+        etag = self.client.get(RECIPES_URL)["ETag"]
+        self.recipe.title = "Changed"
+        self.recipe.save()
+
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]["title"], "Changed")
+
+    def test_list_modified_on_delete(self):
+        """Test deleting a recipe changes the list ETag"""
+        create_sample_recipe(user=self.user, title="Newest")
+        etag = self.client.get(RECIPES_URL)["ETag"]
+        self.recipe.delete()
+
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+
+    def test_list_without_last_modified(self):
+        """Test the list is only validated by its ETag, If-Modified-Since
+        missing the deletion of an older recipe"""
+        create_sample_recipe(user=self.user, title="Newest")
+        res = self.client.get(RECIPES_URL)
+        self.assertNotIn("Last-Modified", res)
+        self.recipe.delete()
+
+        res = self.client.get(
+            RECIPES_URL, HTTP_IF_MODIFIED_SINCE=http_date(time.time())
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+
+    def test_list_etag_per_user(self):
+        """Test an ETag of another user does not match"""
+        etag = self.client.get(RECIPES_URL)["ETag"]
+        user2 = get_user_model().objects.create_user(
+            email="antonin@noirlumiere.com",
+            password="testPassword2"
+        )
+        self.client.force_authenticate(user2)
+
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
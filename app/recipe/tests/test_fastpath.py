@@ -0,0 +1,91 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+from recipe.cache import get_cache
+from recipe.tests.query_budget import QueryBudgetMixin
+
+RECIPES_URL = reverse("recipe:recipe-list")
+TAGS_URL = reverse("recipe:tag-list")
+INGREDIENTS_URL = reverse("recipe:ingredient-list")
+
+
+class FastListTests(QueryBudgetMixin, TestCase):
+    """Test the fast path lists are identical to the serializer ones"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="antonin.marzelle@outlook.fr",
+            password="testPassword"
+        )
+        self.client.force_authenticate(self.user)
+        tags = [Tag.objects.create(user=self.user, name=name)
+                for name in ("Vegan", "Dessert", "Quick")]
+        ingredients = [Ingredient.objects.create(user=self.user, name=name)
+                       for name in ("Sugar", "Lemon", "Salt")]
+        Ingredient.objects.create(user=self.user, name="Unused")
+        for i, (title, price) in enumerate([
+                ("Lemon sorbet", "4.50"), ("Salted caramel", "12.00"),
+                ("Fruit salad", "7.25"), ("Plain rice", "1.10")]):
+            recipe = Recipe.objects.create(
+                user=self.user, title=title, time_min=10 + i, price=price,
+                link="https://example.com" if i % 2 else ""
+            )
+            # linked in reverse order, the ids must come out sorted
+            recipe.tags.add(*reversed(tags[:i]))
+            recipe.ingredients.add(*reversed(ingredients[i % 3:]))
+        Recipe.objects.filter(title="Plain rice").update(
+            image="uploads/recipe/missing.jpg"
+        )
+
+    def assertSameContent(self, url, params=None):
+        """Check the fast and the serializer lists have the same body"""
+        get_cache().clear()
+        fast = self.client.get(url, params)
+        get_cache().clear()
+        with override_settings(RECIPE_FAST_LIST=False):
+            slow = self.client.get(url, params)
+
+        self.assertEqual(fast.status_code, 200)
+        self.assertEqual(fast.content, slow.content)
+        return fast
+
+    def test_recipe_list(self):
+        """Test the recipe list is identical"""
+        res = self.assertSameContent(RECIPES_URL)
+
+        self.assertEqual(len(res.json()), 4)
+
+    def test_recipe_list_paginated(self):
+        """Test the pages and their links are identical"""
+        res = self.assertSameContent(RECIPES_URL, {"page_size": 3})
+        self.assertSameContent(res.json()["next"])
+
+    def test_recipe_list_filtered(self):
+        """Test the filtered and searched lists are identical"""
+        tag = Tag.objects.get(name="Dessert")
+        self.assertSameContent(RECIPES_URL, {"tags": str(tag.id)})
+        self.assertSameContent(RECIPES_URL, {"search": "lemon"})
+
+    def test_recipe_sparse_fields(self):
+        """Test the sparse lists are identical"""
+        self.assertSameContent(RECIPES_URL, {"fields": "title,price,tags"})
+        self.assertSameContent(RECIPES_URL, {"fields": "renditions"})
+
+    def test_tag_and_ingredient_lists(self):
+        """Test the tag and ingredient lists are identical"""
+        self.assertSameContent(TAGS_URL)
+        self.assertSameContent(INGREDIENTS_URL, {"assigned_only": 1})
+        self.assertSameContent(INGREDIENTS_URL, {"page_size": 2})
+
+    def test_recipe_list_queries(self):
+        """Test the fast path reads each relation in one query"""
+        get_cache().clear()
+
+        # validators, recipes, tags and ingredients
+        with self.assertMaxQueries(4):
+            self.client.get(RECIPES_URL)
@@ -125,4 +125,39 @@ class PrivateIngredientApiTests(TestCase):
         
         res = self.client.get(INGREDIENT_URL, {"assigned_only":1})
         
-        self.assertEqual(len(res.data), 1)
\ No newline at end of file
+        self.assertEqual(len(res.data), 1)
+
+    def test_paginate_ingredients(self):
+        """Test ingredients are paginated by name when requested"""
+        for name in ["salt", "pepper", "apple"]:
+            Ingredient.objects.create(user=self.user, name=name)
+
+        first = self.client.get(INGREDIENT_URL, {"page_size": 2})
+        second = self.client.get(first.data["next"])
+
+        self.assertEqual(
+            [ingredient["name"] for ingredient in first.data["results"]],
+            ["salt", "pepper"]
+        )
+        self.assertEqual(
+            [ingredient["name"] for ingredient in second.data["results"]],
+            ["apple"]
+        )
+        self.assertIsNone(second.data["next"])
+
+    def test_bulk_upsert_ingredients(self):
+        """Test getting or creating ingredients by name in bulk"""
+        salt = Ingredient.objects.create(user=self.user, name="salt")
+
+        res = self.client.post(
+            reverse("recipe:ingredient-bulk-upsert"),
+            {"names": ["salt", "pepper"]},
+            format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        pepper = Ingredient.objects.get(user=self.user, name="pepper")
+        self.assertEqual(
+            [ingredient["id"] for ingredient in res.data],
+            [salt.id, pepper.id]
+        )
@@ -0,0 +1,179 @@
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+
+from recipe.cache import bump_user_version, get_user_version
+from recipe.checks import check_shared_list_cache
+from recipe.tests.query_budget import QueryBudgetMixin
+from recipe.tests.test_recipe_api import RECIPES_URL, create_sample_recipe, \
+    detail_url, sample_ingredient, sample_tag
+from recipe.tests.test_tag_api import TAGS_URL
+from recipe.tests.test_ingredient_api import INGREDIENT_URL
+
+
+class ListCacheTests(QueryBudgetMixin, TestCase):
+    """Test the per user cache of the recipe API lists"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="antonin.marzelle@outlook.fr",
+            password="testPassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = create_sample_recipe(user=self.user, title="Pancakes")
+
+    def test_list_served_from_cache(self):
+        """Test a repeated list request only checks the validators"""
+        first = self.client.get(RECIPES_URL)
+
+        with self.assertMaxQueries(1):
+            second = self.client.get(RECIPES_URL)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+
+    def test_tag_list_served_from_cache(self):
+        """Test a repeated tag list request does not hit the database"""
+        Tag.objects.create(user=self.user, name="Vegan")
+        first = self.client.get(TAGS_URL)
+
+        with self.assertMaxQueries(0):
+            second = self.client.get(TAGS_URL)
+
+        self.assertEqual(second.data, first.data)
+
+    def test_query_string_part_of_key(self):
+        """Test responses are cached per query string"""
+        tag = sample_tag(user=self.user)
+        self.recipe.tags.add(tag)
+        create_sample_recipe(user=self.user, title="Steak")
+
+        all_recipes = self.client.get(RECIPES_URL)
+        tagged = self.client.get(RECIPES_URL, {"tags": str(tag.id)})
+
+        self.assertEqual(len(all_recipes.data), 2)
+        self.assertEqual(len(tagged.data), 1)
+
+    def test_cache_per_user(self):
+        """Test users never see the cached lists of other users"""
+        self.client.get(RECIPES_URL)
+        user2 = get_user_model().objects.create_user(
+            email="antonin@noirlumiere.com",
+            password="testPassword2"
+        )
+        client2 = APIClient()
+        client2.force_authenticate(user2)
+
+        res = client2.get(RECIPES_URL)
+
+        self.assertEqual(res.data, [])
+
+    def test_invalidated_on_create(self):
+        """Test creating a recipe invalidates the cached list"""
+        self.client.get(RECIPES_URL)
+        create_sample_recipe(user=self.user, title="Steak")
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data), 2)
+
+    def test_invalidated_on_update_and_delete(self):
+        """Test updating and deleting recipes invalidates the cached list"""
+        self.client.get(RECIPES_URL)
+        self.client.patch(detail_url(self.recipe.id), {"title": "Crepes"})
+
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.data[0]["title"], "Crepes")
+
+        self.recipe.delete()
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.data, [])
+
+    def test_invalidated_on_m2m_change(self):
+        """Test adding tags or ingredients invalidates the cached list"""
+        self.client.get(RECIPES_URL)
+        tag = sample_tag(user=self.user)
+        ingredient = sample_ingredient(user=self.user)
+
+        tag.recipe.add(self.recipe)
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.data[0]["tags"], [tag.id])
+
+        self.recipe.ingredients.add(ingredient)
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.data[0]["ingredients"], [ingredient.id])
+
+        self.recipe.tags.clear()
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.data[0]["tags"], [])
+
+    def test_tags_and_ingredients_invalidated(self):
+        """Test tag and ingredient lists are invalidated on changes"""
+        self.client.get(TAGS_URL)
+        self.client.get(INGREDIENT_URL)
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        Ingredient.objects.create(user=self.user, name="Salt")
+
+        self.assertEqual(len(self.client.get(TAGS_URL).data), 1)
+        self.assertEqual(len(self.client.get(INGREDIENT_URL).data), 1)
+
+        tag.name = "Dessert"
+        tag.save()
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res.data[0]["name"], "Dessert")
+
+    @override_settings(CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": tempfile.mkdtemp(),
+        }
+    })
+    def test_file_based_cache(self):
+        """Test the cache works with the file based backend"""
+        first = self.client.get(RECIPES_URL)
+        with self.assertMaxQueries(1):
+            self.client.get(RECIPES_URL)
+
+        Recipe.objects.create(
+            user=self.user, title="Steak", time_min=5, price=10
+        )
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(first.data), 1)
+        self.assertEqual(len(res.data), 2)
+
+
+class ListCacheCommitTests(TransactionTestCase):
+    """Test the invalidation of the cache around transactions"""
+
+    def test_version_bumped_again_on_commit(self):
+        """Test a change bumps the version again once committed"""
+        with transaction.atomic():
+            bump_user_version(1)
+            during = get_user_version(1)
+
+        self.assertNotEqual(get_user_version(1), during)
+
+    def test_shared_cache_deploy_check(self):
+        """Test the deploy checks warn about a per process list cache"""
+        locmem = {"default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }}
+        with override_settings(CACHES=locmem):
+            self.assertEqual(
+                [warning.id for warning in check_shared_list_cache(None)],
+                ["recipe.W001"]
+            )
+        dummy = {"default": {
+            "BACKEND": "django.core.cache.backends.dummy.DummyCache",
+        }}
+        with override_settings(CACHES=dummy):
+            self.assertEqual(check_shared_list_cache(None), [])
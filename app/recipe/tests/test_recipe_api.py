@@ -1,18 +1,21 @@
 import tempfile # permet de gérer des fichiers temporairement save
 import os
+from unittest.mock import patch
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model
 from django.urls import reverse
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
 from rest_framework import serializers, status
 from rest_framework.test import APIClient
 
 from core.models import *
+from core.renditions import delete_renditions
 
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+from recipe.tests.query_budget import QueryBudgetMixin
 
 RECIPES_URL = reverse("recipe:recipe-list")
 
@@ -168,6 +171,7 @@ class PrivateTestApiRecipe(TestCase):
         self.assertIn(ingredient1, ingredients)
         self.assertIn(ingredient2, ingredients)
         
+@override_settings(RECIPE_IMAGE_WORKERS=0)
 class RecipeImageUploadTest(TestCase):
     
     def setUp(self):
@@ -182,6 +186,11 @@ class RecipeImageUploadTest(TestCase):
 
     def tearDown(self): # Fonction comme setUp, appelé auto a la fin du test
         """Assure qu'aucune image reste enregistré apres notre test"""
+        self.recipe.refresh_from_db()
+        if self.recipe.image:
+            delete_renditions(
+                self.recipe.image.name, self.recipe.image.storage
+            )
         self.recipe.image.delete()
         
     def test_upload_image_to_recipe(self):
@@ -198,6 +207,52 @@ class RecipeImageUploadTest(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertIn("image", res.data)
         self.assertTrue(os.path.exists(self.recipe.image.path))
+
+    def test_upload_image_creates_renditions(self):
+        """Test uploading an image creates its resized renditions"""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix=".png") as ntf:
+            Image.new("RGBA", (1000, 500)).save(ntf, format="PNG")
+            ntf.seek(0)
+            res = self.client.post(url, {"image": ntf}, format="multipart")
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            set(res.data["renditions"]), {"thumb", "card", "full"}
+        )
+        thumb = self.recipe.image.path.rsplit(".", 1)[0] + "_thumb.jpg"
+        with Image.open(thumb) as image:
+            self.assertEqual(image.format, "JPEG")
+            self.assertEqual(image.size, (160, 80))
+
+        # the URLs are built from the row, the storage is not queried
+        with patch("core.storage.ContentAddressedStorage.exists") as exists:
+            res = self.client.get(detail_url(self.recipe.id))
+            self.assertTrue(res.data["renditions"]["card"].startswith(
+                "http://testserver/"
+            ))
+            res = self.client.get(RECIPES_URL)
+            self.assertIn("thumb", res.data[0]["renditions"])
+        exists.assert_not_called()
+
+    def test_replace_image_resets_renditions(self):
+        """Test the renditions of a replaced image are not served"""
+        self.recipe.image = "uploads/recipe/old.jpg"
+        self.recipe.save()
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            ready_renditions="thumb,card,full"
+        )
+        self.recipe.refresh_from_db()
+
+        self.recipe.image = "uploads/recipe/new.jpg"
+        self.recipe.save()
+        self.recipe.refresh_from_db()
+
+        self.assertEqual(self.recipe.ready_renditions, "")
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertEqual(res.data["renditions"], {})
+        self.recipe.image = None
+        self.recipe.save()
         
     def test_upload_image_bad_request(self):
         """Test uploading an invalid image"""
@@ -252,5 +307,405 @@ class RecipeImageUploadTest(TestCase):
         self.assertIn(serializer1.data, res.data)
         self.assertIn(serializer2.data, res.data)
         self.assertNotIn(serializer3.data, res.data)
-        
-           
\ No newline at end of file
+
+
+class RecipeQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Test the number of queries run by the recipe API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="antonin.marzelle@outlook.fr",
+            password="testPassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.tag1 = sample_tag(user=self.user, name="Dessert")
+        self.tag2 = sample_tag(user=self.user, name="Vegan")
+        self.ingredient = sample_ingredient(user=self.user, name="Sugar")
+
+    def create_recipes(self, count):
+        """Create `count` recipes linked to tags and ingredients"""
+        for _ in range(count):
+            recipe = create_sample_recipe(user=self.user)
+            recipe.tags.add(self.tag1, self.tag2)
+            recipe.ingredients.add(self.ingredient)
+
+    def test_list_queries_do_not_grow_with_rows(self):
+        """Test listing recipes runs a fixed number of queries"""
+        count = self.assertConstantQueries(
+            self.create_recipes,
+            lambda: self.client.get(RECIPES_URL),
+            sizes=(1, 5, 20),
+        )
+
+        # validators, recipes, tags and ingredients
+        self.assertLessEqual(count, 4)
+
+    def test_detail_query_budget(self):
+        """Test retrieving a recipe loads its relations in bulk"""
+        self.create_recipes(1)
+        recipe = Recipe.objects.get(user=self.user)
+
+        with self.assertMaxQueries(4):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["tags"]), 2)
+        self.assertEqual(len(res.data["ingredients"]), 1)
+
+
+class RecipePaginationTests(QueryBudgetMixin, TestCase):
+    """Test the opt-in cursor pagination of the recipe API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="antonin.marzelle@outlook.fr",
+            password="testPassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.recipes = [
+            create_sample_recipe(user=self.user, title=f"Recipe {i}")
+            for i in range(5)
+        ]
+
+    def test_list_not_paginated_by_default(self):
+        """Test the recipe list stays a plain list without pagination params"""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(res.data, list)
+        self.assertEqual(len(res.data), 5)
+
+    def test_paginate_with_page_size(self):
+        """Test walking through the recipes page by page"""
+        res = self.client.get(RECIPES_URL, {"page_size": 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(res.data["previous"])
+        ids = [recipe["id"] for recipe in res.data["results"]]
+
+        seen = list(ids)
+        next_url = res.data["next"]
+        while next_url:
+            res = self.client.get(next_url)
+            seen.extend(recipe["id"] for recipe in res.data["results"])
+            next_url = res.data["next"]
+
+        expected = [recipe.id for recipe in reversed(self.recipes)]
+        self.assertEqual(seen, expected)
+        self.assertEqual(ids, expected[:2])
+
+    def test_previous_page(self):
+        """Test going back to the previous page with the cursor"""
+        first = self.client.get(RECIPES_URL, {"page_size": 2})
+        second = self.client.get(first.data["next"])
+        back = self.client.get(second.data["previous"])
+
+        self.assertEqual(back.data["results"], first.data["results"])
+
+    def test_page_size_bounded(self):
+        """Test the page size can not exceed the configured maximum"""
+        with self.settings(API_MAX_PAGE_SIZE=3):
+            res = self.client.get(RECIPES_URL, {"page_size": 50})
+
+        self.assertEqual(len(res.data["results"]), 3)
+
+    def test_invalid_cursor(self):
+        """Test an invalid cursor returns a 404"""
+        res = self.client.get(RECIPES_URL, {"cursor": "invalid"})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_deep_page_query_budget(self):
+        """Test a deep page costs the same number of queries as the first"""
+        with self.assertMaxQueries(4):
+            first = self.client.get(RECIPES_URL, {"page_size": 1})
+        cursor_url = first.data["next"]
+        for _ in range(3):
+            cursor_url = self.client.get(cursor_url).data["next"]
+
+        with self.assertMaxQueries(4):
+            res = self.client.get(cursor_url)
+
+        self.assertEqual(
+            [recipe["id"] for recipe in res.data["results"]],
+            [self.recipes[0].id]
+        )
+
+
+BATCH_URL = reverse("recipe:recipe-batch-create")
+
+
+class RecipeBatchCreateTests(QueryBudgetMixin, TestCase):
+    """Test creating recipes in batch"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="antonin.marzelle@outlook.fr",
+            password="testPassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = sample_tag(user=self.user, name="Dessert")
+        self.ingredient = sample_ingredient(user=self.user, name="Sugar")
+
+    def payload(self, count):
+        """Return a batch of `count` valid recipes"""
+        return [
+            {
+                "title": f"Cake {i}",
+                "time_min": 30,
+                "price": "6.50",
+                "tags": [self.tag.id],
+                "ingredients": [self.ingredient.id],
+            }
+            for i in range(count)
+        ]
+
+    def test_batch_create(self):
+        """Test creating several recipes with their relations"""
+        res = self.client.post(BATCH_URL, self.payload(3), format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data["results"]), 3)
+        recipes = Recipe.objects.filter(user=self.user).order_by("id")
+        self.assertEqual(recipes.count(), 3)
+        for result, recipe in zip(res.data["results"], recipes):
+            self.assertEqual(result["data"]["id"], recipe.id)
+            self.assertEqual(list(recipe.tags.all()), [self.tag])
+            self.assertEqual(
+                list(recipe.ingredients.all()), [self.ingredient]
+            )
+
+    def test_batch_create_absolute_urls(self):
+        """Test the created recipes have absolute URLs like the other
+        endpoints"""
+        with patch("recipe.serializers.rendition_urls",
+                   return_value={"thumb": "/media/cake_thumb.jpg"}):
+            res = self.client.post(BATCH_URL, self.payload(1), format="json")
+
+        self.assertEqual(
+            res.data["results"][0]["data"]["renditions"],
+            {"thumb": "http://testserver/media/cake_thumb.jpg"}
+        )
+
+    def test_batch_create_query_budget(self):
+        """Test the number of queries does not depend on the batch size"""
+        for count in (1, 50):
+            with self.assertMaxQueries(12):
+                res = self.client.post(
+                    BATCH_URL, self.payload(count), format="json"
+                )
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_batch_partial_errors(self):
+        """Test invalid items are reported while valid ones are created"""
+        user2 = get_user_model().objects.create_user(
+            email="antonin@noirlumiere.com",
+            password="testPassword2"
+        )
+        other_tag = sample_tag(user=user2, name="Other")
+        payload = self.payload(3)
+        payload[1]["title"] = ""
+        payload[2]["tags"] = [other_tag.id]
+
+        res = self.client.post(BATCH_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        results = res.data["results"]
+        self.assertEqual(results[0]["status"], status.HTTP_201_CREATED)
+        self.assertIn("title", results[1]["errors"])
+        self.assertIn("tags", results[2]["errors"])
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
+
+    def test_batch_all_invalid(self):
+        """Test a batch without any valid recipe returns a 400"""
+        res = self.client.post(BATCH_URL, [{"title": ""}], format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_batch_requires_list(self):
+        """Test the batch payload must be a list"""
+        res = self.client.post(BATCH_URL, self.payload(1)[0], format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batch_size_limited(self):
+        """Test batches larger than the configured maximum are refused"""
+        with self.settings(RECIPE_BATCH_MAX_SIZE=2):
+            res = self.client.post(BATCH_URL, self.payload(3), format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_batch_invalidates_list_cache(self):
+        """Test the cached recipe list is refreshed after a batch"""
+        self.client.get(RECIPES_URL)
+        self.client.post(BATCH_URL, self.payload(2), format="json")
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data), 2)
+
+
+class RecipeFilterTests(TestCase):
+    """Test the tag and ingredient filters of the recipe API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="antonin.marzelle@outlook.fr",
+            password="testPassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.tag1 = sample_tag(user=self.user, name="Dessert")
+        self.tag2 = sample_tag(user=self.user, name="Vegan")
+        self.both = create_sample_recipe(user=self.user, title="Sorbet")
+        self.both.tags.add(self.tag1, self.tag2)
+        self.one = create_sample_recipe(user=self.user, title="Tiramisu")
+        self.one.tags.add(self.tag1)
+
+    def titles(self, res):
+        return sorted(recipe["title"] for recipe in res.data)
+
+    def test_match_any_returns_recipes_once(self):
+        """Test a recipe matching several tags is only returned once"""
+        res = self.client.get(
+            RECIPES_URL, {"tags": f"{self.tag1.id},{self.tag2.id}"}
+        )
+
+        self.assertEqual(self.titles(res), ["Sorbet", "Tiramisu"])
+
+    def test_match_all(self):
+        """Test match=all only returns recipes having every tag"""
+        res = self.client.get(RECIPES_URL, {
+            "tags": f"{self.tag1.id},{self.tag2.id}",
+            "match": "all",
+        })
+
+        self.assertEqual(self.titles(res), ["Sorbet"])
+
+    def test_match_all_ingredients_and_tags(self):
+        """Test match=all combines tag and ingredient filters"""
+        ingredient = sample_ingredient(user=self.user, name="Sugar")
+        self.one.ingredients.add(ingredient)
+
+        res = self.client.get(RECIPES_URL, {
+            "tags": str(self.tag1.id),
+            "ingredients": str(ingredient.id),
+            "match": "all",
+        })
+
+        self.assertEqual(self.titles(res), ["Tiramisu"])
+
+    def test_invalid_match(self):
+        """Test an unknown match value is refused"""
+        res = self.client.get(
+            RECIPES_URL, {"tags": str(self.tag1.id), "match": "some"}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecipeSparseFieldsTests(QueryBudgetMixin, TestCase):
+    """Test the ?fields= and ?expand= parameters of the recipe API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="antonin.marzelle@outlook.fr",
+            password="testPassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = sample_tag(user=self.user, name="Dessert")
+        self.ingredient = sample_ingredient(user=self.user, name="Sugar")
+        self.recipe = create_sample_recipe(user=self.user, title="Sorbet")
+        self.recipe.tags.add(self.tag)
+        self.recipe.ingredients.add(self.ingredient)
+
+    def create_recipes(self, count):
+        """Create `count` recipes linked to the tag and ingredient"""
+        for _ in range(count):
+            recipe = create_sample_recipe(user=self.user)
+            recipe.tags.add(self.tag)
+            recipe.ingredients.add(self.ingredient)
+
+    def test_fields(self):
+        """Test only the requested fields are serialized and loaded"""
+        with self.assertMaxQueries(2) as queries:
+            res = self.client.get(RECIPES_URL, {"fields": "id,title"})
+
+        self.assertEqual(res.data, [{"id": self.recipe.id,
+                                     "title": "Sorbet"}])
+        recipe_query = queries.captured_queries[-1]["sql"]
+        self.assertNotIn('"price"', recipe_query)
+
+    def test_unknown_field(self):
+        """Test unknown fields are refused"""
+        res = self.client.get(RECIPES_URL, {"fields": "title,user"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("fields", res.data)
+
+    def test_expand(self):
+        """Test the expanded relations are inlined on the list"""
+        res = self.client.get(RECIPES_URL, {"expand": "tags,ingredients"})
+
+        self.assertEqual(res.data[0]["tags"],
+                         [{"id": self.tag.id, "name": "Dessert"}])
+        self.assertEqual(res.data[0]["ingredients"],
+                         [{"id": self.ingredient.id, "name": "Sugar"}])
+
+    def test_expand_with_fields(self):
+        """Test expanded relations are returned with the sparse fields"""
+        res = self.client.get(
+            RECIPES_URL, {"fields": "title", "expand": "tags"}
+        )
+
+        self.assertEqual(res.data, [{
+            "title": "Sorbet",
+            "tags": [{"id": self.tag.id, "name": "Dessert"}],
+        }])
+
+    def test_unknown_expand(self):
+        """Test only the tags and ingredients can be expanded"""
+        res = self.client.get(RECIPES_URL, {"expand": "user"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("expand", res.data)
+
+    def test_expand_queries_do_not_grow_with_rows(self):
+        """Test the expanded relations are loaded in bulk"""
+        count = self.assertConstantQueries(
+            self.create_recipes,
+            lambda: self.client.get(
+                RECIPES_URL, {"expand": "tags,ingredients"}
+            ),
+            sizes=(1, 5, 20),
+        )
+
+        # validators, recipes, tags and ingredients
+        self.assertLessEqual(count, 4)
+
+    def test_fields_on_retrieve(self):
+        """Test the sparse fields apply to the detail view"""
+        res = self.client.get(
+            detail_url(self.recipe.id), {"fields": "title,tags"}
+        )
+
+        self.assertEqual(res.data, {
+            "title": "Sorbet",
+            "tags": [{"id": self.tag.id, "name": "Dessert"}],
+        })
+
+    def test_etag_depends_on_fields(self):
+        """Test the representations with other fields have other ETags"""
+        full = self.client.get(RECIPES_URL)
+
+        res = self.client.get(RECIPES_URL, {"fields": "title"},
+                              HTTP_IF_NONE_MATCH=full["ETag"])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], full["ETag"])
@@ -0,0 +1,158 @@
+import csv
+import io
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+from recipe.tests.query_budget import QueryBudgetMixin
+
+EXPORT_URL = reverse("recipe:recipe-export")
+
+
+def streamed_text(res):
+    """Return the text of a streaming response"""
+    return b"".join(res.streaming_content).decode("utf-8")
+
+
+class RecipeExportTests(QueryBudgetMixin, TestCase):
+    """Test the streaming export of the recipes"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="antonin.marzelle@outlook.fr",
+            password="testPassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.vegan = Tag.objects.create(user=self.user, name="Vegan")
+        self.quick = Tag.objects.create(user=self.user, name="Quick")
+        self.lemon = Ingredient.objects.create(user=self.user, name="Lemon")
+
+    def create_recipes(self, count):
+        """Create recipes linked to the tags and the ingredient"""
+        for i in range(count):
+            recipe = Recipe.objects.create(
+                user=self.user, title=f"Recipe {i}", time_min=10 + i,
+                price="4.50"
+            )
+            recipe.tags.add(self.quick, self.vegan)
+            recipe.ingredients.add(self.lemon)
+
+    def test_export_auth_required(self):
+        """Test that authentication is required"""
+        res = APIClient().get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_export_ndjson(self):
+        """Test the recipes are exported as JSON lines, names included"""
+        self.create_recipes(2)
+        other = get_user_model().objects.create_user(
+            email="other@outlook.fr", password="testPassword"
+        )
+        Recipe.objects.create(user=other, title="Hidden", time_min=5,
+                              price="1.00")
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line)
+                for line in streamed_text(res).splitlines()]
+        self.assertEqual([row["title"] for row in rows],
+                         ["Recipe 0", "Recipe 1"])
+        self.assertEqual(rows[0], {
+            "id": rows[0]["id"],
+            "title": "Recipe 0",
+            "price": "4.50",
+            "time_min": 10,
+            "link": "",
+            "image": "",
+            "tags": ["Vegan", "Quick"],
+            "ingredients": ["Lemon"],
+        })
+
+    def test_export_csv(self):
+        """Test the recipes are exported as CSV with a header"""
+        self.create_recipes(1)
+        Recipe.objects.create(user=self.user, title='Say "cheese", ok',
+                              time_min=5, price="2.00")
+
+        res = self.client.get(EXPORT_URL, {"fmt": "csv"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn("recipes.csv", res["Content-Disposition"])
+        rows = list(csv.DictReader(io.StringIO(streamed_text(res))))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(json.loads(rows[0]["tags"]), ["Vegan", "Quick"])
+        self.assertEqual(rows[0]["price"], "4.50")
+        self.assertEqual(rows[1]["title"], 'Say "cheese", ok')
+        self.assertEqual(rows[1]["ingredients"], "[]")
+
+    def test_export_csv_round_trip(self):
+        """Test names holding separators survive an export then import"""
+        self.create_recipes(1)
+        recipe = Recipe.objects.get(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user,
+                                           name='Salt; pepper, "mild"'))
+        other = get_user_model().objects.create_user(
+            email="other@outlook.fr", password="testPassword"
+        )
+
+        res = self.client.get(EXPORT_URL, {"fmt": "csv"})
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "recipes.csv")
+            with open(path, "w", encoding="utf-8", newline="") as file:
+                file.write(streamed_text(res))
+            call_command("import_recipes", path, user=other.email,
+                         stdout=io.StringIO())
+
+        imported = Recipe.objects.get(user=other)
+        self.assertEqual(
+            sorted(imported.tags.values_list("name", flat=True)),
+            sorted(recipe.tags.values_list("name", flat=True))
+        )
+        self.assertEqual(
+            list(imported.ingredients.values_list("name", flat=True)),
+            ["Lemon"]
+        )
+
+    def test_export_filtered(self):
+        """Test the export applies the tag filter"""
+        self.create_recipes(1)
+        Recipe.objects.create(user=self.user, title="Untagged", time_min=5,
+                              price="2.00")
+
+        res = self.client.get(EXPORT_URL, {"tags": str(self.vegan.id)})
+
+        rows = streamed_text(res).splitlines()
+        self.assertEqual(len(rows), 1)
+        self.assertIn("Recipe 0", rows[0])
+
+    def test_export_invalid_format(self):
+        """Test an unknown format is rejected"""
+        res = self.client.get(EXPORT_URL, {"fmt": "xml"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("fmt", res.data)
+
+    @override_settings(RECIPE_EXPORT_CHUNK_SIZE=2)
+    def test_export_queries_per_chunk(self):
+        """Test the names are resolved once per chunk, not per recipe"""
+        self.create_recipes(5)
+        res = self.client.get(EXPORT_URL)
+
+        # the recipes, then the tag and ingredient names of 3 chunks
+        with self.assertMaxQueries(1 + 3 * 2):
+            lines = streamed_text(res).splitlines()
+        self.assertEqual(len(lines), 5)
@@ -0,0 +1,141 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.search import update_search_vectors
+
+from recipe.tests.query_budget import QueryBudgetMixin
+from recipe.tests.test_recipe_api import RECIPES_URL, create_sample_recipe, \
+    sample_ingredient, sample_tag
+
+
+class RecipeSearchTests(QueryBudgetMixin, TestCase):
+    """Test the ?search= parameter of the recipe API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="antonin.marzelle@outlook.fr",
+            password="testPassword"
+        )
+        self.client.force_authenticate(self.user)
+
+    def titles(self, res):
+        return [recipe["title"] for recipe in res.data["results"]]
+
+    def test_search_title(self):
+        """Test searching returns the recipes whose title match"""
+        create_sample_recipe(user=self.user, title="Chocolate cake")
+        create_sample_recipe(user=self.user, title="Steak")
+
+        res = self.client.get(RECIPES_URL, {"search": "chocolate"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.titles(res), ["Chocolate cake"])
+
+    def test_search_every_word(self):
+        """Test every word of the search must match"""
+        create_sample_recipe(user=self.user, title="Chocolate cake")
+        create_sample_recipe(user=self.user, title="Chocolate mousse")
+
+        res = self.client.get(RECIPES_URL, {"search": "chocolate cake"})
+
+        self.assertEqual(self.titles(res), ["Chocolate cake"])
+
+    def test_search_names_ranked_after_title(self):
+        """Test tag and ingredient names match, ranked after titles"""
+        by_name = create_sample_recipe(user=self.user, title="Brownie")
+        by_name.ingredients.add(
+            sample_ingredient(user=self.user, name="Chocolate")
+        )
+        create_sample_recipe(user=self.user, title="Chocolate cake")
+        tagged = create_sample_recipe(user=self.user, title="Fondant")
+        tagged.tags.add(sample_tag(user=self.user, name="Chocolate lovers"))
+
+        res = self.client.get(RECIPES_URL, {"search": "chocolate"})
+
+        self.assertEqual(
+            self.titles(res), ["Chocolate cake", "Fondant", "Brownie"]
+        )
+
+    def test_search_limited_to_user(self):
+        """Test the search only returns the recipes of the user"""
+        user2 = get_user_model().objects.create_user(
+            email="antonin@noirlumiere.com",
+            password="testPassword2"
+        )
+        create_sample_recipe(user=user2, title="Chocolate cake")
+
+        res = self.client.get(RECIPES_URL, {"search": "chocolate"})
+
+        self.assertEqual(res.data["results"], [])
+
+    def test_search_paginated(self):
+        """Test the results are paginated without being asked"""
+        for i in range(5):
+            create_sample_recipe(user=self.user, title=f"Chocolate {i}")
+
+        with self.settings(API_PAGE_SIZE=2):
+            res = self.client.get(RECIPES_URL, {"search": "chocolate"})
+            titles = self.titles(res)
+            while res.data["next"]:
+                res = self.client.get(res.data["next"])
+                titles += self.titles(res)
+
+        self.assertEqual(
+            titles, [f"Chocolate {i}" for i in reversed(range(5))]
+        )
+
+    def test_search_paginated_equal_ranks(self):
+        """Test recipes of equal rank across page boundaries are each
+        returned once"""
+        tag = sample_tag(user=self.user, name="Soup lovers")
+        for i in range(3):
+            create_sample_recipe(user=self.user, title=f"Soup {i}")
+            tagged = create_sample_recipe(user=self.user, title=f"Stew {i}")
+            tagged.tags.add(tag)
+
+        with self.settings(API_PAGE_SIZE=2):
+            res = self.client.get(RECIPES_URL, {"search": "soup"})
+            titles = self.titles(res)
+            while res.data["next"]:
+                res = self.client.get(res.data["next"])
+                titles += self.titles(res)
+
+        self.assertEqual(titles, [
+            "Soup 2", "Soup 1", "Soup 0", "Stew 2", "Stew 1", "Stew 0",
+        ])
+
+    def test_search_query_budget(self):
+        """Test a search page runs a fixed number of queries"""
+        def create_recipes(count):
+            for i in range(count):
+                create_sample_recipe(user=self.user, title=f"Soup {i}")
+
+        count = self.assertConstantQueries(
+            create_recipes,
+            lambda: self.client.get(RECIPES_URL, {"search": "soup"}),
+            sizes=(1, 5, 20),
+        )
+
+        self.assertLessEqual(count, 4)
+
+    def test_blank_search_ignored(self):
+        """Test a blank search returns the regular list"""
+        create_sample_recipe(user=self.user, title="Steak")
+
+        res = self.client.get(RECIPES_URL, {"search": " "})
+
+        self.assertEqual(len(res.data), 1)
+
+    def test_update_vectors_without_postgresql(self):
+        """Test the vectors are only maintained on PostgreSQL"""
+        recipe = create_sample_recipe(user=self.user, title="Steak")
+
+        with self.assertMaxQueries(0):
+            update_search_vectors([recipe.pk])
+
+        recipe.refresh_from_db()
+        self.assertIsNone(recipe.search_vector)
@@ -1,6 +1,10 @@
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework import serializers, status
 from rest_framework.test import APIClient
@@ -10,6 +14,7 @@ from recipe.tests.test_recipe_api import RECIPES_URL, create_sample_recipe, samp
 from core.models import *
 
 from recipe.serializers import TagSerializer
+from recipe.tests.query_budget import QueryBudgetMixin
 
 TAGS_URL = reverse("recipe:tag-list")
 
@@ -124,8 +129,168 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL, {"assigned_only":1})
         
         self.assertEqual(len(res.data), 1)
-        
-        
-        
-        
-        
\ No newline at end of file
+
+    def test_assigned_only_without_distinct(self):
+        """Test the assigned filter relies on EXISTS, not DISTINCT"""
+        tag = Tag.objects.create(user=self.user, name="Breakfast")
+        recipe = Recipe.objects.create(
+            title="Pancakes", time_min=5, price=3.00, user=self.user
+        )
+        recipe.tags.add(tag)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(TAGS_URL, {"assigned_only": 1})
+
+        self.assertEqual(len(res.data), 1)
+        sql = " ".join(query["sql"] for query in queries.captured_queries)
+        self.assertNotIn("DISTINCT", sql)
+        self.assertIn("EXISTS", sql)
+
+
+class TagPaginationTests(QueryBudgetMixin, TestCase):
+    """Test the keyset pagination of the tags API"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "antonin.marzelle@outlook.fr",
+            "testPassword",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for name in ["Breakfast", "Lunch", "Brunch", "Dinner", "Snack"]:
+            Tag.objects.create(user=self.user, name=name)
+
+    def test_paginate_tags_by_name_and_id(self):
+        """Test walking through tags page by page"""
+        res = self.client.get(TAGS_URL, {"page_size": 2})
+        seen = [tag["id"] for tag in res.data["results"]]
+        while res.data["next"]:
+            res = self.client.get(res.data["next"])
+            seen.extend(tag["id"] for tag in res.data["results"])
+
+        expected = list(
+            Tag.objects.order_by("-name", "-id").values_list("id", flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+    def test_previous_page(self):
+        """Test going back through tags pages"""
+        pages = [self.client.get(TAGS_URL, {"page_size": 2})]
+        while pages[-1].data["next"]:
+            pages.append(self.client.get(pages[-1].data["next"]))
+
+        res = pages[-1]
+        for page in reversed(pages[:-1]):
+            res = self.client.get(res.data["previous"])
+            self.assertEqual(res.data["results"], page.data["results"])
+        self.assertIsNone(res.data["previous"])
+
+    def test_tags_page_query_budget(self):
+        """Test a page of tags is fetched in a single query"""
+        first = self.client.get(TAGS_URL, {"page_size": 2})
+
+        with self.assertMaxQueries(1):
+            res = self.client.get(first.data["next"])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["results"]), 2)
+
+
+TAGS_UPSERT_URL = reverse("recipe:tag-bulk-upsert")
+
+
+class TagBulkUpsertTests(QueryBudgetMixin, TestCase):
+    """Test getting or creating tags by name in bulk"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "antonin.marzelle@outlook.fr",
+            "testPassword",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_upsert_creates_missing_tags(self):
+        """Test existing tags are reused and missing ones created"""
+        vegan = Tag.objects.create(user=self.user, name="Vegan")
+
+        res = self.client.post(
+            TAGS_UPSERT_URL,
+            {"names": ["Dessert", "Vegan", "Dessert"]},
+            format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        dessert = Tag.objects.get(user=self.user, name="Dessert")
+        self.assertEqual(res.data, [
+            {"id": dessert.id, "name": "Dessert"},
+            {"id": vegan.id, "name": "Vegan"},
+        ])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_upsert_query_budget(self):
+        """Test the number of queries does not depend on the names count"""
+        for count in (1, 100):
+            names = [f"Tag {count} {i}" for i in range(count)]
+            with self.assertMaxQueries(3):
+                res = self.client.post(
+                    TAGS_UPSERT_URL, {"names": names}, format="json"
+                )
+            self.assertEqual(len(res.data), count)
+
+    def test_upsert_limited_to_user(self):
+        """Test tags of other users are never returned"""
+        user2 = get_user_model().objects.create_user(
+            email="antonin@noirlumiere.com",
+            password="testPassword2",
+        )
+        other = Tag.objects.create(user=user2, name="Vegan")
+
+        res = self.client.post(
+            TAGS_UPSERT_URL, {"names": ["Vegan"]}, format="json"
+        )
+
+        self.assertNotEqual(res.data[0]["id"], other.id)
+        self.assertTrue(
+            Tag.objects.filter(user=self.user, name="Vegan").exists()
+        )
+
+    def test_upsert_invalid(self):
+        """Test empty name lists and blank names are rejected"""
+        for payload in ({"names": []}, {"names": [""]}, {}):
+            res = self.client.post(TAGS_UPSERT_URL, payload, format="json")
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_upsert_invalidates_list_cache(self):
+        """Test the cached tag list is refreshed after an upsert"""
+        self.client.get(TAGS_URL)
+        self.client.post(
+            TAGS_UPSERT_URL, {"names": ["Vegan"]}, format="json"
+        )
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(len(res.data), 1)
+
+    def test_create_duplicate_tag(self):
+        """Test creating a tag with an existing name is rejected"""
+        Tag.objects.create(user=self.user, name="Vegan")
+
+        res = self.client.post(TAGS_URL, {"name": "Vegan"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_create_duplicate_tag_concurrently(self):
+        """Test a tag created by a concurrent request since the name check
+        is rejected"""
+        Tag.objects.create(user=self.user, name="Vegan")
+
+        # the other request inserts between the check and the insert
+        with patch("django.db.models.query.QuerySet.exists",
+                   return_value=False):
+            res = self.client.post(TAGS_URL, {"name": "Vegan"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("name", res.data)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
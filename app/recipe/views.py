@@ -1,22 +1,54 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
 from rest_framework.decorators import action
 from rest_framework.response import Response # return a custom response
 
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.decorators import authentication_classes, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 
+from core.bulk import bulk_create_with_ids, bulk_get_or_create
 from core.models import Tag, Ingredient, Recipe
+from core.renditions import queue_renditions
+from core.search import update_search_vectors
+from user.authentication import CachedTokenAuthentication, \
+    SignedTokenAuthentication
 
-from recipe import serializers
+from recipe import filters, serializers
+from recipe.cache import CachedListMixin, bump_user_version
+from recipe.conditional import ConditionalGetMixin
+from recipe.export import EXPORT_FORMATS, export_rows
+from recipe.fastpath import FastListMixin, RecipeFastListMixin, \
+    field_columns
+from recipe.pagination import NameCursorPagination, \
+    RecipeCursorPagination, RecipeSearchPagination
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
+# relations of a recipe which ?expand= can inline
+RECIPE_EXPANDABLE = {"tags": Tag, "ingredients": Ingredient}
+# columns loaded for each serialized field other than the relations
+RECIPE_COLUMNS = {
+    "title": "title",
+    "price": "price",
+    "time_min": "time_min",
+    "link": "link",
+    "renditions": ("image", "ready_renditions"),
+}
+
+class BaseRecipeAttrViewSet(CachedListMixin,
+                            FastListMixin,
+                            viewsets.GenericViewSet,
                             mixins.ListModelMixin,
                             mixins.CreateModelMixin):
     """Base viewset for user owned recipe attributes"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,
+                              SignedTokenAuthentication)
     permission_classes = (IsAuthenticated,)
-    
+    pagination_class = NameCursorPagination
+    fast_columns = {"id": "id", "name": "name"}
+
     def get_queryset(self):
         """Return objects for the current user authenticated only"""
         assigned_only = bool(
@@ -24,14 +56,49 @@ class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
         )
         queryset = self.queryset
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            queryset = filters.assigned_only(queryset)
         return queryset.filter(
             user=self.request.user
-        ).order_by("-name").distinct() # user est dans request grace permission_classes
+        ).order_by("-name", "-id") # user est dans request grace permission_classes
     
+    def get_serializer_class(self):
+        """Return the appropriate serializer class"""
+        if self.action == "bulk_upsert":
+            return serializers.NameListSerializer
+        return self.serializer_class
+
     def perform_create(self, serializer):
         """Create a new object"""
-        serializer.save(user=self.request.user)
+        name = serializer.validated_data["name"]
+        duplicate = ValidationError(
+            {"name": ["An object with this name already exists."]}
+        )
+        if self.queryset.filter(user=self.request.user, name=name).exists():
+            raise duplicate
+        try:
+            with transaction.atomic():
+                serializer.save(user=self.request.user)
+        except IntegrityError:
+            # created by a concurrent request since the check
+            raise duplicate
+
+    @action(methods=["POST"], detail=False, url_path="bulk-upsert")
+    def bulk_upsert(self, request):
+        """Return the ids of the named objects, creating the missing ones"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        names = serializer.validated_data["names"]
+
+        ids = bulk_get_or_create(
+            self.queryset.model, "name", names, user=request.user
+        )
+        # the rows are inserted without sending the model signals
+        bump_user_version(request.user.pk)
+
+        return Response(
+            [{"id": ids[name], "name": name} for name in names],
+            status=status.HTTP_200_OK
+        )
 
 
 class TagViewSet(BaseRecipeAttrViewSet):
@@ -46,30 +113,133 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
     serializer_class = serializers.IngredientSerializer
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConditionalGetMixin, CachedListMixin,
+                    RecipeFastListMixin, viewsets.ModelViewSet):
     """Manage recipe in the database"""
     serializer_class = serializers.RecipeSerializer
     queryset = Recipe.objects.all()
+    # the relations are read by id, the renditions from the image name
+    fast_columns = dict(
+        RECIPE_COLUMNS, id="id", tags="id", ingredients="id"
+    )
     permission_classes = (IsAuthenticated,)
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,
+                              SignedTokenAuthentication)
     
+    @property
+    def pagination_class(self):
+        """Return the pagination of the search results or of the list"""
+        if self._search_text():
+            return RecipeSearchPagination
+        return RecipeCursorPagination
+
+    def _search_text(self):
+        """Return the text of the ?search= parameter, stripped"""
+        request = getattr(self, "request", None)
+        if request is None:
+            return ""
+        return request.query_params.get("search", "").strip()
+
     def _params_to_ints(self, qs):
         """Convert a list of string IDs  to a list of integers"""
         return [int(str_id) for str_id in qs.split(",")]
-    
+
+    def _sparse_fields(self):
+        """Return the validated ?fields= and ?expand= of a list or
+        retrieve request, fields being None when every field is wanted"""
+        if self.action not in ("list", "retrieve"):
+            return None, ()
+        params = self.request.query_params
+        known = self.serializer_class.Meta.fields
+        errors = {}
+        fields = None
+        if "fields" in params:
+            fields = [name for name in params["fields"].split(",") if name]
+            unknown = sorted(set(fields) - set(known))
+            if unknown:
+                errors["fields"] = [f"Unknown fields: {', '.join(unknown)}."]
+        expand = [name for name in params.get("expand", "").split(",")
+                  if name]
+        unknown = sorted(set(expand) - set(RECIPE_EXPANDABLE))
+        if unknown:
+            errors["expand"] = [
+                f"Unknown relations: {', '.join(unknown)}. Expected "
+                f"{', '.join(RECIPE_EXPANDABLE)}."
+            ]
+        if errors:
+            raise ValidationError(errors)
+        return fields, tuple(dict.fromkeys(expand))
+
+    def get_serializer_context(self):
+        """Pass the sparse fields and expanded relations to the
+        serializer"""
+        context = super().get_serializer_context()
+        context["fields"], context["expand"] = self._sparse_fields()
+        return context
+
+    def representation_key(self):
+        """Return the ?fields= and ?expand= of the request, the responses
+        with different fields must not share their ETag"""
+        fields, expand = self._sparse_fields()
+        return f"{fields and sorted(fields)}:{sorted(expand)}"
+
+    def _select_fields(self, queryset):
+        """Load only the columns and relations of the requested fields"""
+        fields, expand = self._sparse_fields()
+        if fields is not None:
+            wanted = set(fields) | set(expand)
+            queryset = queryset.only("id", *sorted(field_columns(
+                RECIPE_COLUMNS[name] for name in wanted
+                if name in RECIPE_COLUMNS
+            )))
+        else:
+            wanted = set(RECIPE_EXPANDABLE)
+        # load all the related pk/objects in one query per relation
+        # instead of one query per recipe during serialization
+        return queryset.prefetch_related(*[
+            # in id order, like the ids of the fast path
+            Prefetch(name, queryset=model.objects.only(
+                "id", "name"
+            ).order_by("id"))
+            for name, model in RECIPE_EXPANDABLE.items() if name in wanted
+        ])
+
     def get_queryset(self):
         """Retrieve recipes for the current user authenticated only"""
         tags = self.request.query_params.get("tags") # return None if not present in the resquest
         ingredients = self.request.query_params.get("ingredients")
+        match = self.request.query_params.get("match", filters.MATCH_ANY)
+        if match not in (filters.MATCH_ANY, filters.MATCH_ALL):
+            raise ValidationError(
+                {"match": [f"Expected '{filters.MATCH_ANY}' or "
+                           f"'{filters.MATCH_ALL}'."]}
+            )
         queryset = self.queryset
         if tags: 
             tags_id = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tags_id)
+            queryset = filters.filter_related(
+                queryset, "tags", tags_id, match
+            )
         if ingredients: 
             ingredients_id = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredients_id)
+            queryset = filters.filter_related(
+                queryset, "ingredients", ingredients_id, match
+            )
         
-        return queryset.filter(user=self.request.user).order_by("-id")
+        # the search vectors are only read by the database
+        queryset = queryset.filter(user=self.request.user).defer(
+            "search_vector"
+        )
+        search = self._search_text()
+        if search and self.action == "list":
+            queryset = filters.search(queryset, search).order_by(
+                "-rank", "-id"
+            )
+        else:
+            queryset = queryset.order_by("-id")
+        if self.action != "upload_image":
+            queryset = self._select_fields(queryset)
+        return queryset
     
     def get_serializer_class(self):
         """Return the appropriate serializer class"""
@@ -77,6 +247,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return serializers.RecipeDetailSerializer
         elif self.action == "upload_image":
             return serializers.RecipeImageSerializer
+        elif self.action == "batch_create":
+            return serializers.RecipeBatchItemSerializer
         return self.serializer_class # case of list view
     
     def perform_create(self, serializer):
@@ -95,6 +267,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         # test si les données pass au serilizer sont corrects
         if serializer.is_valid():
             serializer.save() # save modification from update
+            queue_renditions(recipe)
             return Response(
                 serializer.data,
                 status=status.HTTP_200_OK
@@ -103,4 +276,137 @@ class RecipeViewSet(viewsets.ModelViewSet):
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
-        
\ No newline at end of file
+
+    @action(methods=["GET"], detail=False, url_path="export")
+    def export(self, request):
+        """Stream all the recipes of the user as NDJSON or CSV"""
+        fmt = request.query_params.get("fmt", "ndjson")
+        if fmt not in EXPORT_FORMATS:
+            raise ValidationError({"fmt": [
+                f"Expected one of {', '.join(EXPORT_FORMATS)}."
+            ]})
+        content_type, write = EXPORT_FORMATS[fmt]
+        rows = export_rows(
+            self.filter_queryset(self.get_queryset()),
+            settings.RECIPE_EXPORT_CHUNK_SIZE
+        )
+        response = StreamingHttpResponse(
+            write(rows), content_type=content_type
+        )
+        response["Content-Disposition"] = \
+            f'attachment; filename="recipes.{fmt}"'
+        return response
+
+    @action(methods=["POST"], detail=False, url_path="batch")
+    def batch_create(self, request):
+        """Create a list of recipes in a single transaction"""
+        items = request.data
+        if not isinstance(items, list):
+            return Response(
+                {"detail": "Expected a list of recipes."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > settings.RECIPE_BATCH_MAX_SIZE:
+            return Response(
+                {"detail": f"A batch can not contain more than "
+                           f"{settings.RECIPE_BATCH_MAX_SIZE} recipes."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        context = self.get_serializer_context()
+        errors = {}
+        valid = {}
+        for index, item in enumerate(items):
+            serializer = serializers.RecipeBatchItemSerializer(
+                data=item, context=context
+            )
+            if serializer.is_valid():
+                valid[index] = serializer.validated_data
+            else:
+                errors[index] = serializer.errors
+        for index, item_errors in self._check_related_ids(valid).items():
+            errors[index] = item_errors
+            del valid[index]
+
+        created = iter(self._bulk_create(list(valid.values()), request))
+        results = []
+        for index in range(len(items)):
+            if index in errors:
+                results.append({
+                    "index": index,
+                    "status": status.HTTP_400_BAD_REQUEST,
+                    "errors": errors[index],
+                })
+            else:
+                results.append({
+                    "index": index,
+                    "status": status.HTTP_201_CREATED,
+                    "data": next(created),
+                })
+
+        if not errors:
+            response_status = status.HTTP_201_CREATED
+        elif not valid:
+            response_status = status.HTTP_400_BAD_REQUEST
+        else:
+            response_status = status.HTTP_207_MULTI_STATUS
+        return Response({"results": results}, status=response_status)
+
+    def _check_related_ids(self, items):
+        """Return the errors of the recipes referring to unknown tags or
+        ingredients, with one query per relation for the whole batch"""
+        errors = {}
+        for field, model in (("tags", Tag), ("ingredients", Ingredient)):
+            wanted = {pk for item in items.values() for pk in item[field]}
+            existing = set(model.objects.filter(
+                user=self.request.user, pk__in=wanted
+            ).values_list("pk", flat=True))
+            for index, item in items.items():
+                missing = [pk for pk in item[field] if pk not in existing]
+                if missing:
+                    errors.setdefault(index, {})[field] = [
+                        f'Invalid pk "{pk}" - object does not exist.'
+                        for pk in missing
+                    ]
+        return errors
+
+    def _bulk_create(self, items, request):
+        """Insert the validated recipes and their relations in bulk and
+        return their serialized data"""
+        if not items:
+            return []
+        user = self.request.user
+        with transaction.atomic():
+            recipes = bulk_create_with_ids(Recipe, [
+                Recipe(
+                    user=user,
+                    **{
+                        key: value for key, value in item.items()
+                        if key not in ("tags", "ingredients")
+                    }
+                )
+                for item in items
+            ])
+            Recipe.tags.through.objects.bulk_create([
+                Recipe.tags.through(recipe_id=recipe.pk, tag_id=pk)
+                for recipe, item in zip(recipes, items)
+                for pk in item["tags"]
+            ])
+            Recipe.ingredients.through.objects.bulk_create([
+                Recipe.ingredients.through(
+                    recipe_id=recipe.pk, ingredient_id=pk
+                )
+                for recipe, item in zip(recipes, items)
+                for pk in item["ingredients"]
+            ])
+            # bulk inserts do not maintain the search vectors either
+            update_search_vectors([recipe.pk for recipe in recipes])
+        # bulk inserts do not send the signals invalidating the cache
+        bump_user_version(user.pk)
+
+        created = Recipe.objects.filter(
+            pk__in=[recipe.pk for recipe in recipes]
+        ).prefetch_related("tags", "ingredients").order_by("pk")
+        return list(serializers.RecipeSerializer(
+            created, many=True, context={"request": request}
+        ).data)
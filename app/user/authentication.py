@@ -0,0 +1,213 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import router
+from django.dispatch import receiver
+from django.utils.translation import ugettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, \
+    TokenAuthentication, get_authorization_header
+
+
+class LocalTokenCache:
+    """In process LRU of the resolved tokens, entries expiring after
+    `timeout` seconds"""
+
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        # requests may modify their user, never share the cached instance
+        return copy.deepcopy(value)
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class DjangoTokenCache:
+    """Resolved tokens stored in a Django cache, shared between processes
+    when the cache backend is"""
+
+    def __init__(self, alias, timeout):
+        self.cache = caches[alias]
+        self.timeout = timeout
+
+    def _key(self, key):
+        # never store the token itself in the cache keys
+        return "auth:token:" + hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        return self.cache.get(self._key(key))
+
+    def set(self, key, value):
+        self.cache.set(self._key(key), value, self.timeout)
+
+    def delete_many(self, keys):
+        self.cache.delete_many([self._key(key) for key in keys])
+
+    def clear(self):
+        """Entries of a shared cache are left to expire"""
+
+
+_local_cache = None
+_local_cache_lock = threading.Lock()
+
+
+def get_token_cache():
+    """Return the token cache selected by TOKEN_AUTH_CACHE, or None if the
+    tokens are not cached"""
+    global _local_cache
+    if settings.TOKEN_AUTH_CACHE == "django":
+        return DjangoTokenCache(
+            settings.TOKEN_AUTH_CACHE_ALIAS, settings.TOKEN_AUTH_CACHE_TIMEOUT
+        )
+    if settings.TOKEN_AUTH_CACHE != "local":
+        return None
+    with _local_cache_lock:
+        if _local_cache is None:
+            _local_cache = LocalTokenCache(
+                settings.TOKEN_AUTH_CACHE_SIZE,
+                settings.TOKEN_AUTH_CACHE_TIMEOUT
+            )
+        return _local_cache
+
+
+def invalidate_tokens(keys):
+    """Drop the cached resolution of the token `keys`"""
+    token_cache = get_token_cache()
+    if token_cache is not None and keys:
+        token_cache.delete_many(keys)
+
+
+@receiver(setting_changed)
+def reset_local_cache(setting, **kwargs):
+    """Start from a new local cache when its settings change"""
+    global _local_cache
+    if setting.startswith("TOKEN_AUTH_CACHE"):
+        with _local_cache_lock:
+            _local_cache = None
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication caching the token to user resolution
+
+    A cache hit authenticates the request without the Token and User
+    query. The entries are dropped by user.signals when the token is
+    deleted and when its user is saved (deactivation, password or profile
+    change). With the "local" cache other processes only see these
+    changes once their entries expire, after TOKEN_AUTH_CACHE_TIMEOUT
+    seconds; use the "django" cache with a shared backend to invalidate
+    every process at once.
+
+    The cache only holds the user fields and the token creation date,
+    never the token key nor the password hash: the user is rebuilt with
+    its password deferred, loaded if a view reads it.
+    """
+
+    def authenticate_credentials(self, key):
+        token_cache = get_token_cache()
+        if token_cache is None:
+            return super().authenticate_credentials(key)
+
+        cached = token_cache.get(key)
+        if cached is not None:
+            return self.from_cache(key, *cached)
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, self.to_cache(user, token))
+        return user, token
+
+    def user_fields(self):
+        """Return the user fields kept in the cache"""
+        return [field for field in get_user_model()._meta.concrete_fields
+                if field.attname != "password"]
+
+    def to_cache(self, user, token):
+        """Return the cached value of a resolved token"""
+        fields = {field.attname: getattr(user, field.attname)
+                  for field in self.user_fields()}
+        return fields, token.created
+
+    def from_cache(self, key, fields, created):
+        """Return the user and the token of a cached value"""
+        user_model = get_user_model()
+        user = user_model.from_db(
+            router.db_for_read(user_model), list(fields),
+            [fields[field.attname] for field in self.user_fields()]
+        )
+        token_model = self.get_model()
+        token = token_model.from_db(
+            router.db_for_read(token_model), ["key", "user_id", "created"],
+            [key, user.pk, created]
+        )
+        token.user = user
+        return user, token
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """Authentication by the signed access tokens of user.tokens
+
+    Clients send `Authorization: Bearer <access token>`. The token carries
+    the user id, so the request is authenticated without any query: the
+    user is an unsaved instance holding only its primary key. Views
+    needing the other fields of the user must load it.
+    """
+    keyword = "Bearer"
+
+    def authenticate(self, request):
+        from user.tokens import read_access_token
+
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(
+                _("Invalid token header.")
+            )
+
+        try:
+            token = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(
+                _("Invalid token header.")
+            )
+        access = read_access_token(token)
+        if access is None:
+            raise exceptions.AuthenticationFailed(
+                _("Invalid or expired token.")
+            )
+        return get_user_model()(pk=access.user_id), access
+
+    def authenticate_header(self, request):
+        return self.keyword
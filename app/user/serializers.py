@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model, authenticate
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
 from rest_framework import serializers
@@ -22,12 +23,20 @@ class UserSerializer(serializers.ModelSerializer):
         
         if password:
             user.set_password(password)
+            # the signed access tokens issued until now are revoked
+            user.tokens_valid_after = timezone.now()
             user.save()
         
         return user
         
     
 
+class AccessTokenSerializer(serializers.Serializer):
+    """Serializer for a signed access token"""
+    access = serializers.CharField(read_only=True)
+    expires_in = serializers.IntegerField(read_only=True)
+
+
 class AuthTokenSerializer(serializers.Serializer):
     """Serializer for the user authentification object"""
     email = serializers.CharField()
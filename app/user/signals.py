@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from user.authentication import invalidate_tokens
+from user.tokens import revoke_access_tokens
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """Stop authenticating with a deleted token"""
+    invalidate_tokens([instance.key])
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_tokens(sender, instance, created, **kwargs):
+    """Resolve the tokens of a saved user again, so a deactivation, a
+    password change or a profile update is seen by the next request"""
+    if created:
+        return
+    invalidate_tokens(list(
+        Token.objects.filter(user=instance).values_list("key", flat=True)
+    ))
+    revoke_access_tokens(instance)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def revoke_deleted_user_tokens(sender, instance, **kwargs):
+    """Reject the access tokens of a deleted user"""
+    revoke_access_tokens(instance, deleted=True)
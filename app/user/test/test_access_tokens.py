@@ -0,0 +1,178 @@
+import time
+from contextlib import contextmanager
+from unittest.mock import patch
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.test.test_user_api import ME_URL, create_user
+from user.tokens import issue_access_token, read_access_token, \
+    revoke_access_tokens
+
+REFRESH_URL = reverse("user:token-refresh")
+TAGS_URL = reverse("recipe:tag-list")
+
+
+class AccessTokenTests(TestCase):
+    """Test the signed access tokens"""
+
+    def setUp(self):
+        self.user = create_user(
+            email="antonin.marzelle@outlook.fr",
+            password="admin123",
+            name="Antonin"
+        )
+        self.token = Token.objects.create(user=self.user)
+        # ids are reused between tests, forget the previous revocations
+        revoke_access_tokens(self.user)
+        self.client = APIClient()
+
+    def refresh(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        res = self.client.post(REFRESH_URL)
+        self.client.credentials()
+        return res
+
+    def bearer(self, access):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+
+    @contextmanager
+    def other_worker(self):
+        """Run as a process with its own cache and revocation copy"""
+        with self.settings(TOKEN_AUTH_CACHE_ALIAS="worker"), \
+                patch("user.tokens._valid_after", None):
+            yield
+
+    def issue_in_the_past(self):
+        """Return an access token issued a few seconds ago"""
+        with patch("user.tokens.time.time", return_value=time.time() - 5):
+            return issue_access_token(self.user)[0]
+
+    def test_refresh_issues_access_token(self):
+        """Test the database token is exchanged for an access token"""
+        res = self.refresh()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["expires_in"], 300)
+        access = read_access_token(res.data["access"])
+        self.assertEqual(access.user_id, self.user.pk)
+
+    def test_refresh_requires_database_token(self):
+        """Test an access token can not be refreshed by itself"""
+        self.bearer(self.refresh().data["access"])
+
+        res = self.client.post(REFRESH_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_access_token_without_queries(self):
+        """Test requests are authenticated without any query"""
+        self.bearer(self.refresh().data["access"])
+        self.client.get(TAGS_URL)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 0)
+
+    def test_profile_with_access_token(self):
+        """Test the profile is loaded for access token requests"""
+        self.bearer(self.refresh().data["access"])
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data, {
+            "name": "Antonin",
+            "email": "antonin.marzelle@outlook.fr",
+        })
+
+    def test_invalid_access_token(self):
+        """Test tampered tokens are rejected"""
+        access = self.refresh().data["access"]
+        self.bearer(access[:-1] + ("A" if access[-1] != "A" else "B"))
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res["WWW-Authenticate"], "Token")
+
+    @override_settings(ACCESS_TOKEN_LIFETIME=0)
+    def test_expired_access_token(self):
+        """Test expired tokens are rejected"""
+        self.bearer(self.refresh().data["access"])
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_revokes(self):
+        """Test changing the password revokes the issued access tokens"""
+        access = self.issue_in_the_past()
+        self.client.force_authenticate(self.user)
+        self.client.patch(ME_URL, {"password": "admin234"})
+        self.client.force_authenticate(None)
+
+        self.bearer(access)
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.bearer(self.refresh().data["access"])
+        self.assertEqual(
+            self.client.get(ME_URL).status_code, status.HTTP_200_OK
+        )
+
+    def test_deactivation_revokes(self):
+        """Test deactivating a user revokes the access tokens"""
+        self.bearer(self.refresh().data["access"])
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_user_rejected(self):
+        """Test a user deleted since the token was issued can not load
+        the profile"""
+        self.bearer(self.refresh().data["access"])
+        self.user.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "revoking-worker",
+        },
+        "worker": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "other-worker",
+        },
+    })
+    def test_revocation_reaches_other_caches(self):
+        """Test a process with its own cache rejects a revoked token once
+        the revocation interval elapsed"""
+        access = self.issue_in_the_past()
+        with self.other_worker():
+            self.assertIsNotNone(read_access_token(access))
+
+        self.user.tokens_valid_after = timezone.now()
+        self.user.save()
+
+        later = settings.ACCESS_TOKEN_REVOCATION_INTERVAL + 1
+        with self.other_worker(), \
+                patch("time.time", return_value=time.time() + later), \
+                patch("time.monotonic",
+                      return_value=time.monotonic() + later):
+            self.assertIsNone(read_access_token(access))
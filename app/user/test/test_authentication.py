@@ -0,0 +1,150 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import DjangoTokenCache, LocalTokenCache, \
+    get_token_cache
+from user.test.test_user_api import ME_URL, create_user
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test the cached resolution of the authentication tokens"""
+
+    def setUp(self):
+        get_token_cache().clear()
+        self.user = create_user(
+            email="antonin.marzelle@outlook.fr",
+            password="admin123",
+            name="Antonin"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def get_me(self):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(ME_URL)
+        return res, len(queries)
+
+    def test_shared_cache_by_default(self):
+        """Test the tokens are cached in the Django cache by default"""
+        self.assertIsInstance(get_token_cache(), DjangoTokenCache)
+
+    def test_token_resolved_once(self):
+        """Test the token is only looked up by the first request"""
+        res, first = self.get_me()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(first, 1)
+
+        res, second = self.get_me()
+        self.assertEqual(res.data["email"], self.user.email)
+        self.assertEqual(second, 0)
+
+    def test_credentials_not_cached(self):
+        """Test the cache holds neither the token key nor the password"""
+        self.get_me()
+
+        cached = repr(get_token_cache().get(self.token.key))
+        self.assertNotIn(self.token.key, cached)
+        self.assertNotIn(self.user.password, cached)
+
+    def test_cached_user_keeps_password(self):
+        """Test saving the cached user does not lose its password"""
+        self.get_me()
+        res = self.client.patch(ME_URL, {"name": "Nolwenn"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, "Nolwenn")
+        self.assertTrue(self.user.check_password("admin123"))
+
+    def test_deleted_token_rejected(self):
+        """Test a deleted token stops authenticating at once"""
+        self.get_me()
+        self.token.delete()
+
+        res, _ = self.get_me()
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test a deactivated user stops authenticating at once"""
+        self.get_me()
+        self.user.is_active = False
+        self.user.save()
+
+        res, _ = self.get_me()
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_update_visible(self):
+        """Test updating the profile refreshes the cached user"""
+        self.get_me()
+        self.client.patch(ME_URL, {"name": "Nolwenn", "password": "admin234"})
+
+        res, queries = self.get_me()
+
+        self.assertEqual(res.data["name"], "Nolwenn")
+        self.assertEqual(queries, 1)
+
+    def test_invalid_token_not_cached(self):
+        """Test an unknown token is rejected on every request"""
+        self.client.credentials(HTTP_AUTHORIZATION="Token unknown")
+
+        self.assertEqual(self.get_me()[0].status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.get_me()[0].status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(TOKEN_AUTH_CACHE="local")
+    def test_local_cache(self):
+        """Test the tokens can be cached in the process"""
+        self.get_me()
+        self.assertEqual(self.get_me()[1], 0)
+
+        self.token.delete()
+        res, _ = self.get_me()
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(TOKEN_AUTH_CACHE="off")
+    def test_cache_disabled(self):
+        """Test every request resolves the token when caching is off"""
+        self.get_me()
+
+        self.assertEqual(self.get_me()[1], 1)
+
+
+class LocalTokenCacheTests(TestCase):
+    """Test the in process token cache"""
+
+    def test_least_recently_used_evicted(self):
+        """Test the cache keeps at most `size` entries"""
+        cache = LocalTokenCache(size=2, timeout=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+
+    def test_entries_expire(self):
+        """Test entries are dropped after the timeout"""
+        cache = LocalTokenCache(size=2, timeout=-1)
+        cache.set("a", 1)
+
+        self.assertIsNone(cache.get("a"))
+
+    def test_values_copied(self):
+        """Test callers never share the cached values"""
+        cache = LocalTokenCache(size=2, timeout=60)
+        cache.set("a", {"name": "Antonin"})
+        cache.get("a")["name"] = "Nolwenn"
+
+        self.assertEqual(cache.get("a"), {"name": "Antonin"})
@@ -0,0 +1,106 @@
+import math
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import caches
+
+from user.authentication import LocalTokenCache
+
+SALT = "user.access-token"
+
+AccessToken = namedtuple("AccessToken", ("user_id", "issued_at", "expires_at"))
+
+# per process copy of the revocation timestamps, refreshed from the shared
+# cache every ACCESS_TOKEN_REVOCATION_INTERVAL seconds
+_valid_after = None
+
+
+def issue_access_token(user):
+    """Return a signed access token of `user` and its lifetime in seconds"""
+    now = int(time.time())
+    lifetime = settings.ACCESS_TOKEN_LIFETIME
+    token = signing.dumps(
+        {"uid": user.pk, "iat": now, "exp": now + lifetime},
+        salt=SALT, compress=True
+    )
+    return token, lifetime
+
+
+def read_access_token(token):
+    """Return the AccessToken signed in `token`, or None if the signature
+    is wrong, the token expired or was revoked"""
+    try:
+        payload = signing.loads(token, salt=SALT)
+        access = AccessToken(payload["uid"], payload["iat"], payload["exp"])
+    except (signing.BadSignature, KeyError, TypeError):
+        return None
+    if access.expires_at <= time.time():
+        return None
+    # timestamps have a one second resolution, tokens issued during the
+    # second of the revocation stay valid
+    if access.issued_at < tokens_valid_after(access.user_id):
+        return None
+    return access
+
+
+def _cache_key(user_id):
+    return f"auth:valid-after:{user_id}"
+
+
+def _local_copy():
+    global _valid_after
+    if _valid_after is None:
+        _valid_after = LocalTokenCache(
+            settings.TOKEN_AUTH_CACHE_SIZE,
+            settings.ACCESS_TOKEN_REVOCATION_INTERVAL
+        )
+    return _valid_after
+
+
+def tokens_valid_after(user_id):
+    """Return the timestamp before which the access tokens of the user are
+    revoked, infinite for an inactive or deleted user
+
+    Most calls are answered by the process copy, then by the cache; the
+    database is only read when neither knows the user. Both expire after
+    ACCESS_TOKEN_REVOCATION_INTERVAL seconds, so a revocation reaches the
+    processes not sharing the cache of the revoking one within it.
+    """
+    local = _local_copy()
+    valid_after = local.get(user_id)
+    if valid_after is not None:
+        return valid_after
+
+    cache = caches[settings.TOKEN_AUTH_CACHE_ALIAS]
+    valid_after = cache.get(_cache_key(user_id))
+    if valid_after is None:
+        user = get_user_model().objects.filter(pk=user_id).only(
+            "is_active", "tokens_valid_after"
+        ).first()
+        valid_after = _user_valid_after(user)
+        cache.set(_cache_key(user_id), valid_after,
+                  settings.ACCESS_TOKEN_REVOCATION_INTERVAL)
+    local.set(user_id, valid_after)
+    return valid_after
+
+
+def revoke_access_tokens(user, deleted=False):
+    """Publish the revocation timestamp of a saved or deleted user"""
+    valid_after = _user_valid_after(None if deleted else user)
+    caches[settings.TOKEN_AUTH_CACHE_ALIAS].set(
+        _cache_key(user.pk), valid_after,
+        settings.ACCESS_TOKEN_REVOCATION_INTERVAL
+    )
+    _local_copy().set(user.pk, valid_after)
+
+
+def _user_valid_after(user):
+    """Return the revocation timestamp of a user, None when deleted"""
+    if user is None or not user.is_active:
+        return math.inf
+    if user.tokens_valid_after is None:
+        return 0
+    return int(user.tokens_valid_after.timestamp())
@@ -1,7 +1,14 @@
-from rest_framework import generics, authentication, permissions
+from django.contrib.auth import get_user_model
+from django.utils.translation import ugettext_lazy as _
+from rest_framework import exceptions, generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+from user.authentication import CachedTokenAuthentication, \
+    SignedTokenAuthentication
 from user.serializers import *
+from user.serializers import AccessTokenSerializer
+from user.tokens import AccessToken, issue_access_token
 
 class CreateAPIView(generics.CreateAPIView):
     """Create a new user in the system"""
@@ -13,12 +20,40 @@ class CreateTokenView(ObtainAuthToken):
     renderer_classes =  api_settings.DEFAULT_RENDERER_CLASSES
 
 
+class RefreshAccessTokenView(generics.GenericAPIView):
+    """Issue a signed access token in exchange of a database token"""
+    serializer_class = AccessTokenSerializer
+    # only the database tokens can be refreshed, they can be deleted
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request):
+        access, expires_in = issue_access_token(request.user)
+        serializer = self.get_serializer(
+            {"access": access, "expires_in": expires_in}
+        )
+        return Response(serializer.data)
+
+
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,) # method d'authentification via les token d'auth
+    # method d'authentification via les token d'auth
+    authentication_classes = (CachedTokenAuthentication,
+                              SignedTokenAuthentication)
     permission_classes = (permissions.IsAuthenticated,) # il doit juste etre login pour réaliser les modifs
     
     def get_object(self):
         """Retrieve and return authenticated user"""
+        if isinstance(self.request.auth, AccessToken):
+            # signed tokens only carry the user id, the user may have been
+            # deleted since the token was issued
+            user = get_user_model().objects.filter(
+                pk=self.request.user.pk, is_active=True
+            ).first()
+            if user is None:
+                raise exceptions.AuthenticationFailed(
+                    _("User inactive or deleted.")
+                )
+            return user
         return self.request.user # request contient user grace au authentication_classes